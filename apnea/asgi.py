@@ -5,6 +5,24 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+
+Perfil de despliegue con uvicorn (muchos clientes lentos por proceso):
+
+    pip install "uvicorn[standard]"
+    uvicorn apnea.asgi:application --host 0.0.0.0 --port $PORT \
+        --workers 2 --limit-concurrency 200 --timeout-keep-alive 5
+
+- Este módulo activa VISTAS_ASYNC: pacientes, pacientes_doctor, graficas,
+  paciente_exito y generar_pdf usan las versiones de apneasueno/views_async.py.
+  El ORM corre con sync_to_async y WeasyPrint en el pool de procesos
+  (PDF_WORKERS por worker), así el event loop sigue atendiendo mientras
+  se genera un pase o un cliente lento descarga la respuesta.
+- El resto de las vistas son sync y Django las ejecuta en un hilo aparte.
+- EstaticosMiddleware (ESTATICOS_SERVIR) funciona en modo async: la cadena
+  de middleware sigue siendo async (lo comprueba EstaticosTests).
+- Con PERFILADO_ACTIVO=1 el middleware de perfilado (solo sync) obliga a
+  atender cada petición en modo sync; úselo solo para diagnosticar.
+- gunicorn sigue sirviendo apnea.wsgi sin cambios (Procfile).
 """
 
 import os
@@ -12,6 +30,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'apnea.settings')
+os.environ.setdefault('VISTAS_ASYNC', '1')
 
 
 application = get_asgi_application()
@@ -42,7 +42,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Perfilado de vistas; se desactiva solo si PERFILADO_ACTIVO es False
+    'apneasueno.perfilado.PerfiladoMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Archivos estáticos antes de la sesión (ver apneasueno/estaticos.py)
+    'apneasueno.estaticos.EstaticosMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -124,16 +128,18 @@ TIME_ZONE = 'America/Mexico_City'
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 
-STATICFILES_DIRS = [
-    os.path.join(BASE_DIR, "static"),
-]
-
 # Archivos estáticos (CSS, JS, imágenes de la app)
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_DIRS = [
-    BASE_DIR / 'static'
-]
+# Los de la app están en apneasueno/static; static/ del proyecto es opcional
+# (si no existe, collectstatic fallaría)
+STATICFILES_DIRS = [ruta for ruta in [BASE_DIR / 'static'] if ruta.is_dir()]
+
+# collectstatic escribe nombres con hash y variantes .br/.gz (ver apneasueno/estaticos.py)
+STATICFILES_STORAGE = 'apneasueno.estaticos.AlmacenComprimido'
+# Sin DEBUG la app sirve STATIC_ROOT (EstaticosMiddleware); 0 si lo hace el servidor web
+ESTATICOS_SERVIR = os.environ.get('ESTATICOS_SERVIR', '1') == '1'
+ESTATICOS_MAX_AGE = 60  # segundos de caché de los archivos sin hash
 
 
 
@@ -142,5 +148,61 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Caché de Django en archivos: la comparten todos los workers de gunicorn
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache_django',
+        'TIMEOUT': 600,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+CACHE_PAGINAS_TTL = 600  # segundos que se reutiliza la lista de pacientes / gráficas (ver apneasueno/cache_paginas.py)
+
+# Caché en disco de pases PDF (ver apneasueno/cache_pdf.py)
+PDF_CACHE_DIR = BASE_DIR / 'cache_pdf'
+PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024  # 200 MB, se desalojan los menos usados
+
+# Generación de PDF en segundo plano (ver apneasueno/trabajos_pdf.py)
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', 2))  # procesos por worker de gunicorn
+PDF_COLA_MAXIMA = 50                                  # trabajos pendientes antes de responder 503
+PDF_TRABAJOS_DIR = BASE_DIR / 'cache_pdf' / 'trabajos'
+PDF_TRABAJOS_TTL = 60 * 60                            # segundos que se conserva el estado de un trabajo
+
+# Paginación por cursor de las listas de pacientes (ver apneasueno/paginacion.py)
+PACIENTES_POR_PAGINA = 50
+PACIENTES_POR_PAGINA_MAX = 200
+
+# Pacientes que muestra el triage por defecto y como máximo (?k=, ver views.triage)
+TRIAGE_PACIENTES = 20
+TRIAGE_PACIENTES_MAX = 200
+
+# Días que muestran las gráficas de tendencias si no se elige un rango (ver views.tendencias_view)
+TENDENCIAS_DIAS = 30
+TENDENCIAS_PUNTOS_MAX = 1000  # puntos por serie; más, y se agrupa por semana o mes
+
+# Segundos que el rol de doctor guardado en sesión se considera válido (ver apneasueno/roles.py)
+ROLES_SESION_TTL = 300
+
+# Límite de intentos de login y de restablecimiento de contraseña (ver apneasueno/limites.py)
+LIMITES_ACTIVOS = True
+LIMITES_ALMACEN = os.environ.get('LIMITES_ALMACEN') or None  # ruta SQLite compartida por los workers; vacío = memoria
+# Encabezado con la IP real del cliente que agrega el proxy de confianza.
+# Vacío por defecto: con gunicorn recibiendo las conexiones directamente (Procfile)
+# el cliente podría falsificarlo, así que se usa REMOTE_ADDR.
+# PythonAnywhere: definir LIMITES_IP_ENCABEZADO=X-Real-IP en el entorno (REMOTE_ADDR
+# es siempre la del proxy, y sin esto la cubeta por IP la compartirían todos los clientes).
+# Heroku: X-Forwarded-For.
+LIMITES_IP_ENCABEZADO = os.environ.get('LIMITES_IP_ENCABEZADO', '')
+
+# Vistas async para servidores ASGI (uvicorn); apnea/asgi.py lo activa (ver apneasueno/views_async.py)
+VISTAS_ASYNC = os.environ.get('VISTAS_ASYNC', '0') == '1'
+
+# Perfilado de vistas: tiempos, consultas y encabezado Server-Timing (ver apneasueno/perfilado.py)
+PERFILADO_ACTIVO = os.environ.get('PERFILADO_ACTIVO', '0') == '1'
+PERFILADO_MUESTREO = float(os.environ.get('PERFILADO_MUESTREO', 1.0))  # fracción de peticiones medidas
+PERFILADO_MUESTRAS = 1000                                             # últimas muestras por URL
+PERFILADO_SERVER_TIMING = True
+
 # Así, si alguien intenta acceder a /doctores sin estar autenticado, será redirigido al login.
 LOGIN_URL = '/doctor_login/'
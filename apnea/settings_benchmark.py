@@ -0,0 +1,36 @@
+"""
+Configuración para medir rendimiento sin tocar la base de datos real.
+
+    python manage.py medir_rendimiento --settings=apnea.settings_benchmark
+
+Usa SQLite, caché en memoria y carpetas propias para los PDF.
+"""
+from .settings import *  # noqa: F401,F403
+
+# medir_rendimiento solo borra y siembra la base si esta bandera está activa
+BENCHMARK = True
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'benchmark.sqlite3',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+PDF_CACHE_DIR = BASE_DIR / 'cache_benchmark' / 'pdf'
+PDF_TRABAJOS_DIR = BASE_DIR / 'cache_benchmark' / 'trabajos'
+
+# El benchmark inicia sesión cientos de veces con los mismos doctores
+LIMITES_ACTIVOS = False
+
+# Sin collectstatic: {% static %} no debe buscar el manifiesto
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
@@ -2,8 +2,20 @@
 # Configuración del panel de administración
 # ==========================================
 
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth.models import User
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from . import busqueda, stopbang
+from .forms import ImportarPacientesForm
+from .importacion import importar, leer_filas
 from .models import Paciente
+from .paginacion import PaginadorEstimado
 
 # Solo una vez para crear el grupo
 #Group.objects.get_or_create(name='Doctores')
@@ -11,6 +23,62 @@ from .models import Paciente
 # Register your models here.
 #admin.site.register(Paciente)
 
+# ============================
+# Filtros laterales
+# (ninguno lee toda la tabla ni la lista de usuarios)
+# ============================
+class FiltroRiesgo(admin.SimpleListFilter):
+    """Niveles de riesgo fijos (el filtro por campo haría SELECT DISTINCT de toda la tabla)."""
+    title = 'nivel de riesgo'
+    parameter_name = 'riesgo__exact'
+
+    def lookups(self, request, model_admin):
+        return [(riesgo, riesgo) for riesgo in (stopbang.RIESGO_ALTO, stopbang.RIESGO_INTERMEDIO, stopbang.RIESGO_BAJO)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(riesgo=self.value())
+        return queryset
+
+
+class FiltroDoctor(admin.SimpleListFilter):
+    """
+    Filtro lateral por doctor que no carga la lista de usuarios:
+    un select con autocompletado (el de autocomplete_fields) que busca
+    doctores mientras se escribe. Solo se consulta el doctor elegido.
+    """
+    title = 'doctor'
+    parameter_name = 'doctor__id__exact'
+    template = 'admin/apneasueno/paciente/filtro_doctor.html'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        self.campo = forms.ModelChoiceField(
+            queryset=User.objects.only('id', 'username'),
+            required=False,
+            widget=AutocompleteSelect(model._meta.get_field('doctor'), model_admin.admin_site),
+        )
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def selector(self):
+        """<select> con autocompletado; al elegir un doctor se recarga la lista."""
+        return self.campo.widget.render(
+            self.parameter_name, self.value(), attrs={'id': 'filtro_doctor', 'style': 'width: 100%'},
+        )
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        if not self.value().isdigit():
+            raise IncorrectLookupParameters(f'Doctor inválido: {self.value()}')
+        return queryset.filter(doctor_id=self.value())
+
+
 # ============================
 # Registro de modelos en admin
 # ============================
@@ -18,8 +86,70 @@ from .models import Paciente
 class PacienteAdmin(admin.ModelAdmin):
     """
     Personalización de la vista de Paciente en el panel de administración.
+    - El número de consultas por página no depende de cuántos pacientes haya:
+      doctor con join, total estimado y filtro de doctor sin lista de usuarios.
     """
     list_display = ('id', 'nombres', 'apellidos', 'edad', 'doctor', 'riesgo')  # columnas visibles
-    search_fields = ('id', 'nombres', 'apellidos')  # barra de búsqueda
-    list_filter = ('sexo', 'riesgo', 'doctor')      # filtros laterales
-    ordering = ('id',)                              # orden por defecto
+    list_select_related = ('doctor',)                 # el doctor de cada fila viene en el mismo SELECT
+    search_fields = ('id', 'nombres', 'apellidos')    # barra de búsqueda (ver get_search_results)
+    list_filter = ('sexo', FiltroRiesgo, FiltroDoctor)  # filtros laterales
+    autocomplete_fields = ('doctor',)                 # el formulario tampoco carga todos los usuarios
+    ordering = ('id',)                                # orden por defecto
+    paginator = PaginadorEstimado                     # total estimado en MySQL (sin COUNT(*))
+    show_full_result_count = False                    # sin segundo conteo al filtrar
+    change_list_template = 'admin/apneasueno/paciente/change_list.html'
+
+    @property
+    def media(self):
+        # Select2 del filtro de doctor en la lista
+        campo = Paciente._meta.get_field('doctor')
+        return super().media + AutocompleteSelect(campo, self.admin_site).media
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Busca por prefijo de palabra en PalabraPaciente (ver busqueda.py)
+        en lugar de tres icontains; con el filtro de doctor usa su índice.
+        """
+        if not search_term:
+            return queryset, False
+        doctor = request.GET.get(FiltroDoctor.parameter_name, '')
+        return busqueda.filtrar(queryset, search_term, doctor=int(doctor) if doctor.isdigit() else None), False
+
+    def get_urls(self):
+        """Agrega la página de importación masiva: admin/apneasueno/paciente/importar/"""
+        urls = [
+            path('importar/', self.admin_site.admin_view(self.importar_view), name='apneasueno_paciente_importar'),
+        ]
+        return urls + super().get_urls()
+
+    def importar_view(self, request):
+        """
+        Importa pacientes desde CSV/Excel por bloques.
+        Las filas con errores se listan sin detener la importación.
+        """
+        if not self.has_add_permission(request):
+            return redirect('admin:apneasueno_paciente_changelist')
+
+        resultado = None
+        form = ImportarPacientesForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            try:
+                resultado = importar(leer_filas(archivo.file, archivo.name), doctor=form.cleaned_data['doctor'])
+            except ValueError as error:
+                form.add_error('archivo', str(error))
+            else:
+                self.message_user(
+                    request,
+                    f'{resultado.creados} pacientes importados, {resultado.con_errores} filas con errores.',
+                    messages.SUCCESS if not resultado.con_errores else messages.WARNING,
+                )
+
+        contexto = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Importar pacientes',
+            'form': form,
+            'resultado': resultado,
+        }
+        return TemplateResponse(request, 'admin/apneasueno/paciente/importar.html', contexto)
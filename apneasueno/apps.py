@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LibreriaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apneasueno'
+
+    def ready(self):
+        # Registra las señales (invalidación de cachés)
+        from . import signals  # noqa: F401
@@ -0,0 +1,96 @@
+# ==========================================
+# Búsqueda de pacientes
+# Cada paciente guarda una clave normalizada (sin acentos y en minúsculas)
+# con su ID, nombres y apellidos, calculada en Paciente.save().
+# Cada palabra de la clave se guarda además como fila de PalabraPaciente
+# indexada por (doctor, palabra): un término se busca como prefijo con el
+# lookup palabra__prefijo, que el índice resuelve sin recorrer los pacientes
+# del doctor (LIKE '% jo%' no puede usarlo).
+#   - MySQL: LIKE 'jo%' con la collation de la columna (startswith sería
+#     LIKE BINARY, que no usa el índice); las palabras ya están en minúsculas.
+#   - SQLite: GLOB 'jo*' (su LIKE no distingue mayúsculas y no usa el índice).
+# Un rango >= 'jo' AND < 'jp' no sirve: en collations UCA
+# (utf8mb4_0900_ai_ci) el orden no es el de los códigos Unicode.
+# ==========================================
+import re
+import unicodedata
+
+from django.db import models
+from django.db.models.lookups import IStartsWith
+
+LARGO_PALABRA = 50
+
+
+@models.CharField.register_lookup
+class Prefijo(IStartsWith):
+    """campo__prefijo='jo': palabras que empiezan con 'jo', resuelto con el índice del campo."""
+    lookup_name = 'prefijo'
+
+    def as_sqlite(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        # Los comodines de GLOB se escriben como clases de un carácter: '*' -> '[*]'
+        patron = re.sub(r'([*?\[])', r'[\1]', str(self.rhs)) + '*'
+        return f'{lhs} GLOB %s', lhs_params + [patron]
+
+
+def normalizar(texto):
+    """Quita acentos, pasa a minúsculas y colapsa espacios: 'José  PÉREZ' -> 'jose perez'."""
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.lower().split())
+
+
+def clave_busqueda(id, nombres, apellidos):
+    """
+    Clave guardada en Paciente.busqueda.
+    Empieza con un espacio para que ' termino' encuentre el inicio de cualquier palabra.
+    """
+    return ' ' + normalizar(f'{id or ""} {nombres or ""} {apellidos or ""}')
+
+
+def palabras(clave):
+    """Palabras distintas de una clave de búsqueda: ' p001 jose perez' -> {'p001', 'jose', 'perez'}."""
+    return {palabra[:LARGO_PALABRA] for palabra in clave.split()}
+
+
+def guardar_palabras(pacientes, nuevos=False):
+    """
+    Reemplaza las filas de PalabraPaciente de estos pacientes
+    (después de guardarlos; ya deben tener su clave calculada).
+    - nuevos: recién insertados con bulk_create, no hay filas que borrar.
+    """
+    from .models import PalabraPaciente
+
+    if not nuevos:
+        PalabraPaciente.objects.filter(paciente__in=[p.pk for p in pacientes]).delete()
+    PalabraPaciente.objects.bulk_create([
+        PalabraPaciente(paciente_id=p.pk, doctor_id=p.doctor_id, palabra=palabra)
+        for p in pacientes for palabra in sorted(palabras(p.busqueda))
+    ])
+
+
+def filtrar(queryset, consulta, doctor=None):
+    """
+    Filtra pacientes cuyas palabras empiezan con cada término de la consulta
+    ('jo pe' encuentra a 'José Pérez'). El orden de los términos no importa.
+    - doctor: si la lista es de un solo doctor, la subconsulta usa el índice
+      (doctor, palabra); sin doctor (admin) usa el de (palabra).
+    """
+    from .models import PalabraPaciente
+
+    for termino in normalizar(consulta).split():
+        coincidencias = PalabraPaciente.objects.filter(palabra__prefijo=termino[:LARGO_PALABRA])
+        if doctor is not None:
+            coincidencias = coincidencias.filter(doctor=doctor)
+        queryset = queryset.filter(pk__in=coincidencias.values('paciente_id'))
+    return queryset
+
+
+def coincidencia_exacta(queryset, consulta):
+    """Paciente cuyo ID es exactamente la consulta (va primero en los resultados)."""
+    consulta = (consulta or '').strip()
+    if not consulta:
+        return None
+    return queryset.filter(id=consulta).first()
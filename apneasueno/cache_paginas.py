@@ -0,0 +1,98 @@
+# ==========================================
+# Caché de páginas por doctor
+# Incluye:
+#   - version_doctor / invalidar_doctores: contador "los pacientes cambiaron"
+#   - cache_por_doctor: decorador que guarda la página ya renderizada (vistas sync o async)
+# Las claves llevan la versión del doctor: al guardar o eliminar uno de sus
+# pacientes la versión sube y las páginas viejas simplemente dejan de usarse.
+# ==========================================
+import asyncio
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+
+def _clave_version(doctor_id):
+    return f'pacientes:version:{doctor_id}'
+
+
+def version_doctor(doctor_id):
+    """Versión actual de los pacientes del doctor (0 si nunca cambiaron)."""
+    return cache.get(_clave_version(doctor_id), 0)
+
+
+def invalidar_doctores(doctor_ids):
+    """Sube la versión de cada doctor: sus páginas en caché quedan obsoletas."""
+    for doctor_id in set(doctor_ids):
+        if doctor_id is None:
+            continue
+        try:
+            cache.incr(_clave_version(doctor_id))
+        except ValueError:
+            cache.set(_clave_version(doctor_id), 1, None)
+
+
+def clave_pagina(prefijo, request):
+    """Clave de la página: vista + doctor + versión + parámetros GET."""
+    doctor_id = request.user.pk
+    parametros = hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+    return f'pagina:{prefijo}:{doctor_id}:{version_doctor(doctor_id)}:{parametros}'
+
+
+def _pagina_guardada(prefijo, request):
+    """
+    Devuelve (clave, respuesta guardada o None).
+    La clave es None si la página no se debe guardar (no es GET o hay mensajes pendientes).
+    """
+    if request.method != 'GET' or len(messages.get_messages(request)):
+        return None, None
+    clave = clave_pagina(prefijo, request)
+    guardada = cache.get(clave)
+    if guardada is not None:
+        contenido, tipo = guardada
+        return clave, HttpResponse(contenido, content_type=tipo)
+    return clave, None
+
+
+def _guardar_pagina(clave, response):
+    if response.status_code == 200 and not response.streaming:
+        ttl = getattr(settings, 'CACHE_PAGINAS_TTL', 600)
+        cache.set(clave, (response.content, response['Content-Type']), ttl)
+
+
+def cache_por_doctor(prefijo):
+    """
+    Guarda el HTML de una vista GET de doctor y lo reutiliza mientras
+    sus pacientes no cambien (o hasta CACHE_PAGINAS_TTL segundos).
+    - No se usa si hay mensajes pendientes, porque la página los mostraría.
+    - Acepta vistas async: la caché se lee y escribe con sync_to_async.
+    """
+    def decorador(vista):
+        if asyncio.iscoroutinefunction(vista):
+            @wraps(vista)
+            async def envoltura_async(request, *args, **kwargs):
+                clave, guardada = await sync_to_async(_pagina_guardada)(prefijo, request)
+                if guardada is not None:
+                    return guardada
+                response = await vista(request, *args, **kwargs)
+                if clave is not None:
+                    await sync_to_async(_guardar_pagina)(clave, response)
+                return response
+            return envoltura_async
+
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            clave, guardada = _pagina_guardada(prefijo, request)
+            if guardada is not None:
+                return guardada
+            response = vista(request, *args, **kwargs)
+            if clave is not None:
+                _guardar_pagina(clave, response)
+            return response
+        return envoltura
+    return decorador
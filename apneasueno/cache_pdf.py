@@ -0,0 +1,124 @@
+# ==========================================
+# Caché en disco de pases PDF ya generados
+# Incluye:
+#   - huella_pase: hash del contenido visible en pase_pdf.html
+#   - obtener / guardar: lectura y escritura atómica de PDFs
+#   - invalidar_paciente: borra los pases de un paciente
+#   - Desalojo LRU cuando la carpeta supera el tamaño máximo
+# ==========================================
+import os
+import shutil
+import hashlib
+import tempfile
+
+from django.conf import settings
+from django.utils import timezone
+
+# Campos del paciente que aparecen en el pase (si cambian, cambia la huella)
+CAMPOS_PASE = ('id', 'nombres', 'apellidos', 'puntuacion_stopbang', 'riesgo')
+
+
+def _carpeta():
+    return str(getattr(settings, 'PDF_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache_pdf')))
+
+
+def _limite_bytes():
+    return getattr(settings, 'PDF_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+
+
+def _carpeta_paciente(paciente_id):
+    """Cada paciente tiene su propia subcarpeta (el ID puede traer cualquier carácter)."""
+    nombre = hashlib.sha1(str(paciente_id).encode()).hexdigest()[:16]
+    return os.path.join(_carpeta(), nombre)
+
+
+def huella_pase(paciente):
+    """
+    Hash del contenido del pase: campos mostrados, fecha del día y versión
+    de los recursos (logo/CSS). Se usa como nombre de archivo y como ETag.
+    """
+    from .pdf import obtener_recursos  # importa WeasyPrint solo cuando hace falta
+
+    partes = [str(getattr(paciente, campo)) for campo in CAMPOS_PASE]
+    partes.append(timezone.now().strftime('%d/%m/%Y'))
+    partes.append(str(obtener_recursos().firma))
+    return hashlib.sha256('\x1f'.join(partes).encode()).hexdigest()
+
+
+def ruta_pase(paciente_id, huella):
+    return os.path.join(_carpeta_paciente(paciente_id), f'{huella}.pdf')
+
+
+def obtener(paciente_id, huella):
+    """
+    Devuelve la ruta del PDF en caché o None.
+    - Al acertar se actualiza su fecha de modificación (orden LRU).
+    """
+    ruta = ruta_pase(paciente_id, huella)
+    try:
+        os.utime(ruta)
+    except OSError:
+        return None
+    return ruta
+
+
+def guardar(paciente_id, huella, contenido):
+    """
+    Escribe el PDF de forma atómica (archivo temporal + os.replace)
+    y aplica el desalojo LRU si se supera el límite.
+    """
+    carpeta = _carpeta_paciente(paciente_id)
+    os.makedirs(carpeta, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(contenido)
+        ruta = ruta_pase(paciente_id, huella)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    desalojar()
+    return ruta
+
+
+def invalidar_paciente(paciente_id):
+    """Elimina todos los pases guardados de un paciente."""
+    shutil.rmtree(_carpeta_paciente(paciente_id), ignore_errors=True)
+
+
+def desalojar(limite=None):
+    """
+    Borra los PDFs usados hace más tiempo hasta quedar por debajo del límite.
+    Devuelve el número de archivos eliminados.
+    """
+    limite = _limite_bytes() if limite is None else limite
+    archivos = []
+    total = 0
+    for raiz, _, nombres in os.walk(_carpeta()):
+        for nombre in nombres:
+            if not nombre.endswith('.pdf'):
+                continue
+            ruta = os.path.join(raiz, nombre)
+            try:
+                info = os.stat(ruta)
+            except OSError:
+                continue
+            archivos.append((info.st_mtime, info.st_size, ruta))
+            total += info.st_size
+
+    if total <= limite:
+        return 0
+
+    eliminados = 0
+    for _, tamano, ruta in sorted(archivos):
+        if total <= limite:
+            break
+        try:
+            os.remove(ruta)
+        except OSError:
+            continue
+        total -= tamano
+        eliminados += 1
+    return eliminados
@@ -0,0 +1,255 @@
+# ==========================================
+# Pruebas de carga con flujos de la clínica
+# Incluye:
+#   - FLUJOS: recorridos de paciente y de doctor (como datos, igual que un archivo .jsonl)
+#   - ClienteLocal / ClienteHTTP: ejecutan un paso dentro del proceso o contra un servidor
+#   - ejecutar_nivel: varios usuarios simultáneos durante unos segundos
+#   - saturacion: en qué concurrencia deja de crecer el rendimiento
+# Lo usa el comando prueba_carga.
+# ==========================================
+import json
+import time
+import random
+import threading
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.db import connections
+from django.test import Client
+
+from . import rendimiento
+
+# Cada paso: método, URL y datos; {variables} se reemplazan en cada recorrido.
+# Los POST siguen la redirección (p. ej. paciente_login -> paciente_exito).
+FLUJOS = [
+    {
+        'nombre': 'paciente',
+        'peso': 0.8,
+        'pasos': [
+            {'metodo': 'GET', 'url': '/paciente_login'},
+            {'metodo': 'POST', 'url': '/paciente_login', 'datos': {
+                'id': '{paciente_id}', 'nombres': 'Paciente', 'apellidos': '{apellido}',
+                'edad': '{edad}', 'sexo': '{sexo}', 'estatura': '1.70', 'peso': '{peso}',
+                'cuello': '{cuello}', 'ronca': '{si_no}', 'cansado': '{si_no}',
+                'observado': 'False', 'presion_alta': '{si_no}', 'doctor': '{doctor_id}',
+            }},
+            {'metodo': 'GET', 'url': '/paciente/{paciente_id}/pdf/'},
+        ],
+    },
+    {
+        'nombre': 'doctor',
+        'peso': 0.2,
+        'pasos': [
+            {'metodo': 'GET', 'url': '/doctor_login/'},
+            {'metodo': 'POST', 'url': '/doctor_login/', 'datos': {
+                'username': '{doctor}', 'password': '{clave}',
+            }},
+            {'metodo': 'GET', 'url': '/pacientes/todos/?buscar={apellido}'},
+            {'metodo': 'GET', 'url': '/graficas/'},
+        ],
+    },
+]
+
+
+def leer_flujos(ruta):
+    """Flujos desde un archivo .jsonl: un objeto {nombre, peso, pasos} por línea."""
+    flujos = []
+    with open(ruta, encoding='utf-8') as f:
+        for numero, linea in enumerate(f, start=1):
+            if not linea.strip():
+                continue
+            flujo = json.loads(linea)
+            if not flujo.get('pasos'):
+                raise ValueError(f'Línea {numero}: el flujo no tiene pasos.')
+            flujo.setdefault('nombre', f'flujo{numero}')
+            flujo.setdefault('peso', 1)
+            flujos.append(flujo)
+    return flujos
+
+
+def aplicar_mezcla(flujos, mezcla):
+    """Cambia los pesos con un texto 'paciente=0.9,doctor=0.1'."""
+    pesos = {}
+    for parte in filter(None, (mezcla or '').split(',')):
+        nombre, _, peso = parte.partition('=')
+        pesos[nombre.strip()] = float(peso)
+    desconocidos = set(pesos) - {f['nombre'] for f in flujos}
+    if desconocidos:
+        raise ValueError(f'Flujos desconocidos en la mezcla: {", ".join(sorted(desconocidos))}')
+    return [{**f, 'peso': pesos.get(f['nombre'], f['peso'])} for f in flujos]
+
+
+def _variables(rng, doctores, clave):
+    """Valores de un recorrido: paciente nuevo y doctor al azar."""
+    doctor = rng.choice(doctores)
+    return {
+        'paciente_id': f'LC{time.time_ns() % 10 ** 12}{rng.randrange(1000):03d}',
+        'apellido': rng.choice(rendimiento.APELLIDOS),
+        'edad': str(rng.randint(18, 85)),
+        'sexo': rng.choice('MF'),
+        'peso': str(rng.randint(50, 130)),
+        'cuello': str(rng.randint(32, 48)),
+        'si_no': rng.choice(['True', 'False']),
+        'doctor': doctor[1],
+        'doctor_id': str(doctor[0]),
+        'clave': clave,
+    }
+
+
+def _rellenar(valor, variables):
+    if isinstance(valor, dict):
+        return {k: _rellenar(v, variables) for k, v in valor.items()}
+    return str(valor).format(**variables)
+
+
+# ============================
+# Clientes
+# ============================
+class ClienteLocal:
+    """Ejecuta los pasos con el cliente de pruebas de Django (sin red)."""
+    def __init__(self):
+        self.cliente = Client()
+
+    def pedir(self, metodo, url, datos=None):
+        if metodo == 'POST':
+            return self.cliente.post(url, datos or {}, follow=True).status_code
+        return self.cliente.get(url).status_code
+
+
+class ClienteHTTP:
+    """Ejecuta los pasos contra un servidor (runserver, gunicorn o uvicorn) con cookies y CSRF."""
+    def __init__(self, base):
+        self.base = base.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.abridor = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def _csrf(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def pedir(self, metodo, url, datos=None):
+        cuerpo = None
+        encabezados = {'Referer': self.base + url}
+        if metodo == 'POST':
+            cuerpo = urllib.parse.urlencode({**(datos or {}), 'csrfmiddlewaretoken': self._csrf()}).encode()
+        url = urllib.parse.quote(url, safe='/?=&%:+')  # acentos de la búsqueda
+        peticion = urllib.request.Request(self.base + url, data=cuerpo, headers=encabezados, method=metodo)
+        try:
+            with self.abridor.open(peticion, timeout=60) as respuesta:
+                respuesta.read()
+                return respuesta.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+
+# ============================
+# Ejecución
+# ============================
+class _Resultados:
+    """Latencias y errores de todos los usuarios de un nivel."""
+    def __init__(self):
+        self.candado = threading.Lock()
+        self.latencias = []
+        self.por_flujo = {}
+        self.errores = 0
+        self.ejemplos_error = []
+
+    def agregar(self, flujo, segundos, codigo, metodo, url):
+        with self.candado:
+            self.latencias.append(segundos)
+            self.por_flujo.setdefault(flujo, []).append(segundos)
+            if codigo >= 400:
+                self.errores += 1
+                if len(self.ejemplos_error) < 5:
+                    self.ejemplos_error.append(f'{metodo} {url} -> {codigo}')
+
+
+def _usuario(flujos, fabrica_cliente, fin, rng, doctores, clave, resultados):
+    """Un usuario virtual: elige un flujo por peso y lo recorre hasta que se acabe el tiempo."""
+    pesos = [f['peso'] for f in flujos]
+    try:
+        while time.monotonic() < fin:
+            flujo = rng.choices(flujos, weights=pesos)[0]
+            variables = _variables(rng, doctores, clave)
+            cliente = fabrica_cliente()
+            for paso in flujo['pasos']:
+                url = _rellenar(paso['url'], variables)
+                datos = _rellenar(paso.get('datos', {}), variables)
+                inicio = time.perf_counter()
+                try:
+                    codigo = cliente.pedir(paso['metodo'], url, datos)
+                except Exception:  # conexión rechazada, BD bloqueada, etc.
+                    codigo = 599
+                resultados.agregar(flujo['nombre'], time.perf_counter() - inicio, codigo, paso['metodo'], url)
+    finally:
+        connections.close_all()
+
+
+def ejecutar_nivel(flujos, concurrencia, duracion, fabrica_cliente, doctores, clave, semilla=1):
+    """
+    Corre `concurrencia` usuarios simultáneos durante `duracion` segundos.
+    Devuelve el resumen del nivel (rendimiento, latencias y errores).
+    """
+    resultados = _Resultados()
+    fin = time.monotonic() + duracion
+    hilos = [
+        threading.Thread(
+            target=_usuario,
+            args=(flujos, fabrica_cliente, fin, random.Random(semilla * 1000 + i), doctores, clave, resultados),
+            daemon=True,
+        )
+        for i in range(concurrencia)
+    ]
+    inicio = time.monotonic()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    transcurrido = time.monotonic() - inicio
+
+    peticiones = len(resultados.latencias)
+    datos = {'concurrencia': concurrencia, 'peticiones': peticiones, 'errores': resultados.errores}
+    if peticiones:
+        resumen = rendimiento.resumir(resultados.latencias)
+        datos.update({
+            'por_segundo': round(peticiones / transcurrido, 2),
+            'p50_ms': resumen['p50_ms'],
+            'p99_ms': resumen['p99_ms'],
+            'flujos': {
+                nombre: {k: v for k, v in rendimiento.resumir(latencias).items() if k != 'por_segundo'}
+                for nombre, latencias in sorted(resultados.por_flujo.items())
+            },
+        })
+    if resultados.ejemplos_error:
+        datos['ejemplos_error'] = resultados.ejemplos_error
+    return datos
+
+
+def saturacion(niveles, ganancia_minima=0.1, errores_maximos=0.01):
+    """
+    Primer nivel donde el rendimiento crece menos de `ganancia_minima` (10 %)
+    respecto al anterior o los errores superan `errores_maximos` (1 %).
+    Devuelve {'concurrencia', 'motivo', 'recomendada'} o None si no se saturó.
+    """
+    anterior = None
+    for nivel in niveles:
+        if nivel['peticiones'] and nivel['errores'] / nivel['peticiones'] > errores_maximos:
+            motivo = f'{nivel["errores"]} errores de {nivel["peticiones"]} peticiones'
+        elif anterior and nivel.get('por_segundo', 0) < anterior.get('por_segundo', 0) * (1 + ganancia_minima):
+            motivo = (
+                f'el rendimiento pasó de {anterior.get("por_segundo")} a {nivel.get("por_segundo")} pet/s '
+                f'y el p99 de {anterior.get("p99_ms")} a {nivel.get("p99_ms")} ms'
+            )
+        else:
+            anterior = nivel
+            continue
+        return {
+            'concurrencia': nivel['concurrencia'],
+            'motivo': motivo,
+            'recomendada': anterior['concurrencia'] if anterior else None,
+        }
+    return None
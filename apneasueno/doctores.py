@@ -0,0 +1,101 @@
+# ==========================================
+# Lista de doctores del <select> de PacienteForm
+# Incluye:
+#   - opciones / opciones_html: [(id, usuario)] y las <option> ya renderizadas,
+#     guardadas en la caché (sin consultas mientras no cambien los doctores)
+#   - invalidar: se llama desde las señales (registro, grupos, usuarios)
+#   - SelectDoctores / CampoDoctor: widget y campo de formulario que las usan
+# ==========================================
+from django import forms
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.forms.utils import flatatt
+from django.utils.html import escape, format_html
+from django.utils.safestring import mark_safe
+
+from .roles import GRUPO_DOCTORES
+
+CLAVE_CACHE = 'doctores:opciones'
+ETIQUETA_VACIA = '---------'
+
+
+def _calcular():
+    """(lista de (id, usuario), HTML de las <option>) leídos de la base de datos."""
+    lista = list(
+        User.objects.filter(groups__name=GRUPO_DOCTORES).order_by('pk').values_list('pk', 'username')
+    )
+    html = format_html('<option value="">{}</option>', ETIQUETA_VACIA) + ''.join(
+        format_html('<option value="{}">{}</option>', pk, usuario) for pk, usuario in lista
+    )
+    return lista, html
+
+
+def _datos():
+    datos = cache.get(CLAVE_CACHE)
+    if datos is None:
+        datos = _calcular()
+        cache.set(CLAVE_CACHE, datos, None)
+    return datos
+
+
+def opciones():
+    """[(id, usuario)] de los doctores, en orden de registro."""
+    return _datos()[0]
+
+
+def opciones_html():
+    """Las <option> del select (incluye la opción vacía)."""
+    return _datos()[1]
+
+
+def invalidar():
+    """La próxima lectura vuelve a consultar los doctores."""
+    cache.delete(CLAVE_CACHE)
+
+
+class SelectDoctores(forms.Select):
+    """
+    <select> que reutiliza las <option> ya renderizadas en la caché
+    en lugar de recorrer las opciones con la plantilla del widget.
+    """
+    def render(self, name, value, attrs=None, renderer=None):
+        atributos = self.build_attrs(self.attrs, attrs)
+        html = opciones_html()
+        if value not in (None, ''):
+            opcion = format_html('<option value="{}">', value)
+            html = html.replace(opcion, opcion[:-1] + ' selected>', 1)
+        return mark_safe(f'<select name="{escape(name)}"{flatatt(atributos)}>{html}</select>')
+
+
+class CampoDoctor(forms.ModelChoiceField):
+    """
+    ModelChoiceField de doctores que valida contra la lista en caché.
+    - Mostrar el formulario no consulta la base de datos.
+    - Al enviarlo solo se busca al doctor elegido por su ID (sin join de grupos).
+    """
+    widget = SelectDoctores
+
+    def __init__(self, **kwargs):
+        super().__init__(queryset=User.objects.only('id', 'username'), **kwargs)
+
+    def _get_choices(self):
+        return [('', self.empty_label)] + opciones()
+
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+
+    def _set_queryset(self, queryset):
+        # A diferencia de ModelChoiceField no copia las opciones al widget:
+        # el widget las toma de la caché al renderizar
+        self._queryset = None if queryset is None else queryset.all()
+
+    queryset = property(forms.ModelChoiceField._get_queryset, _set_queryset)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if str(value) not in {str(pk) for pk, _ in opciones()}:
+            raise ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value},
+            )
+        return super().to_python(value)
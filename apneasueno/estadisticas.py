@@ -0,0 +1,289 @@
+# ==========================================
+# Estadísticas materializadas por doctor
+# Incluye:
+#   - registrar_cambio: ajusta los conteos al guardar/eliminar un paciente
+#   - reconstruir: recalcula los conteos desde cero
+#   - datos_graficas: diccionarios que recibe graficas.html
+#   - reconstruir_diarias / tendencias: conteos por día (EstadisticaDiaria)
+#     y las series por día, semana o mes que recibe tendencias.html
+# ==========================================
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Paciente, EstadisticaDoctor, EstadisticaDiaria
+
+CAMPOS_FILA = ('doctor_id', 'riesgo', 'sexo', 'puntuacion_stopbang', 'fecha_registro')
+
+COLUMNA_RIESGO = {
+    'Alto riesgo de AOS': 'riesgo_alto',
+    'Riesgo intermedio de AOS': 'riesgo_intermedio',
+    'Bajo riesgo de AOS': 'riesgo_bajo',
+}
+COLUMNA_SEXO = {'M': 'sexo_m', 'F': 'sexo_f'}
+PUNTUACIONES = range(8)
+
+
+def fila_de(paciente):
+    """Valores del paciente que afectan las estadísticas."""
+    return {campo: getattr(paciente, campo) for campo in CAMPOS_FILA}
+
+
+def _columnas(fila):
+    """Columnas de EstadisticaDoctor en las que cuenta una fila de paciente."""
+    columnas = ['total']
+    if fila['riesgo'] in COLUMNA_RIESGO:
+        columnas.append(COLUMNA_RIESGO[fila['riesgo']])
+    if fila['sexo'] in COLUMNA_SEXO:
+        columnas.append(COLUMNA_SEXO[fila['sexo']])
+    if fila['puntuacion_stopbang'] in PUNTUACIONES:
+        columnas.append(f'puntuacion_{fila["puntuacion_stopbang"]}')
+    return columnas
+
+
+def _aplicar(doctor_id, deltas):
+    """Suma los deltas {columna: n} a la fila del doctor (UPDATE atómico con F())."""
+    deltas = {columna: n for columna, n in deltas.items() if n}
+    if doctor_id is None or not deltas:
+        return
+    EstadisticaDoctor.objects.get_or_create(doctor_id=doctor_id)
+    EstadisticaDoctor.objects.filter(doctor_id=doctor_id).update(
+        **{columna: F(columna) + n for columna, n in deltas.items()}
+    )
+
+
+def registrar_cambio(anterior, nueva):
+    """
+    Ajusta los conteos cuando un paciente pasa de `anterior` a `nueva`
+    (cualquiera de las dos puede ser None: alta o baja).
+    """
+    if anterior == nueva:
+        return
+
+    cambios = {}
+    for fila, signo in ((anterior, -1), (nueva, 1)):
+        if fila is None:
+            continue
+        deltas = cambios.setdefault(fila['doctor_id'], {})
+        for columna in _columnas(fila):
+            deltas[columna] = deltas.get(columna, 0) + signo
+
+    for doctor_id, deltas in cambios.items():
+        _aplicar(doctor_id, deltas)
+    _registrar_cambio_diario(anterior, nueva)
+
+
+def reconstruir(doctor_ids=None):
+    """
+    Recalcula desde cero las estadísticas (de todos o de los doctores indicados).
+    Devuelve el número de doctores actualizados.
+    """
+    pacientes = Paciente.objects.exclude(doctor=None)
+    if doctor_ids is not None:
+        pacientes = pacientes.filter(doctor_id__in=doctor_ids)
+
+    conteos = {}
+    for campo in ('riesgo', 'sexo', 'puntuacion_stopbang'):
+        for item in pacientes.values('doctor_id', campo).annotate(total=Count('pk')).order_by():
+            fila = {'doctor_id': item['doctor_id'], 'riesgo': None, 'sexo': None, 'puntuacion_stopbang': None}
+            fila[campo] = item[campo]
+            deltas = conteos.setdefault(item['doctor_id'], {})
+            for columna in _columnas(fila):
+                # 'total' se cuenta una sola vez (con el agrupado por riesgo)
+                if columna == 'total' and campo != 'riesgo':
+                    continue
+                deltas[columna] = deltas.get(columna, 0) + item['total']
+
+    with transaction.atomic():
+        existentes = EstadisticaDoctor.objects.all()
+        if doctor_ids is not None:
+            existentes = existentes.filter(doctor_id__in=doctor_ids)
+        existentes.delete()
+        EstadisticaDoctor.objects.bulk_create(
+            EstadisticaDoctor(doctor_id=doctor_id, **deltas) for doctor_id, deltas in conteos.items()
+        )
+    reconstruir_diarias(doctor_ids)
+    return len(conteos)
+
+
+def obtener(doctor):
+    """Fila de estadísticas del doctor; si aún no existe se calcula."""
+    estadistica = EstadisticaDoctor.objects.filter(doctor=doctor).first()
+    if estadistica is None:
+        reconstruir([doctor.pk])
+        estadistica = EstadisticaDoctor.objects.filter(doctor=doctor).first() or EstadisticaDoctor(doctor=doctor)
+    return estadistica
+
+
+def datos_graficas(estadistica):
+    """Convierte la fila en los diccionarios que usa graficas.html."""
+    riesgo_data = {riesgo: getattr(estadistica, columna) for riesgo, columna in COLUMNA_RIESGO.items()}
+    sexo_data = {
+        'Masculino': estadistica.sexo_m,
+        'Femenino': estadistica.sexo_f,
+    }
+    puntuacion_data = {str(p): getattr(estadistica, f'puntuacion_{p}') for p in PUNTUACIONES}
+    return riesgo_data, sexo_data, puntuacion_data
+
+
+# ============================
+# Estadísticas diarias (tendencias)
+# ============================
+AGRUPACIONES = ('dia', 'semana', 'mes')
+SEXOS = {'M': 'Masculino', 'F': 'Femenino'}
+
+
+def dia_de(fecha):
+    """Día (en TIME_ZONE) de una fecha de registro."""
+    return timezone.localdate(fecha) if timezone.is_aware(fecha) else fecha.date()
+
+
+def _clave_diaria(fila):
+    return (fila['doctor_id'], dia_de(fila['fecha_registro']), fila['riesgo'] or '', fila['sexo'] or '')
+
+
+def _registrar_cambio_diario(anterior, nueva):
+    """Resta la fila anterior y suma la nueva en EstadisticaDiaria."""
+    deltas = {}
+    for fila, signo in ((anterior, -1), (nueva, 1)):
+        if fila is None or fila['doctor_id'] is None or fila['fecha_registro'] is None:
+            continue
+        clave = _clave_diaria(fila)
+        deltas[clave] = deltas.get(clave, 0) + signo
+
+    for (doctor_id, dia, riesgo, sexo), n in deltas.items():
+        if not n:
+            continue
+        filtro = {'doctor_id': doctor_id, 'fecha': dia, 'riesgo': riesgo, 'sexo': sexo}
+        EstadisticaDiaria.objects.get_or_create(**filtro)
+        EstadisticaDiaria.objects.filter(**filtro).update(total=F('total') + n)
+
+
+def _inicio_del_dia(dia):
+    inicio = datetime.datetime.combine(dia, datetime.time.min)
+    return timezone.make_aware(inicio) if settings.USE_TZ else inicio
+
+
+def reconstruir_diarias(doctor_ids=None, desde=None, hasta=None):
+    """
+    Recalcula EstadisticaDiaria (todos los días o solo de `desde` a `hasta`,
+    de todos o de los doctores indicados). Devuelve el número de filas creadas.
+    """
+    pacientes = Paciente.objects.exclude(doctor=None)
+    existentes = EstadisticaDiaria.objects.all()
+    if doctor_ids is not None:
+        pacientes = pacientes.filter(doctor_id__in=doctor_ids)
+        existentes = existentes.filter(doctor_id__in=doctor_ids)
+    if desde is not None:
+        pacientes = pacientes.filter(fecha_registro__gte=_inicio_del_dia(desde))
+        existentes = existentes.filter(fecha__gte=desde)
+    if hasta is not None:
+        pacientes = pacientes.filter(fecha_registro__lt=_inicio_del_dia(hasta + datetime.timedelta(days=1)))
+        existentes = existentes.filter(fecha__lte=hasta)
+
+    conteos = {}
+    for fila in pacientes.values('doctor_id', 'riesgo', 'sexo', 'fecha_registro').order_by().iterator():
+        clave = _clave_diaria(fila)
+        conteos[clave] = conteos.get(clave, 0) + 1
+
+    with transaction.atomic():
+        existentes.delete()
+        EstadisticaDiaria.objects.bulk_create(
+            (
+                EstadisticaDiaria(doctor_id=doctor_id, fecha=dia, riesgo=riesgo, sexo=sexo, total=total)
+                for (doctor_id, dia, riesgo, sexo), total in conteos.items()
+            ),
+            batch_size=1000,
+        )
+    return len(conteos)
+
+
+def numero_periodos(desde, hasta, agrupar):
+    """Puntos que tendría cada serie al agrupar el rango por `agrupar`."""
+    if agrupar == 'mes':
+        return (hasta.year - desde.year) * 12 + hasta.month - desde.month + 1
+    dias = (hasta - _inicio_periodo(desde, agrupar)).days
+    return dias // (7 if agrupar == 'semana' else 1) + 1
+
+
+def agrupacion_para(desde, hasta, pedida=None):
+    """
+    Agrupación de las tendencias.
+    - Sin `pedida`, según el largo del rango (a lo más ~100 puntos por serie).
+    - La pedida se respeta mientras no pase de TENDENCIAS_PUNTOS_MAX puntos;
+      si pasa, se usa la siguiente más gruesa (día -> semana -> mes).
+    """
+    if pedida is None:
+        dias = (hasta - desde).days + 1
+        if dias <= 92:
+            return 'dia'
+        if dias <= 731:
+            return 'semana'
+        return 'mes'
+
+    maximo = getattr(settings, 'TENDENCIAS_PUNTOS_MAX', 1000)
+    for agrupar in AGRUPACIONES[AGRUPACIONES.index(pedida):]:
+        if numero_periodos(desde, hasta, agrupar) <= maximo:
+            return agrupar
+    return 'mes'
+
+
+def _inicio_periodo(dia, agrupar):
+    if agrupar == 'semana':
+        return dia - datetime.timedelta(days=dia.weekday())
+    if agrupar == 'mes':
+        return dia.replace(day=1)
+    return dia
+
+
+def _periodos(desde, hasta, agrupar):
+    """Primer día de cada periodo entre `desde` y `hasta` (incluye periodos vacíos)."""
+    periodo = _inicio_periodo(desde, agrupar)
+    while periodo <= hasta:
+        yield periodo
+        if agrupar == 'mes':
+            periodo = (periodo + datetime.timedelta(days=32)).replace(day=1)
+        else:
+            periodo += datetime.timedelta(days=7 if agrupar == 'semana' else 1)
+
+
+def tendencias(doctor, desde, hasta, agrupar='dia'):
+    """
+    Pacientes registrados por periodo entre `desde` y `hasta` (fechas incluidas).
+    Una sola consulta sobre EstadisticaDiaria (índice doctor + fecha); nunca lee pacientes.
+    Devuelve {'periodos': [...], 'riesgo': {riesgo: [...]}, 'sexo': {sexo: [...]}, 'total': [...]}.
+    """
+    periodo = {'dia': F('fecha'), 'semana': TruncWeek('fecha'), 'mes': TruncMonth('fecha')}[agrupar]
+    filas = (
+        EstadisticaDiaria.objects.filter(doctor=doctor, fecha__range=(desde, hasta))
+        .annotate(periodo=periodo)
+        .values('periodo', 'riesgo', 'sexo')
+        .annotate(n=Sum('total'))
+        .order_by()
+    )
+
+    periodos = list(_periodos(desde, hasta, agrupar))
+    posicion = {p: i for i, p in enumerate(periodos)}
+    riesgo = {r: [0] * len(periodos) for r in COLUMNA_RIESGO}
+    sexo = {nombre: [0] * len(periodos) for nombre in SEXOS.values()}
+    total = [0] * len(periodos)
+    for fila in filas:
+        dia = fila['periodo']
+        i = posicion[dia.date() if isinstance(dia, datetime.datetime) else dia]
+        total[i] += fila['n']
+        if fila['riesgo'] in riesgo:
+            riesgo[fila['riesgo']][i] += fila['n']
+        if fila['sexo'] in SEXOS:
+            sexo[SEXOS[fila['sexo']]][i] += fila['n']
+
+    return {
+        'periodos': [p.isoformat() for p in periodos],
+        'riesgo': riesgo,
+        'sexo': sexo,
+        'total': total,
+    }
+
@@ -0,0 +1,235 @@
+# ==========================================
+# Archivos estáticos con huella y precomprimidos
+# Incluye:
+#   - AlmacenComprimido: collectstatic escribe nombres con el hash del contenido
+#     (estilos.3f2a9c1b7d4e.css) y variantes .br / .gz de los archivos de texto
+#   - EstaticosMiddleware: sirve STATIC_ROOT desde la app (sin DEBUG)
+#     · archivos con hash: caché de un año (immutable)
+#     · el resto: caché corta con ETag / Last-Modified (304)
+#     · elige la variante .br o .gz según Accept-Encoding
+# Así una visita repetida no vuelve a descargar CSS ni imágenes.
+# ==========================================
+import gzip
+import asyncio
+import json
+import mimetypes
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+# Solo se comprimen formatos de texto (PNG, JPG, WebP y WOFF ya vienen comprimidos)
+EXTENSIONES_COMPRIMIBLES = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.xml', '.map', '.ico', '.ttf', '.otf')
+
+# (codificación de Accept-Encoding, extensión), en orden de preferencia
+VARIANTES = (('br', '.br'), ('gzip', '.gz'))
+
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+
+
+# ============================
+# Compresión (collectstatic)
+# ============================
+def comprimir_gzip(datos):
+    """gzip con zopfli si está instalado (~5% menor), si no con zlib nivel 9."""
+    try:
+        import zopfli.gzip
+    except ImportError:
+        return gzip.compress(datos, compresslevel=9, mtime=0)
+    return zopfli.gzip.compress(datos)
+
+
+def comprimir_brotli(datos):
+    """Brotli calidad 11, o None si el paquete Brotli no está instalado."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(datos, quality=11)
+
+
+class AlmacenComprimido(ManifestStaticFilesStorage):
+    """
+    STATICFILES_STORAGE de producción.
+    - Nombres con hash del contenido ({% static %} los usa sin DEBUG).
+    - Junto a cada archivo de texto guarda .br y .gz si resultan más chicos.
+    """
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        # Originales y nombres con hash finales (los de pasadas intermedias ya no existen)
+        nombres = set(paths) | set(self.hashed_files.values())
+        for nombre in sorted(nombres):
+            if nombre.endswith(EXTENSIONES_COMPRIMIBLES) and self.exists(nombre):
+                for variante in self._comprimir(nombre):
+                    yield nombre, variante, True
+
+    def _comprimir(self, nombre):
+        """Escribe las variantes comprimidas de `nombre`; devuelve sus nombres."""
+        with self.open(nombre) as archivo:
+            datos = archivo.read()
+        escritas = []
+        for extension, comprimir in (('.gz', comprimir_gzip), ('.br', comprimir_brotli)):
+            comprimido = comprimir(datos)
+            if comprimido is None or len(comprimido) >= len(datos) * 0.95:
+                continue
+            with open(self.path(nombre + extension), 'wb') as destino:
+                destino.write(comprimido)
+            escritas.append(nombre + extension)
+        return escritas
+
+    def stored_name(self, name):
+        """
+        Un archivo que no existe se enlaza con su nombre original
+        (el navegador recibe 404) en lugar de romper la página con un error 500.
+        """
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+# ============================
+# Servir STATIC_ROOT
+# ============================
+def codificaciones_aceptadas(cabecera):
+    """Codificaciones de Accept-Encoding con q > 0: 'gzip, br;q=0' -> {'gzip'}."""
+    aceptadas = set()
+    for parte in (cabecera or '').lower().split(','):
+        nombre, _, parametros = parte.partition(';')
+        parametros = parametros.replace(' ', '')
+        try:
+            calidad = float(parametros[2:]) if parametros.startswith('q=') else 1.0
+        except ValueError:
+            calidad = 0.0
+        if nombre.strip() and calidad > 0:
+            aceptadas.add(nombre.strip())
+    if '*' in aceptadas:
+        aceptadas.update(codificacion for codificacion, _ in VARIANTES)
+    return aceptadas
+
+
+class ArchivoEstatico:
+    """Un archivo de STATIC_ROOT y sus variantes comprimidas (metadatos leídos una vez)."""
+    def __init__(self, ruta, inmutable):
+        info = os.stat(ruta)
+        self.ruta = ruta
+        self.modificado = int(info.st_mtime)
+        self.etag = f'{self.modificado:x}-{info.st_size:x}'
+        self.tipo = mimetypes.guess_type(ruta)[0] or 'application/octet-stream'
+        if self.tipo.startswith('text/') or self.tipo in ('application/javascript', 'image/svg+xml'):
+            self.tipo += '; charset=utf-8'
+        self.cache_control = CACHE_INMUTABLE if inmutable else (
+            f'public, max-age={getattr(settings, "ESTATICOS_MAX_AGE", 60)}'
+        )
+        self.variantes = [
+            (codificacion, ruta + extension)
+            for codificacion, extension in VARIANTES if os.path.isfile(ruta + extension)
+        ]
+
+    def respuesta(self, request):
+        """FileResponse de la mejor variante aceptada (o 304 si el navegador ya la tiene)."""
+        aceptadas = codificaciones_aceptadas(request.META.get('HTTP_ACCEPT_ENCODING'))
+        codificacion, ruta = next(
+            ((c, r) for c, r in self.variantes if c in aceptadas), (None, self.ruta)
+        )
+        etag = quote_etag(f'{self.etag}-{codificacion}' if codificacion else self.etag)
+
+        response = get_conditional_response(request, etag=etag, last_modified=self.modificado)
+        if response is None:
+            response = FileResponse(open(ruta, 'rb'), content_type=self.tipo)
+            response.headers.pop('Content-Disposition', None)
+            if codificacion:
+                response['Content-Encoding'] = codificacion
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(self.modificado)
+        response['Cache-Control'] = self.cache_control
+        if self.variantes:
+            response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+class EstaticosMiddleware:
+    """
+    Responde las peticiones a STATIC_URL con los archivos de STATIC_ROOT
+    antes de la sesión y la autenticación (no toca la base de datos).
+    - Con DEBUG runserver ya sirve los estáticos: el middleware no se usa.
+    - ESTATICOS_SERVIR=0 si los sirve el servidor web (nginx, PythonAnywhere).
+    - Funciona en modo sync (gunicorn) y async (uvicorn): bajo ASGI no obliga
+      a Django a pasar cada petición por async_to_sync.
+    - El índice de archivos se arma una vez por proceso (los archivos
+      cambian solo con collectstatic, que va seguido de reiniciar).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        prefijo = settings.STATIC_URL or ''
+        if settings.DEBUG or not getattr(settings, 'ESTATICOS_SERVIR', True) or not prefijo.startswith('/'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefijo = prefijo
+        self._archivos = None
+        self._candado = threading.Lock()
+        self._es_async = asyncio.iscoroutinefunction(get_response)
+        if self._es_async:
+            # Así Django reconoce el middleware como corrutina (igual que MiddlewareMixin)
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self._es_async:
+            return self.__acall__(request)
+        response = self.estatico(request)
+        return response if response is not None else self.get_response(request)
+
+    async def __acall__(self, request):
+        response = self.estatico(request)
+        return response if response is not None else await self.get_response(request)
+
+    def estatico(self, request):
+        """Respuesta del archivo pedido, o None si la petición no es de un estático."""
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefijo):
+            archivo = self.archivos().get(request.path_info[len(self.prefijo):])
+            if archivo is not None:
+                return archivo.respuesta(request)
+        return None
+
+    def archivos(self):
+        """{nombre relativo: ArchivoEstatico} de todo STATIC_ROOT."""
+        with self._candado:
+            if self._archivos is None:
+                self._archivos = indexar(settings.STATIC_ROOT)
+            return self._archivos
+
+
+def indexar(raiz):
+    """
+    Recorre STATIC_ROOT. Los nombres con hash (valores del manifiesto
+    de collectstatic) se marcan como inmutables.
+    """
+    raiz = str(raiz or '')
+    if not os.path.isdir(raiz):
+        return {}
+
+    con_hash = set()
+    manifiesto = os.path.join(raiz, ManifestStaticFilesStorage.manifest_name)
+    if os.path.isfile(manifiesto):
+        with open(manifiesto, encoding='utf-8') as archivo:
+            con_hash = set(json.load(archivo).get('paths', {}).values())
+
+    archivos = {}
+    for carpeta, _, nombres in os.walk(raiz):
+        for nombre in nombres:
+            if nombre.endswith(tuple(extension for _, extension in VARIANTES)):
+                continue
+            ruta = os.path.join(carpeta, nombre)
+            relativo = os.path.relpath(ruta, raiz).replace(os.sep, '/')
+            archivos[relativo] = ArchivoEstatico(ruta, relativo in con_hash)
+    return archivos
@@ -0,0 +1,165 @@
+# ==========================================
+# Exportación de pacientes para investigación
+# Incluye:
+#   - filtrar: pacientes por doctor, riesgo y sexo
+#   - iterar_csv / iterar_ndjson / iterar_parquet: generadores de bytes
+# Los pacientes se leen por bloques con paginación por clave (pk > último
+# LIMIT n) y cada bloque se envía en cuanto está listo: la memoria no depende
+# del tamaño de la tabla. (.iterator() no basta: PyMySQL usa un cursor con
+# búfer y carga todo el resultado antes de entregar la primera fila.)
+# Parquet requiere pyarrow (está en requirements.txt).
+# ==========================================
+import csv
+import json
+import importlib.util
+
+from .models import Paciente
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Columnas exportadas (en este orden)
+CAMPOS = (
+    'id', 'doctor__username', 'nombres', 'apellidos', 'edad', 'sexo',
+    'estatura', 'peso', 'cuello', 'imc',
+    'ronca', 'cansado', 'observado', 'presion_alta',
+    'puntuacion_stopbang', 'riesgo',
+)
+COLUMNAS = tuple('doctor' if campo == 'doctor__username' else campo for campo in CAMPOS)
+
+TAMANO_BLOQUE = 2000
+
+
+def filtrar(doctor=None, riesgo=None, sexo=None):
+    """Pacientes a exportar; doctor es el nombre de usuario."""
+    pacientes = Paciente.objects.order_by('pk')
+    if doctor:
+        pacientes = pacientes.filter(doctor__username=doctor)
+    if riesgo:
+        pacientes = pacientes.filter(riesgo=riesgo)
+    if sexo:
+        pacientes = pacientes.filter(sexo=sexo)
+    return pacientes
+
+
+def _bloques(pacientes, tamano_bloque):
+    """
+    Listas de hasta tamano_bloque filas (tuplas de CAMPOS) en orden de ID.
+    Una consulta por bloque que continúa después del último ID enviado.
+    """
+    pacientes = pacientes.order_by('pk').values_list(*CAMPOS)
+    ultimo = None
+    while True:
+        consulta = pacientes if ultimo is None else pacientes.filter(pk__gt=ultimo)
+        bloque = list(consulta[:tamano_bloque])
+        if bloque:
+            yield bloque
+        if len(bloque) < tamano_bloque:
+            return
+        ultimo = bloque[-1][CAMPOS.index('id')]
+
+
+class _Buffer:
+    """Archivo de solo escritura que acumula lo escrito hasta que se vacía."""
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+        self.closed = False
+
+    def write(self, datos):
+        if isinstance(datos, str):
+            datos = datos.encode('utf-8')
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def iterar_csv(pacientes, tamano_bloque=TAMANO_BLOQUE):
+    """CSV con encabezado (UTF-8 con BOM para que Excel respete los acentos)."""
+    buffer = _Buffer()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')
+    escritor.writerow(COLUMNAS)
+    for bloque in _bloques(pacientes, tamano_bloque):
+        escritor.writerows(bloque)
+        yield buffer.vaciar()
+    yield buffer.vaciar()
+
+
+def iterar_ndjson(pacientes, tamano_bloque=TAMANO_BLOQUE):
+    """Un objeto JSON por línea."""
+    for bloque in _bloques(pacientes, tamano_bloque):
+        yield ''.join(
+            json.dumps(dict(zip(COLUMNAS, fila)), ensure_ascii=False) + '\n' for fila in bloque
+        ).encode('utf-8')
+
+
+def _esquema_parquet(pa):
+    """Tipos de Arrow según los campos del modelo."""
+    tipos = {
+        'CharField': pa.string(),
+        'FloatField': pa.float64(),
+        'PositiveIntegerField': pa.int64(),
+        'BooleanField': pa.bool_(),
+    }
+    columnas = []
+    for campo, columna in zip(CAMPOS, COLUMNAS):
+        if campo == 'doctor__username':
+            columnas.append(pa.field(columna, pa.string()))
+        else:
+            tipo = Paciente._meta.get_field(campo).get_internal_type()
+            columnas.append(pa.field(columna, tipos.get(tipo, pa.string())))
+    return pa.schema(columnas)
+
+
+def iterar_parquet(pacientes, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Parquet columnar: cada bloque de filas se escribe como un row group
+    y se envía enseguida. Requiere pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError('Para exportar Parquet instale pyarrow (pip install pyarrow).')
+
+    esquema = _esquema_parquet(pa)
+    buffer = _Buffer()
+    with pq.ParquetWriter(pa.PythonFile(buffer, mode='w'), esquema, compression='snappy') as escritor:
+        for bloque in _bloques(pacientes, tamano_bloque):
+            columnas = list(zip(*bloque))
+            escritor.write_table(pa.Table.from_arrays(
+                [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, esquema)],
+                schema=esquema,
+            ))
+            yield buffer.vaciar()
+    yield buffer.vaciar()
+
+
+def iterar(formato, pacientes, tamano_bloque=TAMANO_BLOQUE):
+    """Generador de bytes para el formato pedido (csv, ndjson o parquet)."""
+    generadores = {'csv': iterar_csv, 'ndjson': iterar_ndjson, 'parquet': iterar_parquet}
+    if formato not in generadores:
+        raise ValueError(f'Formato no soportado: {formato}. Use csv, ndjson o parquet.')
+    if formato == 'parquet':
+        # Verifica pyarrow antes de empezar a responder
+        if importlib.util.find_spec('pyarrow') is None:
+            raise ValueError('Para exportar Parquet instale pyarrow (pip install pyarrow).')
+    return generadores[formato](pacientes, tamano_bloque)
@@ -5,11 +5,17 @@
 #   - DoctorRegisterForm: para registrar doctores
 #   - DoctorLoginForm: para inicio de sesión de doctores
 #   - RestablecerContrasenaForm: para recuperación de contraseña
+#   - ImportarPacientesForm: para la importación masiva desde el admin
+#   - TendenciasForm: rango de fechas de las gráficas de tendencias
 # ==========================================
+import datetime
+
 from django import forms
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from .models import Paciente, PerfilDoctor
+from .doctores import CampoDoctor
 
 # ============================
 # Formulario Paciente
@@ -19,8 +25,8 @@ class PacienteForm(forms.ModelForm):
     Formulario basado en el modelo Paciente.
     Incluye selección de doctor y personalización de campos.
     """
-    doctor = forms.ModelChoiceField(
-        queryset=User.objects.filter(groups__name="Doctores"),  
+    # Lista de doctores en caché con <option> ya renderizadas (ver doctores.py)
+    doctor = CampoDoctor(
         required=False,
         label="Doctor asignado"
     )
@@ -144,3 +150,66 @@ class RestablecerContrasenaForm(forms.Form):
             raise ValidationError("El NIP debe tener exactamente 5 caracteres.")
         return nip
 
+# ============================
+# Gráficas de tendencias
+# ============================
+class TendenciasForm(forms.Form):
+    """
+    Rango de fechas (GET) de las tendencias.
+    Sin agrupación se elige una según el largo del rango; si la elegida daría
+    más de TENDENCIAS_PUNTOS_MAX puntos se usa una más gruesa (ver estadisticas.agrupacion_para).
+    """
+    desde = forms.DateField(
+        label='Desde', required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}, format='%Y-%m-%d'),
+    )
+    hasta = forms.DateField(
+        label='Hasta', required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}, format='%Y-%m-%d'),
+    )
+    agrupar = forms.ChoiceField(
+        label='Agrupar por', required=False,
+        choices=[('', 'Automático'), ('dia', 'Día'), ('semana', 'Semana'), ('mes', 'Mes')],
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+
+    # Fechas aceptadas: desde FECHA_MINIMA hasta un año después de hoy
+    FECHA_MINIMA = datetime.date(2000, 1, 1)
+
+    def _fecha_en_rango(self, campo):
+        fecha = self.cleaned_data.get(campo)
+        maxima = timezone.localdate() + datetime.timedelta(days=366)
+        if fecha and not self.FECHA_MINIMA <= fecha <= maxima:
+            raise ValidationError(
+                f'La fecha debe estar entre el {self.FECHA_MINIMA:%d/%m/%Y} y el {maxima:%d/%m/%Y}.'
+            )
+        return fecha
+
+    def clean_desde(self):
+        return self._fecha_en_rango('desde')
+
+    def clean_hasta(self):
+        return self._fecha_en_rango('hasta')
+
+    def clean(self):
+        datos = super().clean()
+        if datos.get('desde') and datos.get('hasta') and datos['desde'] > datos['hasta']:
+            raise ValidationError('La fecha inicial debe ser anterior o igual a la final.')
+        return datos
+
+# ============================
+# Importación masiva (admin)
+# ============================
+class ImportarPacientesForm(forms.Form):
+    """
+    Formulario del admin para subir un CSV o Excel de pacientes.
+    """
+    archivo = forms.FileField(
+        label='Archivo CSV o Excel (.xlsx)',
+        help_text='La primera fila debe tener los nombres de los campos: id, nombres, apellidos, edad, ...',
+    )
+    doctor = forms.ModelChoiceField(
+        queryset=User.objects.filter(groups__name="Doctores"),
+        required=False,
+        label="Doctor asignado a todos los pacientes",
+    )
@@ -0,0 +1,172 @@
+# ==========================================
+# Derivados de imágenes (Pillow)
+# Incluye:
+#   - generar: WebP y PNG optimizado a los anchos de DERIVADOS y el logo
+#     de impresión de los pases; los escribe en static/img/derivados/ con
+#     el índice derivados.json (comando generar_imagenes, antes de collectstatic)
+#   - variantes / ruta_impresion: lo que usan {% imagen %} y pdf.py
+#   - reducir_png: imagen reducida como PNG optimizado
+# Si los derivados no existen, todo usa la imagen original.
+# ==========================================
+import io
+import os
+import json
+import threading
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+from PIL import Image
+
+CARPETA = 'img/derivados'
+INDICE = f'{CARPETA}/derivados.json'
+
+# Anchos (px) de cada imagen: el que ocupa en la página y el doble (pantallas 2x)
+DERIVADOS = {
+    'img/imgpaciente3.png': (120, 240),
+    'img/imgdoctor2.png': (150, 300),
+}
+
+# Logos de impresión: en el pase se dibujan a 100px CSS (~1 pulgada),
+# así que ~300px bastan para imprimir a 300 ppp
+IMPRESION = ('img/hospital.png',)
+ANCHO_IMPRESION = 300
+
+CALIDAD_WEBP = 80
+
+
+def ruta_estatico(ruta):
+    """
+    Busca un archivo estático primero en STATIC_ROOT (producción, tras collectstatic)
+    y si no existe, en las carpetas static de las apps.
+    """
+    ruta_root = os.path.join(settings.STATIC_ROOT, ruta)
+    if os.path.exists(ruta_root):
+        return ruta_root
+    return finders.find(ruta) or ruta_root
+
+
+# ============================
+# Generación
+# ============================
+def _preparar(imagen):
+    """
+    Quita el canal alfa si es totalmente opaco.
+    Devuelve (imagen, es_paleta): es_paleta si el original tiene 256 colores o menos
+    (logos e ilustraciones), que se pueden guardar como PNG con paleta.
+    """
+    if imagen.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        imagen = imagen.convert('RGBA')
+    if imagen.mode in ('RGBA', 'LA') and imagen.getchannel('A').getextrema()[0] == 255:
+        imagen = imagen.convert(imagen.mode[:-1])
+    return imagen, imagen.getcolors(256) is not None
+
+
+def _reducir(imagen, ancho):
+    """Copia de la imagen con a lo más `ancho` px de ancho (sin ampliar)."""
+    copia = imagen.copy()
+    if copia.width > ancho:
+        copia = copia.resize((ancho, round(copia.height * ancho / copia.width)), Image.LANCZOS)
+    return copia
+
+
+def _png(imagen, es_paleta):
+    """PNG optimizado; con paleta de 256 colores si el original ya la tenía."""
+    if es_paleta and imagen.mode in ('RGB', 'RGBA'):
+        metodo = Image.Quantize.FASTOCTREE if imagen.mode == 'RGBA' else Image.Quantize.MEDIANCUT
+        imagen = imagen.quantize(256, method=metodo)
+    salida = io.BytesIO()
+    imagen.save(salida, format='PNG', optimize=True)
+    return salida.getvalue()
+
+
+def _webp(imagen):
+    salida = io.BytesIO()
+    imagen.save(salida, format='WEBP', quality=CALIDAD_WEBP, method=6)
+    return salida.getvalue()
+
+
+def reducir_png(datos, ancho_maximo=ANCHO_IMPRESION):
+    """Imagen (bytes) reducida dentro de un cuadro de `ancho_maximo` px, como PNG optimizado."""
+    with Image.open(io.BytesIO(datos)) as imagen:
+        imagen, es_paleta = _preparar(imagen)
+        imagen.thumbnail((ancho_maximo, ancho_maximo), Image.LANCZOS)
+        return _png(imagen, es_paleta)
+
+
+def generar(destino):
+    """
+    Escribe los derivados bajo `destino` (carpeta static) y el índice derivados.json.
+    Devuelve el índice: {'imagenes': {original: [variantes]}, 'impresion': {original: ruta}}.
+    """
+    archivos = {}
+    indice = {'imagenes': {}, 'impresion': {}}
+
+    for original, anchos in DERIVADOS.items():
+        nombre = os.path.splitext(os.path.basename(original))[0]
+        with Image.open(ruta_estatico(original)) as abierta:
+            imagen, es_paleta = _preparar(abierta)
+        variantes = []
+        for ancho in anchos:
+            reducida = _reducir(imagen, ancho)
+            base = f'{CARPETA}/{nombre}-{reducida.width}'
+            archivos[base + '.webp'] = _webp(reducida)
+            archivos[base + '.png'] = _png(reducida, es_paleta)
+            variantes.append({
+                'ancho': reducida.width, 'alto': reducida.height,
+                'webp': base + '.webp', 'png': base + '.png',
+            })
+        indice['imagenes'][original] = variantes
+
+    for original in IMPRESION:
+        nombre = os.path.splitext(os.path.basename(original))[0]
+        with open(ruta_estatico(original), 'rb') as archivo:
+            ruta = f'{CARPETA}/{nombre}-impresion.png'
+            archivos[ruta] = reducir_png(archivo.read())
+        indice['impresion'][original] = ruta
+
+    archivos[INDICE] = json.dumps(indice, indent=2, sort_keys=True).encode()
+    for ruta, datos in archivos.items():
+        completa = os.path.join(destino, *ruta.split('/'))
+        os.makedirs(os.path.dirname(completa), exist_ok=True)
+        with open(completa, 'wb') as salida:
+            salida.write(datos)
+    limpiar()
+    return indice
+
+
+# ============================
+# Consulta (plantillas y PDF)
+# ============================
+_indice = None
+_candado = threading.Lock()
+
+
+def indice():
+    """derivados.json leído una vez por proceso ({} si no se han generado)."""
+    global _indice
+    with _candado:
+        if _indice is None:
+            try:
+                with open(ruta_estatico(INDICE), encoding='utf-8') as archivo:
+                    _indice = json.load(archivo)
+            except (OSError, ValueError):
+                _indice = {}
+        return _indice
+
+
+def limpiar():
+    """Vuelve a leer el índice en la siguiente consulta."""
+    global _indice
+    with _candado:
+        _indice = None
+
+
+def variantes(original):
+    """[{ancho, alto, webp, png}] de una imagen, de menor a mayor ([] si no hay)."""
+    return sorted(indice().get('imagenes', {}).get(original, []), key=lambda variante: variante['ancho'])
+
+
+def ruta_impresion(original):
+    """Ruta estática del logo de impresión, o None si no se generó."""
+    return indice().get('impresion', {}).get(original)
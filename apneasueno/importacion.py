@@ -0,0 +1,216 @@
+# ==========================================
+# Importación masiva de pacientes (CSV / Excel)
+# Incluye:
+#   - leer_filas: lee el archivo fila por fila (sin cargarlo completo)
+#   - importar: valida con las reglas de PacienteForm, calcula STOP-BANG
+#     por bloques y guarda con bulk_create en transacciones
+# Las filas con errores se reportan y se saltan; no detienen la importación.
+# Excel (.xlsx) se lee con openpyxl (está en requirements.txt).
+# ==========================================
+import io
+import csv
+import os
+
+from django.db import transaction
+
+from . import cache_paginas, estadisticas, stopbang
+from .busqueda import clave_busqueda, guardar_palabras
+from .forms import PacienteForm
+from .models import Paciente
+
+PREGUNTAS = ('ronca', 'cansado', 'observado', 'presion_alta')
+
+VERDADERO = {'si', 'sí', 's', 'yes', 'y', 'true', '1', 'verdadero'}
+FALSO = {'no', 'n', 'false', '0', 'falso'}
+
+MAXIMO_ERRORES_GUARDADOS = 100
+
+
+class PacienteImportForm(PacienteForm):
+    """
+    Mismas reglas que PacienteForm, pero:
+    - El doctor se asigna a todo el archivo (no se valida por fila).
+    - La unicidad del ID se revisa por bloque con una sola consulta.
+    """
+    doctor = None
+
+    class Meta(PacienteForm.Meta):
+        fields = None
+        exclude = ['doctor']
+
+    def validate_unique(self):
+        pass
+
+
+class ResultadoImportacion:
+    """Resumen de una importación."""
+    def __init__(self):
+        self.leidas = 0
+        self.creados = 0
+        self.con_errores = 0
+        self.errores = []  # primeros (línea, mensaje) para mostrar
+
+    def agregar_error(self, linea, mensaje):
+        self.con_errores += 1
+        if len(self.errores) < MAXIMO_ERRORES_GUARDADOS:
+            self.errores.append((linea, mensaje))
+
+
+# ============================
+# Lectura de archivos
+# ============================
+def _leer_csv(archivo):
+    """Filas de un CSV (archivo binario). Acepta separador ',' o ';'."""
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;')
+    except csv.Error:
+        dialecto = csv.excel
+    try:
+        yield from csv.DictReader(texto, dialect=dialecto)
+    finally:
+        texto.detach()
+
+
+def _leer_excel(archivo):
+    """Filas de la primera hoja de un .xlsx (modo de solo lectura de openpyxl)."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('Para importar Excel instale openpyxl (pip install openpyxl).')
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezados = [str(c).strip() if c is not None else '' for c in next(filas, [])]
+        for valores in filas:
+            yield dict(zip(encabezados, valores))
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre):
+    """Devuelve un iterador de diccionarios según la extensión del archivo."""
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        return _leer_excel(archivo)
+    if extension in ('.csv', '.txt'):
+        return _leer_csv(archivo)
+    raise ValueError(f'Formato no soportado: {extension or nombre}. Use .csv o .xlsx')
+
+
+# ============================
+# Validación e inserción
+# ============================
+def _limpiar(fila):
+    """Normaliza una fila cruda: espacios, Sí/No y sexo."""
+    datos = {}
+    for campo, valor in fila.items():
+        if campo is None:
+            continue
+        campo = campo.strip().lower()
+        if isinstance(valor, str):
+            valor = valor.strip()
+        if campo in PREGUNTAS and isinstance(valor, str):
+            minuscula = valor.lower()
+            if minuscula in VERDADERO:
+                valor = 'True'
+            elif minuscula in FALSO:
+                valor = 'False'
+        if campo == 'sexo' and isinstance(valor, str) and valor:
+            valor = valor[0].upper()
+        datos[campo] = '' if valor is None else valor
+    return datos
+
+
+def _errores_texto(form):
+    return '; '.join(
+        f'{campo}: {" ".join(mensajes)}' if campo != '__all__' else ' '.join(mensajes)
+        for campo, mensajes in form.errors.items()
+    )
+
+
+def preparar_lote(pacientes):
+    """
+    Mismo cálculo que Paciente.save() (STOP-BANG y clave de búsqueda),
+    pero para todo el bloque a la vez; se usa antes de bulk_create.
+    """
+    columnas = {campo: [getattr(p, campo) for p in pacientes] for campo in stopbang.CAMPOS_ENTRADA}
+    imc, puntos, riesgo = stopbang.calcular_lote(columnas)
+    for i, paciente in enumerate(pacientes):
+        paciente.imc = None if imc[i] != imc[i] else float(imc[i])
+        paciente.puntuacion_stopbang = int(puntos[i])
+        paciente.riesgo = str(riesgo[i])
+        paciente.busqueda = clave_busqueda(paciente.id, paciente.nombres, paciente.apellidos)
+
+
+def _guardar_bloque(bloque, resultado, al_error):
+    """Descarta IDs ya existentes, calcula STOP-BANG del bloque e inserta."""
+    existentes = set(
+        Paciente.objects.filter(pk__in=[p.id for _, p in bloque]).values_list('pk', flat=True)
+    )
+    nuevos = []
+    for linea, paciente in bloque:
+        if paciente.id in existentes:
+            mensaje = f'id: ya existe un paciente con el ID {paciente.id}.'
+            resultado.agregar_error(linea, mensaje)
+            if al_error:
+                al_error(linea, mensaje)
+        else:
+            nuevos.append(paciente)
+    if not nuevos:
+        return
+
+    preparar_lote(nuevos)
+    with transaction.atomic():
+        Paciente.objects.bulk_create(nuevos)
+        guardar_palabras(nuevos, nuevos=True)
+    resultado.creados += len(nuevos)
+
+
+def importar(filas, doctor=None, tamano_bloque=1000, al_error=None):
+    """
+    Importa pacientes desde un iterador de diccionarios (columnas = campos del modelo).
+    - doctor: User asignado a todos los pacientes importados (opcional).
+    - al_error(linea, mensaje): se llama por cada fila rechazada.
+    Solo se mantiene en memoria un bloque de filas a la vez.
+    """
+    resultado = ResultadoImportacion()
+    bloque = []
+    vistos = set()  # IDs del bloque actual; los de bloques anteriores ya están en la BD
+
+    # La línea 1 es el encabezado
+    for linea, fila in enumerate(filas, start=2):
+        resultado.leidas += 1
+        form = PacienteImportForm(data=_limpiar(fila))
+        mensaje = None
+        if not form.is_valid():
+            mensaje = _errores_texto(form)
+        elif form.cleaned_data['id'] in vistos:
+            mensaje = f'id: el ID {form.cleaned_data["id"]} está repetido en el archivo.'
+
+        if mensaje:
+            resultado.agregar_error(linea, mensaje)
+            if al_error:
+                al_error(linea, mensaje)
+            continue
+
+        paciente = form.save(commit=False)
+        paciente.doctor = doctor
+        vistos.add(paciente.id)
+        bloque.append((linea, paciente))
+        if len(bloque) >= tamano_bloque:
+            _guardar_bloque(bloque, resultado, al_error)
+            bloque = []
+            vistos = set()
+
+    if bloque:
+        _guardar_bloque(bloque, resultado, al_error)
+
+    # bulk_create no dispara señales: se recalculan las estadísticas y la caché del doctor
+    if doctor is not None and resultado.creados:
+        estadisticas.reconstruir([doctor.pk])
+        cache_paginas.invalidar_doctores([doctor.pk])
+    return resultado
@@ -0,0 +1,186 @@
+# ==========================================
+# Límite de intentos de inicio de sesión y de restablecimiento de contraseña
+# Incluye:
+#   - Cubetas de fichas (token bucket) por usuario y por IP
+#   - AlmacenMemoria: por proceso (predeterminado)
+#   - AlmacenSQLite: archivo compartido por todos los workers (LIMITES_ALMACEN)
+#   - consumir: se llama ANTES de calcular cualquier hash de contraseña
+# Cada intento gasta una ficha de la cubeta del usuario y otra de la IP;
+# las fichas se recuperan poco a poco. Sin fichas, el intento se rechaza.
+# La IP sale del encabezado del proxy (LIMITES_IP_ENCABEZADO, ver ip_cliente).
+# ==========================================
+import math
+import time
+import random
+import sqlite3
+import threading
+
+from django.conf import settings
+
+# (capacidad, segundos para recuperar una ficha)
+REGLAS = {
+    'login': {
+        'usuario': (5, 60),       # 5 intentos seguidos, luego 1 por minuto
+        'ip': (20, 6),            # 20 intentos seguidos, luego 10 por minuto
+    },
+    'restablecer': {
+        'usuario': (3, 20 * 60),  # 3 intentos seguidos, luego 3 por hora
+        'ip': (10, 6 * 60),       # 10 intentos seguidos, luego 10 por hora
+    },
+}
+
+MAXIMO_CLAVES_MEMORIA = 50000
+
+
+class Resultado:
+    """Respuesta de consumir(): si se permite el intento y cuántos segundos esperar si no."""
+    def __init__(self, permitido, espera=0):
+        self.permitido = permitido
+        self.espera = espera
+
+    def __bool__(self):
+        return self.permitido
+
+    @property
+    def minutos(self):
+        return max(1, math.ceil(self.espera / 60))
+
+
+def _reglas(accion):
+    return {**REGLAS[accion], **getattr(settings, 'LIMITES_INTENTOS', {}).get(accion, {})}
+
+
+def _recargar(estado, regla, ahora):
+    """Fichas disponibles ahora según el estado guardado (fichas, instante)."""
+    capacidad, segundos = regla
+    if estado is None:
+        return float(capacidad)
+    fichas, instante = estado
+    return min(float(capacidad), fichas + max(0.0, ahora - instante) / segundos)
+
+
+def _tomar(estados, reglas, ahora):
+    """
+    Decide con los estados actuales de cada cubeta.
+    Devuelve (Resultado, nuevos estados). Solo se gastan fichas si todas las cubetas tienen.
+    """
+    fichas = {clave: _recargar(estados.get(clave), regla, ahora) for clave, regla in reglas.items()}
+    faltan = {clave: (1 - f) * reglas[clave][1] for clave, f in fichas.items() if f < 1}
+    if faltan:
+        return Resultado(False, max(faltan.values())), {c: (f, ahora) for c, f in fichas.items()}
+    return Resultado(True), {c: (f - 1, ahora) for c, f in fichas.items()}
+
+
+# ============================
+# Almacenes
+# ============================
+class AlmacenMemoria:
+    """Cubetas en un diccionario del proceso (cada worker de gunicorn lleva su cuenta)."""
+    def __init__(self):
+        self._estados = {}
+        self._candado = threading.Lock()
+
+    def consumir(self, reglas, ahora):
+        with self._candado:
+            resultado, nuevos = _tomar({c: self._estados.get(c) for c in reglas}, reglas, ahora)
+            self._estados.update(nuevos)
+            if len(self._estados) > MAXIMO_CLAVES_MEMORIA:
+                self._estados.clear()  # cubetas llenas de nuevo; evita crecer sin límite
+            return resultado
+
+    def limpiar(self):
+        with self._candado:
+            self._estados.clear()
+
+
+class AlmacenSQLite:
+    """
+    Cubetas en un archivo SQLite compartido por todos los procesos del servidor.
+    Cada intento es una transacción BEGIN IMMEDIATE (lectura y escritura atómicas).
+    """
+    def __init__(self, ruta):
+        self.ruta = str(ruta)
+        with self._conectar() as conexion:
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS cubetas (clave TEXT PRIMARY KEY, fichas REAL, instante REAL)'
+            )
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+
+    def consumir(self, reglas, ahora):
+        conexion = self._conectar()
+        try:
+            conexion.execute('BEGIN IMMEDIATE')
+            marcas = ','.join('?' * len(reglas))
+            filas = conexion.execute(
+                f'SELECT clave, fichas, instante FROM cubetas WHERE clave IN ({marcas})', list(reglas)
+            ).fetchall()
+            resultado, nuevos = _tomar({c: (f, i) for c, f, i in filas}, reglas, ahora)
+            conexion.executemany(
+                'INSERT OR REPLACE INTO cubetas (clave, fichas, instante) VALUES (?, ?, ?)',
+                [(c, f, i) for c, (f, i) in nuevos.items()],
+            )
+            if random.random() < 0.01:
+                # De vez en cuando se borran cubetas que ya estarían llenas
+                conexion.execute('DELETE FROM cubetas WHERE instante < ?', (ahora - 24 * 3600,))
+            conexion.execute('COMMIT')
+            return resultado
+        except BaseException:
+            if conexion.in_transaction:
+                conexion.execute('ROLLBACK')
+            raise
+        finally:
+            conexion.close()
+
+    def limpiar(self):
+        with self._conectar() as conexion:
+            conexion.execute('DELETE FROM cubetas')
+
+
+_almacen = None
+_candado = threading.Lock()
+
+
+def almacen():
+    """Almacén configurado: SQLite si LIMITES_ALMACEN tiene una ruta, si no en memoria."""
+    global _almacen
+    with _candado:
+        if _almacen is None:
+            ruta = getattr(settings, 'LIMITES_ALMACEN', None)
+            _almacen = AlmacenSQLite(ruta) if ruta else AlmacenMemoria()
+        return _almacen
+
+
+# ============================
+# Uso desde las vistas
+# ============================
+def ip_cliente(request):
+    """
+    IP del cliente.
+    - Detrás de un proxy (LIMITES_IP_ENCABEZADO) se usa el encabezado que agrega
+      el proxy: X-Real-IP en PythonAnywhere; en X-Forwarded-For la última dirección,
+      que es la que agregó el proxy y no el cliente.
+    - Sin encabezado configurado (o si no viene), REMOTE_ADDR.
+    """
+    encabezado = getattr(settings, 'LIMITES_IP_ENCABEZADO', '')
+    if encabezado:
+        valor = request.META.get('HTTP_' + encabezado.upper().replace('-', '_'), '')
+        if valor.strip():
+            return valor.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def consumir(accion, request, usuario):
+    """
+    Gasta un intento de `accion` ('login' o 'restablecer') para el usuario y la IP.
+    Devuelve un Resultado falso si alguna de las dos cubetas está vacía.
+    """
+    if not getattr(settings, 'LIMITES_ACTIVOS', True):
+        return Resultado(True)
+    reglas = _reglas(accion)
+    claves = {
+        f'{accion}:usuario:{(usuario or "").strip().lower()}': reglas['usuario'],
+        f'{accion}:ip:{ip_cliente(request)}': reglas['ip'],
+    }
+    return almacen().consumir(claves, time.time())
@@ -0,0 +1,39 @@
+# ==========================================
+# Comando: python manage.py exportar_pacientes --formato csv|ndjson|parquet [--salida archivo]
+#          [--doctor usuario] [--riesgo "Alto riesgo de AOS"] [--sexo M|F]
+# Escribe el extracto por bloques (memoria constante) en un archivo o en la salida estándar.
+# ==========================================
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apneasueno import exportacion
+
+
+class Command(BaseCommand):
+    help = 'Exporta pacientes (CSV, NDJSON o Parquet) para análisis de investigación.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', default='csv', choices=sorted(exportacion.FORMATOS))
+        parser.add_argument('--salida', help='Archivo de salida (por defecto, la salida estándar).')
+        parser.add_argument('--doctor', help='Usuario del doctor.')
+        parser.add_argument('--riesgo', help='Nivel de riesgo exacto, p. ej. "Alto riesgo de AOS".')
+        parser.add_argument('--sexo', choices=['M', 'F'])
+        parser.add_argument('--bloque', type=int, default=exportacion.TAMANO_BLOQUE, help='Filas por bloque.')
+
+    def handle(self, *args, **options):
+        pacientes = exportacion.filtrar(options['doctor'], options['riesgo'], options['sexo'])
+        try:
+            contenido = exportacion.iterar(options['formato'], pacientes, options['bloque'])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        if options['salida']:
+            with open(options['salida'], 'wb') as salida:
+                for parte in contenido:
+                    salida.write(parte)
+            self.stderr.write(self.style.SUCCESS(f'Extracto guardado en {options["salida"]}.'))
+        else:
+            for parte in contenido:
+                sys.stdout.buffer.write(parte)
+            sys.stdout.buffer.flush()
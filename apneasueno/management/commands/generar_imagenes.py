@@ -0,0 +1,39 @@
+# ==========================================
+# Comando: python manage.py generar_imagenes [--destino carpeta]
+# Genera los derivados de las imágenes (WebP y PNG optimizado por ancho,
+# logo de impresión de los pases) en apneasueno/static/img/derivados/.
+# Se corre al cambiar una imagen original, antes de collectstatic.
+# ==========================================
+import os
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from apneasueno import imagenes
+
+
+class Command(BaseCommand):
+    help = 'Genera las versiones reducidas (WebP/PNG) de las imágenes y el logo de impresión de los pases.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--destino', default=os.path.join(apps.get_app_config('apneasueno').path, 'static'),
+            help='Carpeta static donde escribir img/derivados/ (por defecto, la de la app).',
+        )
+
+    def handle(self, *args, **options):
+        indice = imagenes.generar(options['destino'])
+        for original, variantes in indice['imagenes'].items():
+            tamano = os.path.getsize(imagenes.ruta_estatico(original))
+            detalle = ', '.join(
+                f'{v["ancho"]}px {self._kb(options["destino"], v["webp"])}/{self._kb(options["destino"], v["png"])}'
+                for v in variantes
+            )
+            self.stdout.write(f'{original} ({tamano / 1024:.1f} KB) -> WebP/PNG: {detalle}')
+        for original, ruta in indice['impresion'].items():
+            self.stdout.write(f'{original} -> impresión {self._kb(options["destino"], ruta)}')
+        self.stdout.write(self.style.SUCCESS(f'Derivados escritos en {options["destino"]}.'))
+
+    @staticmethod
+    def _kb(destino, ruta):
+        return f'{os.path.getsize(os.path.join(destino, *ruta.split("/"))) / 1024:.1f} KB'
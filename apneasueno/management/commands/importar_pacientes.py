@@ -0,0 +1,43 @@
+# ==========================================
+# Comando: python manage.py importar_pacientes archivo.csv [--doctor usuario] [--bloque N]
+# Importa pacientes desde CSV o Excel (.xlsx) por bloques.
+# Las filas con errores se muestran y se saltan.
+# ==========================================
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apneasueno import importacion
+
+
+class Command(BaseCommand):
+    help = 'Importa pacientes desde un archivo CSV o Excel (.xlsx).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--doctor', help='Usuario del doctor asignado a todos los pacientes.')
+        parser.add_argument('--bloque', type=int, default=1000, help='Filas por transacción (por defecto 1000).')
+
+    def handle(self, *args, **options):
+        doctor = None
+        if options['doctor']:
+            try:
+                doctor = User.objects.get(username=options['doctor'])
+            except User.DoesNotExist:
+                raise CommandError(f'No existe el usuario {options["doctor"]}.')
+
+        def al_error(linea, mensaje):
+            self.stderr.write(f'Línea {linea}: {mensaje}')
+
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                filas = importacion.leer_filas(archivo, options['archivo'])
+                resultado = importacion.importar(
+                    filas, doctor=doctor, tamano_bloque=options['bloque'], al_error=al_error,
+                )
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.leidas} filas leídas: {resultado.creados} pacientes creados, '
+            f'{resultado.con_errores} con errores.'
+        ))
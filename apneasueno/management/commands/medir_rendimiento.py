@@ -0,0 +1,227 @@
+# ==========================================
+# Comando: python manage.py medir_rendimiento --settings=apnea.settings_benchmark
+#          [--doctores N] [--pacientes M] [--repeticiones R] [--salida archivo.json]
+#          [--comparar anterior.json] [--sin-sembrar] [--con-cache]
+# Siembra una base SQLite sintética y mide las vistas más usadas con el
+# cliente de pruebas de Django (sin red). Imprime JSON con rendimiento,
+# p50/p99 y consultas por vista, para comparar entre versiones.
+# Borra la base de datos: solo corre con settings que declaran BENCHMARK = True
+# (apnea/settings_benchmark.py) o con --confirmar-borrado.
+# ==========================================
+import json
+import time
+import datetime
+import random
+import platform
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apneasueno import cache_pdf, rendimiento
+from apneasueno.models import Paciente
+
+ESCENARIOS = (
+    'pacientes_doctor',
+    'pacientes_doctor_buscar',
+    'graficas_view',
+    'tendencias_view',
+    'admin_pacientes',
+    'admin_pacientes_doctor',
+    'generar_pdf',
+    'paciente_login_post',
+    'doctor_login_view_post',
+)
+
+
+class Command(BaseCommand):
+    help = 'Mide tiempos y consultas de las vistas principales sobre una base SQLite sintética.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctores', type=int, default=10, help='Doctores a sembrar (por defecto 10).')
+        parser.add_argument('--pacientes', type=int, default=500, help='Pacientes por doctor (por defecto 500).')
+        parser.add_argument('--repeticiones', type=int, default=50, help='Peticiones por vista (por defecto 50).')
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla de los datos y de las búsquedas.')
+        parser.add_argument('--escenario', action='append', choices=ESCENARIOS,
+                            help='Medir solo este escenario (se puede repetir).')
+        parser.add_argument('--salida', help='Archivo donde guardar el JSON (por defecto, la consola).')
+        parser.add_argument('--comparar', help='JSON de una medición anterior para calcular el cambio.')
+        parser.add_argument('--sin-sembrar', action='store_true', help='Reutiliza los datos ya sembrados.')
+        parser.add_argument('--con-cache', action='store_true',
+                            help='No vacía la caché de páginas ni de PDF entre peticiones.')
+        parser.add_argument('--confirmar-borrado', action='store_true',
+                            help='Permite correrlo con settings sin BENCHMARK = True (borra la base configurada).')
+
+    def handle(self, *args, **options):
+        rendimiento.verificar_base_desechable(options['confirmar_borrado'])
+
+        call_command('migrate', verbosity=0, interactive=False)
+        inicio = time.monotonic()
+        if options['sin_sembrar']:
+            doctores = list(rendimiento.doctores_sembrados())
+            if not doctores:
+                raise CommandError('No hay datos sembrados; ejecútelo sin --sin-sembrar.')
+        else:
+            call_command('flush', verbosity=0, interactive=False)
+            doctores = rendimiento.sembrar(options['doctores'], options['pacientes'], options['semilla'])
+        siembra = time.monotonic() - inicio
+
+        self.rng = random.Random(options['semilla'])
+        self.con_cache = options['con_cache']
+        self.doctores = doctores
+        self.pacientes = list(
+            Paciente.objects.filter(doctor__in=doctores).values_list('id', flat=True)[:1000]
+        )
+
+        resultados = {}
+        for nombre in options['escenario'] or ESCENARIOS:
+            self.stderr.write(f'Midiendo {nombre}...')
+            resultados[nombre] = self._medir(getattr(self, f'_{nombre}'), options['repeticiones'])
+
+        informe = {
+            'entorno': {
+                'doctores': len(doctores),
+                'pacientes': Paciente.objects.filter(doctor__in=doctores).count(),
+                'repeticiones': options['repeticiones'],
+                'siembra_s': round(siembra, 2),
+                'con_cache': self.con_cache,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'base_de_datos': connection.vendor,
+            },
+            'escenarios': resultados,
+        }
+        if options['comparar']:
+            self._comparar(informe, options['comparar'])
+
+        texto = json.dumps(informe, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as f:
+                f.write(texto + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Resultados guardados en {options["salida"]}'))
+        else:
+            self.stdout.write(texto)
+
+    # ============================
+    # Medición
+    # ============================
+    def _medir(self, escenario, repeticiones):
+        """Una petición de calentamiento y luego `repeticiones` medidas."""
+        escenario()
+        latencias, consultas = [], []
+        for _ in range(repeticiones):
+            preparar = escenario()
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                respuesta = preparar()
+                latencias.append(time.perf_counter() - inicio)
+            if respuesta.status_code >= 400:
+                raise CommandError(f'{escenario.__name__}: respuesta {respuesta.status_code}')
+            consultas.append(len(capturadas))
+        return rendimiento.resumir(latencias, consultas)
+
+    def _cliente_doctor(self):
+        cliente = Client()
+        cliente.force_login(self.rng.choice(self.doctores))
+        return cliente
+
+    def _vaciar_cache(self):
+        if not self.con_cache:
+            cache.clear()
+
+    def _post_valido(self, url, datos):
+        """POST que debe redirigir; si devuelve el formulario con errores la medición no sirve."""
+        respuesta = Client().post(url, datos)
+        if respuesta.status_code != 302:
+            raise CommandError(f'POST {url} no fue aceptado (respuesta {respuesta.status_code}).')
+        return respuesta
+
+    # Cada escenario prepara lo necesario (fuera del tiempo medido)
+    # y devuelve la petición a medir.
+    def _pacientes_doctor(self):
+        cliente = self._cliente_doctor()
+        cliente.get(reverse('graficas'))  # guarda el rol en la sesión
+        self._vaciar_cache()
+        return lambda: cliente.get(reverse('pacientes_doctor'))
+
+    def _pacientes_doctor_buscar(self):
+        cliente = self._cliente_doctor()
+        cliente.get(reverse('graficas'))
+        self._vaciar_cache()
+        termino = self.rng.choice(rendimiento.APELLIDOS)
+        return lambda: cliente.get(reverse('pacientes_doctor'), {'buscar': termino})
+
+    def _graficas_view(self):
+        cliente = self._cliente_doctor()
+        cliente.get(reverse('pacientes_doctor'))
+        self._vaciar_cache()
+        return lambda: cliente.get(reverse('graficas'))
+
+    def _tendencias_view(self):
+        # Un año agrupado por semana: solo lee EstadisticaDiaria
+        cliente = self._cliente_doctor()
+        cliente.get(reverse('pacientes_doctor'))
+        self._vaciar_cache()
+        hasta = timezone.localdate()
+        rango = {'desde': (hasta - datetime.timedelta(days=364)).isoformat(), 'hasta': hasta.isoformat()}
+        return lambda: cliente.get(reverse('tendencias'), rango)
+
+    def _admin_pacientes(self, filtrar=False):
+        # Página al azar de la lista del admin: "consultas" y "consultas_max"
+        # deben ser iguales en cualquier página
+        admin, _ = User.objects.get_or_create(
+            username='bench_admin', defaults={'is_staff': True, 'is_superuser': True},
+        )
+        cliente = Client()
+        cliente.force_login(admin)
+        doctor = self.rng.choice(self.doctores)
+        filtro = {'doctor__id__exact': doctor.pk} if filtrar else {}
+        total = Paciente.objects.filter(**({'doctor': doctor} if filtrar else {})).count()
+        pagina = self.rng.randrange(max(1, -(-total // 100)))
+        self._vaciar_cache()
+        return lambda: cliente.get(reverse('admin:apneasueno_paciente_changelist'), {**filtro, 'p': pagina})
+
+    def _admin_pacientes_doctor(self):
+        # Igual, con el filtro lateral de doctor (una consulta más por el doctor elegido)
+        return self._admin_pacientes(filtrar=True)
+
+    def _generar_pdf(self):
+        paciente_id = self.rng.choice(self.pacientes)
+        if not self.con_cache:
+            cache_pdf.invalidar_paciente(paciente_id)
+        return lambda: Client().get(reverse('generar_pdf', args=[paciente_id]))
+
+    def _paciente_login_post(self):
+        datos = {
+            'id': f'BN{time.time_ns() % 10 ** 15}',
+            'nombres': 'Paciente', 'apellidos': 'De Prueba',
+            'edad': 55, 'sexo': 'M', 'estatura': 1.75, 'peso': 90, 'cuello': 42,
+            'ronca': 'True', 'cansado': 'False', 'observado': 'False', 'presion_alta': 'True',
+            'doctor': self.rng.choice(self.doctores).pk,
+        }
+        return lambda: self._post_valido(reverse('paciente_login'), datos)
+
+    def _doctor_login_view_post(self):
+        datos = {'username': self.rng.choice(self.doctores).username, 'password': rendimiento.CLAVE_DOCTOR}
+        return lambda: self._post_valido(reverse('doctor_login'), datos)
+
+    # ============================
+    # Comparación
+    # ============================
+    def _comparar(self, informe, ruta):
+        """Agrega a cada escenario el p50 anterior y el cambio en porcentaje."""
+        with open(ruta, encoding='utf-8') as f:
+            anterior = json.load(f).get('escenarios', {})
+        for nombre, datos in informe['escenarios'].items():
+            previo = anterior.get(nombre)
+            if not previo or not previo.get('p50_ms'):
+                continue
+            datos['p50_anterior_ms'] = previo['p50_ms']
+            datos['cambio_p50_pct'] = round((datos['p50_ms'] - previo['p50_ms']) / previo['p50_ms'] * 100, 1)
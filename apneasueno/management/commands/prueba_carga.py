@@ -0,0 +1,88 @@
+# ==========================================
+# Comando: python manage.py prueba_carga --settings=apnea.settings_benchmark
+#          [--concurrencia 1,2,4,8,16] [--duracion 10] [--mezcla paciente=0.8,doctor=0.2]
+#          [--url http://127.0.0.1:8000] [--flujos flujos.jsonl] [--salida carga.json]
+# Simula pacientes (cuestionario -> éxito -> pase PDF) y doctores
+# (login -> búsqueda -> gráficas) a varios niveles de concurrencia y
+# reporta dónde se satura. Sin --url las peticiones se hacen dentro del
+# proceso (WSGI con el cliente de pruebas); con --url, contra un servidor.
+# Sembrar borra la base de datos: solo con BENCHMARK = True (settings_benchmark),
+# --confirmar-borrado o --sin-sembrar.
+# ==========================================
+import json
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from apneasueno import carga, rendimiento
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga con flujos de pacientes y doctores; reporta el punto de saturación.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', default='1,2,4,8,16',
+                            help='Usuarios simultáneos por nivel, separados por coma (por defecto 1,2,4,8,16).')
+        parser.add_argument('--duracion', type=float, default=10, help='Segundos por nivel (por defecto 10).')
+        parser.add_argument('--mezcla', help='Pesos de los flujos, p. ej. paciente=0.9,doctor=0.1.')
+        parser.add_argument('--flujos', help='Archivo .jsonl con flujos propios (reemplaza a los incluidos).')
+        parser.add_argument('--url', help='Servidor a probar (p. ej. http://127.0.0.1:8000); si no, en proceso.')
+        parser.add_argument('--doctores', type=int, default=5, help='Doctores a sembrar (por defecto 5).')
+        parser.add_argument('--pacientes', type=int, default=500, help='Pacientes por doctor (por defecto 500).')
+        parser.add_argument('--sin-sembrar', action='store_true', help='Usa los doctores ya sembrados.')
+        parser.add_argument('--confirmar-borrado', action='store_true',
+                            help='Permite sembrar con settings sin BENCHMARK = True (borra la base configurada).')
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--salida', help='Archivo donde guardar el JSON (por defecto, la consola).')
+
+    def handle(self, *args, **options):
+        try:
+            niveles = sorted({int(n) for n in options['concurrencia'].split(',') if n.strip()})
+            flujos = carga.leer_flujos(options['flujos']) if options['flujos'] else carga.FLUJOS
+            flujos = carga.aplicar_mezcla(flujos, options['mezcla'])
+        except ValueError as error:
+            raise CommandError(str(error))
+        if not niveles or min(niveles) < 1:
+            raise CommandError('--concurrencia debe tener números mayores que cero.')
+
+        if not options['sin_sembrar']:
+            rendimiento.verificar_base_desechable(options['confirmar_borrado'])
+            call_command('migrate', verbosity=0, interactive=False)
+            call_command('flush', verbosity=0, interactive=False)
+            rendimiento.sembrar(options['doctores'], options['pacientes'], options['semilla'])
+        doctores = list(rendimiento.doctores_sembrados().values_list('pk', 'username'))
+        if not doctores:
+            raise CommandError('No hay doctores sembrados; ejecútelo sin --sin-sembrar.')
+
+        if options['url']:
+            fabrica = lambda: carga.ClienteHTTP(options['url'])  # noqa: E731
+        else:
+            fabrica = carga.ClienteLocal
+
+        resultados = []
+        for concurrencia in niveles:
+            self.stderr.write(f'{concurrencia} usuarios durante {options["duracion"]:g} s...')
+            nivel = carga.ejecutar_nivel(
+                flujos, concurrencia, options['duracion'], fabrica,
+                doctores, rendimiento.CLAVE_DOCTOR, options['semilla'],
+            )
+            resultados.append(nivel)
+            self.stderr.write(
+                f'  {nivel.get("por_segundo", 0)} pet/s, p50 {nivel.get("p50_ms")} ms, '
+                f'p99 {nivel.get("p99_ms")} ms, {nivel["errores"]} errores'
+            )
+
+        informe = {
+            'destino': options['url'] or 'en proceso',
+            'mezcla': {f['nombre']: f['peso'] for f in flujos},
+            'duracion_s': options['duracion'],
+            'niveles': resultados,
+            'saturacion': carga.saturacion(resultados),
+        }
+        texto = json.dumps(informe, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as f:
+                f.write(texto + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Resultados guardados en {options["salida"]}'))
+        else:
+            self.stdout.write(texto)
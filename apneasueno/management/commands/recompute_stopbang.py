@@ -0,0 +1,73 @@
+# ==========================================
+# Comando: python manage.py recompute_stopbang [--bloque N] [--simular]
+# Recalcula IMC, puntuación STOP-BANG y riesgo de todos los pacientes
+# por bloques, con el cálculo vectorizado y bulk_update (sin save() por fila).
+# ==========================================
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apneasueno import cache_paginas, estadisticas, stopbang
+from apneasueno.models import Paciente
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la puntuación STOP-BANG de todos los pacientes (p. ej. tras cambiar un umbral).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bloque', type=int, default=2000, help='Pacientes por bloque (por defecto 2000).')
+        parser.add_argument('--simular', action='store_true', help='Solo cuenta los cambios, no escribe nada.')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        tamano = options['bloque']
+        revisados = cambiados = 0
+        doctores = set()
+
+        campos = ('pk', 'doctor_id') + stopbang.CAMPOS_ENTRADA + ('puntuacion_stopbang', 'riesgo')
+        pacientes = Paciente.objects.order_by('pk').only(*campos).iterator(chunk_size=tamano)
+
+        bloque = []
+        for paciente in pacientes:
+            bloque.append(paciente)
+            if len(bloque) >= tamano:
+                cambiados += self._procesar(bloque, doctores, options['simular'])
+                revisados += len(bloque)
+                bloque = []
+        if bloque:
+            cambiados += self._procesar(bloque, doctores, options['simular'])
+            revisados += len(bloque)
+
+        # bulk_update no dispara señales: estadísticas y caché de páginas se actualizan aparte
+        if doctores and not options['simular']:
+            estadisticas.reconstruir(doctores)
+            cache_paginas.invalidar_doctores(doctores)
+
+        segundos = time.monotonic() - inicio
+        accion = 'cambiarían' if options['simular'] else 'actualizados'
+        self.stdout.write(self.style.SUCCESS(
+            f'{revisados} pacientes revisados, {cambiados} {accion} en {segundos:.1f} s.'
+        ))
+
+    def _procesar(self, bloque, doctores, simular):
+        """Calcula un bloque de una vez y guarda solo las filas que cambiaron."""
+        columnas = {campo: [getattr(p, campo) for p in bloque] for campo in stopbang.CAMPOS_ENTRADA}
+        imc, puntos, riesgo = stopbang.calcular_lote(columnas)
+
+        cambiados = []
+        for i, paciente in enumerate(bloque):
+            nuevo = (
+                None if imc[i] != imc[i] else float(imc[i]),  # NaN -> None
+                int(puntos[i]),
+                str(riesgo[i]),
+            )
+            if nuevo != (paciente.imc, paciente.puntuacion_stopbang, paciente.riesgo):
+                paciente.imc, paciente.puntuacion_stopbang, paciente.riesgo = nuevo
+                cambiados.append(paciente)
+                doctores.add(paciente.doctor_id)
+
+        if cambiados and not simular:
+            with transaction.atomic():
+                Paciente.objects.bulk_update(cambiados, stopbang.CAMPOS_SALIDA)
+        return len(cambiados)
@@ -0,0 +1,21 @@
+# ==========================================
+# Comando: python manage.py reconstruir_estadisticas [--doctor ID ...]
+# Recalcula desde cero la tabla EstadisticaDoctor.
+# ==========================================
+from django.core.management.base import BaseCommand
+
+from apneasueno import estadisticas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las estadísticas por doctor (riesgo, sexo y puntuación STOP-BANG).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--doctor', type=int, action='append', dest='doctores',
+            help='ID del doctor a recalcular (se puede repetir). Sin esta opción se recalculan todos.',
+        )
+
+    def handle(self, *args, **options):
+        total = estadisticas.reconstruir(options['doctores'])
+        self.stdout.write(self.style.SUCCESS(f'Estadísticas recalculadas para {total} doctor(es).'))
@@ -0,0 +1,54 @@
+# ==========================================
+# Comando: python manage.py reconstruir_tendencias [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD] [--doctor ID ...]
+# Recalcula la tabla EstadisticaDiaria (conteos por día para las tendencias).
+# El rango se procesa por meses para no retener un historial de años en memoria.
+# ==========================================
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from apneasueno import estadisticas
+from apneasueno.models import Paciente
+
+
+def _fecha(valor):
+    try:
+        return datetime.date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {valor} (use AAAA-MM-DD).')
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los conteos diarios por doctor, riesgo y sexo que usan las gráficas de tendencias.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=_fecha, help='Primer día a recalcular (por defecto, el primer registro).')
+        parser.add_argument('--hasta', type=_fecha, help='Último día a recalcular (por defecto, el último registro).')
+        parser.add_argument(
+            '--doctor', type=int, action='append', dest='doctores',
+            help='ID del doctor a recalcular (se puede repetir). Sin esta opción se recalculan todos.',
+        )
+
+    def handle(self, *args, **options):
+        desde, hasta = options['desde'], options['hasta']
+        if desde is None or hasta is None:
+            extremos = Paciente.objects.exclude(doctor=None).aggregate(
+                primero=Min('fecha_registro'), ultimo=Max('fecha_registro'),
+            )
+            if extremos['primero'] is None:
+                self.stdout.write('No hay pacientes con doctor asignado.')
+                return
+            desde = desde or estadisticas.dia_de(extremos['primero'])
+            hasta = hasta or estadisticas.dia_de(extremos['ultimo'])
+        if desde > hasta:
+            raise CommandError('--desde debe ser anterior o igual a --hasta.')
+
+        filas = 0
+        inicio = desde
+        while inicio <= hasta:
+            fin = min(hasta, (inicio + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1))
+            filas += estadisticas.reconstruir_diarias(options['doctores'], inicio, fin)
+            inicio = fin + datetime.timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Conteos diarios recalculados del {desde} al {hasta}: {filas} fila(s).'))
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.8 on 2026-10-18 12:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from apneasueno.busqueda import clave_busqueda
+
+
+def llenar_busqueda(apps, schema_editor):
+    """Calcula la clave de búsqueda de los pacientes existentes, por bloques."""
+    Paciente = apps.get_model('apneasueno', 'Paciente')
+    bloque = []
+    for paciente in Paciente.objects.only('id', 'nombres', 'apellidos').iterator(chunk_size=1000):
+        paciente.busqueda = clave_busqueda(paciente.id, paciente.nombres, paciente.apellidos)
+        bloque.append(paciente)
+        if len(bloque) >= 1000:
+            Paciente.objects.bulk_update(bloque, ['busqueda'])
+            bloque = []
+    if bloque:
+        Paciente.objects.bulk_update(bloque, ['busqueda'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('apneasueno', '0004_paciente_doctor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paciente',
+            name='busqueda',
+            field=models.CharField(default='', editable=False, max_length=130, verbose_name='Clave de búsqueda'),
+        ),
+        migrations.AlterField(
+            model_name='paciente',
+            name='doctor',
+            field=models.ForeignKey(blank=True, help_text='Doctor asignado al paciente', null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(llenar_busqueda, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['doctor', 'busqueda'], name='paciente_doctor_busqueda_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 3.2.8 on 2026-10-18 12:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+COLUMNA_RIESGO = {
+    'Alto riesgo de AOS': 'riesgo_alto',
+    'Riesgo intermedio de AOS': 'riesgo_intermedio',
+    'Bajo riesgo de AOS': 'riesgo_bajo',
+}
+COLUMNA_SEXO = {'M': 'sexo_m', 'F': 'sexo_f'}
+
+
+def llenar_estadisticas(apps, schema_editor):
+    """Calcula las estadísticas iniciales de cada doctor con los pacientes existentes."""
+    Paciente = apps.get_model('apneasueno', 'Paciente')
+    EstadisticaDoctor = apps.get_model('apneasueno', 'EstadisticaDoctor')
+
+    conteos = {}
+    filas = Paciente.objects.exclude(doctor=None).values_list('doctor_id', 'riesgo', 'sexo', 'puntuacion_stopbang')
+    for doctor_id, riesgo, sexo, puntuacion in filas.iterator():
+        columnas = conteos.setdefault(doctor_id, {})
+        nombres = ['total', COLUMNA_RIESGO.get(riesgo), COLUMNA_SEXO.get(sexo)]
+        if puntuacion is not None and 0 <= puntuacion <= 7:
+            nombres.append(f'puntuacion_{puntuacion}')
+        for nombre in filter(None, nombres):
+            columnas[nombre] = columnas.get(nombre, 0) + 1
+
+    EstadisticaDoctor.objects.bulk_create(
+        EstadisticaDoctor(doctor_id=doctor_id, **columnas) for doctor_id, columnas in conteos.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('apneasueno', '0005_paciente_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaDoctor',
+            fields=[
+                ('doctor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadistica', serialize=False, to='auth.user')),
+                ('total', models.IntegerField(default=0)),
+                ('riesgo_alto', models.IntegerField(default=0)),
+                ('riesgo_intermedio', models.IntegerField(default=0)),
+                ('riesgo_bajo', models.IntegerField(default=0)),
+                ('sexo_m', models.IntegerField(default=0)),
+                ('sexo_f', models.IntegerField(default=0)),
+                ('puntuacion_0', models.IntegerField(default=0)),
+                ('puntuacion_1', models.IntegerField(default=0)),
+                ('puntuacion_2', models.IntegerField(default=0)),
+                ('puntuacion_3', models.IntegerField(default=0)),
+                ('puntuacion_4', models.IntegerField(default=0)),
+                ('puntuacion_5', models.IntegerField(default=0)),
+                ('puntuacion_6', models.IntegerField(default=0)),
+                ('puntuacion_7', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(llenar_estadisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.8 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apneasueno', '0006_estadisticadoctor'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['doctor', 'id'], name='paciente_doctor_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['doctor', 'riesgo'], name='paciente_doctor_riesgo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['doctor', 'sexo'], name='paciente_doctor_sexo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['riesgo', 'sexo'], name='paciente_riesgo_sexo_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.8 on 2026-10-18 12:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apneasueno', '0007_indices_paciente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paciente',
+            name='fecha_registro',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Fecha de registro'),
+        ),
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['doctor', '-puntuacion_stopbang', 'fecha_registro', 'id'], name='paciente_triage_idx'),
+        ),
+    ]
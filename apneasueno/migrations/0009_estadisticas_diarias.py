@@ -0,0 +1,63 @@
+# Generated by Django 3.2.8 on 2026-10-18 12:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def llenar_estadisticas_diarias(apps, schema_editor):
+    """
+    Conteos por doctor, día, riesgo y sexo con los pacientes existentes.
+    Los pacientes anteriores a esta migración toman su fecha de registro
+    como última actualización.
+    """
+    Paciente = apps.get_model('apneasueno', 'Paciente')
+    EstadisticaDiaria = apps.get_model('apneasueno', 'EstadisticaDiaria')
+    Paciente.objects.update(fecha_actualizacion=models.F('fecha_registro'))
+
+    conteos = {}
+    filas = Paciente.objects.exclude(doctor=None).values_list('doctor_id', 'fecha_registro', 'riesgo', 'sexo')
+    for doctor_id, fecha, riesgo, sexo in filas.iterator():
+        clave = (doctor_id, timezone.localdate(fecha), riesgo or '', sexo or '')
+        conteos[clave] = conteos.get(clave, 0) + 1
+
+    EstadisticaDiaria.objects.bulk_create(
+        (
+            EstadisticaDiaria(doctor_id=doctor_id, fecha=dia, riesgo=riesgo, sexo=sexo, total=total)
+            for (doctor_id, dia, riesgo, sexo), total in conteos.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('apneasueno', '0008_paciente_fecha_registro_triage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paciente',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última actualización'),
+        ),
+        migrations.CreateModel(
+            name='EstadisticaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('riesgo', models.CharField(default='', max_length=20)),
+                ('sexo', models.CharField(default='', max_length=1)),
+                ('total', models.IntegerField(default=0)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas_diarias', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='estadisticadiaria',
+            constraint=models.UniqueConstraint(fields=('doctor', 'fecha', 'riesgo', 'sexo'), name='estadistica_diaria_unica'),
+        ),
+        migrations.RunPython(llenar_estadisticas_diarias, migrations.RunPython.noop),
+    ]
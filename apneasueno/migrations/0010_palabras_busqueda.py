@@ -0,0 +1,65 @@
+# Generated by Django 3.2.8 on 2026-10-18 12:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from apneasueno.busqueda import palabras
+
+
+def llenar_palabras(apps, schema_editor):
+    """Palabras de búsqueda de los pacientes existentes, por bloques."""
+    Paciente = apps.get_model('apneasueno', 'Paciente')
+    PalabraPaciente = apps.get_model('apneasueno', 'PalabraPaciente')
+    bloque = []
+    for paciente in Paciente.objects.only('id', 'doctor_id', 'busqueda').iterator(chunk_size=1000):
+        bloque.extend(
+            PalabraPaciente(paciente_id=paciente.pk, doctor_id=paciente.doctor_id, palabra=palabra)
+            for palabra in sorted(palabras(paciente.busqueda))
+        )
+        if len(bloque) >= 5000:
+            PalabraPaciente.objects.bulk_create(bloque)
+            bloque = []
+    if bloque:
+        PalabraPaciente.objects.bulk_create(bloque)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('apneasueno', '0009_estadisticas_diarias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PalabraPaciente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('palabra', models.CharField(max_length=50)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='paciente',
+            name='paciente_doctor_busqueda_idx',
+        ),
+        migrations.AddField(
+            model_name='palabrapaciente',
+            name='doctor',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='palabrapaciente',
+            name='paciente',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='palabras', to='apneasueno.paciente'),
+        ),
+        migrations.RunPython(llenar_palabras, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='palabrapaciente',
+            index=models.Index(fields=['doctor', 'palabra', 'paciente'], name='palabra_doctor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='palabrapaciente',
+            index=models.Index(fields=['palabra', 'paciente'], name='palabra_idx'),
+        ),
+    ]
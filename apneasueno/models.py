@@ -3,10 +3,16 @@
 # Incluye:
 #   - Paciente: datos médicos y personales + cálculo STOP-BANG
 #   - PerfilDoctor: extensión del modelo User
+#   - EstadisticaDoctor: conteos por doctor para las gráficas
+#   - EstadisticaDiaria: conteos por doctor y día para las tendencias
 # ==========================================
 
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from . import stopbang
+from .busqueda import clave_busqueda, guardar_palabras
 
 # ============================
 # Modelo Paciente
@@ -46,6 +52,31 @@ class Paciente(models.Model):
     puntuacion_stopbang = models.PositiveIntegerField(verbose_name='Puntuación STOP-BANG', null=True, editable=False)
     riesgo = models.CharField(max_length=20, verbose_name='Nivel de riesgo', null=True, editable=False)
 
+    # Búsqueda: ID, nombres y apellidos sin acentos y en minúsculas (ver busqueda.py)
+    busqueda = models.CharField(max_length=130, verbose_name='Clave de búsqueda', default='', editable=False)
+
+    # Momento en que se registró el cuestionario (desempate del triage y tendencias)
+    fecha_registro = models.DateTimeField(verbose_name='Fecha de registro', default=timezone.now, editable=False)
+    fecha_actualizacion = models.DateTimeField(verbose_name='Última actualización', auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Lista paginada por ID (keyset) de un doctor
+            models.Index(fields=['doctor', 'id'], name='paciente_doctor_id_idx'),
+            # Filtros y conteos por riesgo / sexo de un doctor (lista, exportación de pases, estadísticas)
+            models.Index(fields=['doctor', 'riesgo'], name='paciente_doctor_riesgo_idx'),
+            models.Index(fields=['doctor', 'sexo'], name='paciente_doctor_sexo_idx'),
+            # Filtros del admin y del extracto de investigación sin doctor
+            models.Index(fields=['riesgo', 'sexo'], name='paciente_riesgo_sexo_idx'),
+            # Triage: mayor puntuación primero y, a igual puntuación, el registrado antes.
+            # La columna descendente requiere MySQL 8 (5.7 la guarda ascendente y ordena
+            # con filesort); test_indice_triage lo comprueba con EXPLAIN.
+            models.Index(
+                fields=['doctor', '-puntuacion_stopbang', 'fecha_registro', 'id'],
+                name='paciente_triage_idx',
+            ),
+        ]
+
     # Representación en admin y consultas
     def __str__(self):
         return f'{self.id} - {self.nombres} {self.apellidos}'
@@ -56,33 +87,43 @@ class Paciente(models.Model):
         - IMC
         - Puntuación STOP-BANG
         - Nivel de riesgo asociado
+        - Clave de búsqueda normalizada
         """
+        self.busqueda = clave_busqueda(self.id, self.nombres, self.apellidos)
 
-        # Calcular IMC si se tiene peso y estatura
-        if self.estatura and self.peso:
-            self.imc = round(self.peso / (self.estatura ** 2), 2)
-
-        # Calcular puntuación STOP-BANG
-        puntos = 0
-        if self.edad > 50: puntos += 1
-        if self.ronca: puntos += 1
-        if self.cansado: puntos += 1
-        if self.observado: puntos += 1
-        if self.presion_alta: puntos += 1
-        if self.imc and self.imc > 35: puntos += 1
-        if self.cuello and self.cuello > 40: puntos += 1
-
-        self.puntuacion_stopbang = puntos
-
-        # Determinar riesgo
-        if puntos <= 1:
-            self.riesgo = 'Bajo riesgo de AOS'
-        elif 2 <= puntos <= 3:
-            self.riesgo = 'Riesgo intermedio de AOS'
-        else:
-            self.riesgo = 'Alto riesgo de AOS'
+        # Calcular IMC, puntuación STOP-BANG y riesgo (ver stopbang.py)
+        self.imc, self.puntuacion_stopbang, self.riesgo = stopbang.calcular(
+            self.edad, self.estatura, self.peso, self.cuello,
+            self.ronca, self.cansado, self.observado, self.presion_alta,
+            imc=self.imc,
+        )
 
         super().save(*args, **kwargs)
+        guardar_palabras([self])
+
+# ============================
+# Modelo PalabraPaciente
+# ============================
+class PalabraPaciente(models.Model):
+    """
+    Una palabra de la clave de búsqueda de un paciente (ver busqueda.py).
+    Se reescriben en Paciente.save() y en la importación masiva.
+    """
+    paciente = models.ForeignKey(Paciente, on_delete=models.CASCADE, related_name='palabras')
+    # Copia de Paciente.doctor para buscar con el índice (doctor, palabra)
+    doctor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', db_index=False)
+    palabra = models.CharField(max_length=50)
+
+    class Meta:
+        indexes = [
+            # Prefijo de una palabra dentro de los pacientes de un doctor (incluye al paciente: índice cubriente)
+            models.Index(fields=['doctor', 'palabra', 'paciente'], name='palabra_doctor_idx'),
+            # Prefijo de una palabra en todos los pacientes (admin)
+            models.Index(fields=['palabra', 'paciente'], name='palabra_idx'),
+        ]
+
+    def __str__(self):
+        return self.palabra
 
 # ============================
 # Modelo PerfilDoctor
@@ -97,3 +138,62 @@ class PerfilDoctor(models.Model):
 
     def __str__(self):
         return self.user.username
+
+# ============================
+# Modelo EstadisticaDoctor
+# ============================
+class EstadisticaDoctor(models.Model):
+    """
+    Conteos de pacientes por doctor (riesgo, sexo y puntuación STOP-BANG).
+    Se mantienen al guardar/eliminar pacientes (ver estadisticas.py y signals.py)
+    para que la página de gráficas lea una sola fila.
+    """
+    doctor = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='estadistica')
+    total = models.IntegerField(default=0)
+
+    # Por nivel de riesgo
+    riesgo_alto = models.IntegerField(default=0)
+    riesgo_intermedio = models.IntegerField(default=0)
+    riesgo_bajo = models.IntegerField(default=0)
+
+    # Por sexo
+    sexo_m = models.IntegerField(default=0)
+    sexo_f = models.IntegerField(default=0)
+
+    # Por puntuación STOP-BANG (0 a 7)
+    puntuacion_0 = models.IntegerField(default=0)
+    puntuacion_1 = models.IntegerField(default=0)
+    puntuacion_2 = models.IntegerField(default=0)
+    puntuacion_3 = models.IntegerField(default=0)
+    puntuacion_4 = models.IntegerField(default=0)
+    puntuacion_5 = models.IntegerField(default=0)
+    puntuacion_6 = models.IntegerField(default=0)
+    puntuacion_7 = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'Estadísticas de {self.doctor}'
+
+# ============================
+# Modelo EstadisticaDiaria
+# ============================
+class EstadisticaDiaria(models.Model):
+    """
+    Pacientes registrados por doctor, día, nivel de riesgo y sexo.
+    Se mantiene al guardar/eliminar pacientes (ver estadisticas.py y signals.py)
+    para que las tendencias lean solo estas filas: a lo más una por
+    combinación de riesgo y sexo por día, sin importar cuántos pacientes haya.
+    """
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='estadisticas_diarias')
+    fecha = models.DateField()
+    riesgo = models.CharField(max_length=20, default='')
+    sexo = models.CharField(max_length=1, default='')
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # También sirve de índice para los rangos de fechas de un doctor
+            models.UniqueConstraint(fields=['doctor', 'fecha', 'riesgo', 'sexo'], name='estadistica_diaria_unica'),
+        ]
+
+    def __str__(self):
+        return f'{self.doctor} {self.fecha} {self.riesgo} {self.sexo}: {self.total}'
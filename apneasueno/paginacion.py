@@ -0,0 +1,113 @@
+# ==========================================
+# Paginación por cursor (keyset / seek)
+# En lugar de OFFSET, cada página continúa después del último ID mostrado:
+# la consulta cuesta lo mismo en la página 1 que en la 1000.
+# PaginadorEstimado: Paginator del admin que usa el total estimado.
+# ==========================================
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class PaginaCursor:
+    """Una página de resultados y el cursor para pedir la siguiente."""
+    def __init__(self, objetos, siguiente, tamano, total=None, total_aproximado=False):
+        self.objetos = objetos                    # filas de esta página
+        self.siguiente = siguiente                # cursor de la siguiente página (o None)
+        self.tamano = tamano                      # tamaño de página usado
+        self.total = total                        # total de filas (si se pidió)
+        self.total_aproximado = total_aproximado  # True si total es una estimación
+
+    @property
+    def hay_siguiente(self):
+        return self.siguiente is not None
+
+
+def codificar_cursor(valor):
+    """El ID puede tener cualquier carácter: se envía en base64 apto para URL."""
+    return base64.urlsafe_b64encode(str(valor).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Devuelve el ID del cursor o None si no es válido."""
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        return base64.urlsafe_b64decode(cursor + relleno).decode()
+    except (binascii.Error, ValueError):
+        return None
+
+
+def tamano_pagina(valor=None):
+    """Tamaño de página pedido (?por_pagina=) acotado a PACIENTES_POR_PAGINA_MAX."""
+    por_defecto = getattr(settings, 'PACIENTES_POR_PAGINA', 50)
+    maximo = getattr(settings, 'PACIENTES_POR_PAGINA_MAX', 200)
+    try:
+        tamano = int(valor)
+    except (TypeError, ValueError):
+        return por_defecto
+    return max(1, min(tamano, maximo))
+
+
+def estimar_total(queryset):
+    """
+    Total de filas del queryset.
+    - En MySQL se usa la estimación de EXPLAIN (no recorre la tabla).
+    - En otros motores se hace COUNT(*).
+    Devuelve (total, es_aproximado).
+    """
+    conexion = connections[queryset.db]
+    if conexion.vendor != 'mysql':
+        return queryset.count(), False
+
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with conexion.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + sql, params)
+        columnas = [columna[0] for columna in cursor.description]
+        filas = cursor.fetchall()
+    indice = columnas.index('rows')
+    return max((fila[indice] or 0) for fila in filas), True
+
+
+def paginar(queryset, cursor=None, tamano=None, contar=False):
+    """
+    Devuelve una PaginaCursor ordenada por ID.
+    - cursor: valor devuelto como `siguiente` en la página anterior.
+    - contar: si es True se agrega el total (estimado en MySQL).
+    """
+    tamano = tamano or tamano_pagina()
+    total, aproximado = (None, False)
+
+    pagina = queryset.order_by('id')
+    ultimo_id = decodificar_cursor(cursor)
+    if ultimo_id is not None:
+        pagina = pagina.filter(id__gt=ultimo_id)
+
+    # Se pide una fila de más para saber si existe otra página
+    objetos = list(pagina[:tamano + 1])
+    siguiente = None
+    if len(objetos) > tamano:
+        objetos = objetos[:tamano]
+        siguiente = codificar_cursor(objetos[-1].id)
+
+    if contar:
+        if ultimo_id is None and siguiente is None:
+            total = len(objetos)  # todo cabe en la primera página
+        else:
+            total, aproximado = estimar_total(queryset)
+    return PaginaCursor(objetos, siguiente, tamano, total, aproximado)
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginator para el admin: el total sale de estimar_total
+    (EXPLAIN en MySQL en lugar de COUNT(*) de toda la tabla).
+    """
+    @cached_property
+    def count(self):
+        return estimar_total(self.object_list)[0]
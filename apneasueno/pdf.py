@@ -0,0 +1,204 @@
+# ==========================================
+# Generación de pases en PDF
+# Incluye:
+#   - Caché de recursos por proceso (logo, CSS, fuentes y plantilla)
+#   - contexto_pase: datos que recibe la plantilla pase_pdf.html
+#   - renderizar_pase: genera el PDF de un paciente
+#   - renderizar_pases / iterar_zip_pases: exportación en lote
+# ==========================================
+import io
+import os
+import base64
+import zipfile
+import threading
+
+from django.template.loader import get_template
+from django.utils import timezone
+
+from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
+
+from .imagenes import ANCHO_IMPRESION, reducir_png, ruta_estatico, ruta_impresion
+from .perfilado import medir
+
+PLANTILLA_PASE = 'paginas/pacientes/pase_pdf.html'
+PLANTILLA_PASES = 'paginas/pacientes/pases_pdf.html'
+LOGO_PASE = 'img/hospital.png'
+CSS_PASE = 'css/pase_pdf.css'
+
+# Ancho máximo (px) del logo incrustado en el PDF (ver imagenes.IMPRESION)
+ANCHO_LOGO_PDF = ANCHO_IMPRESION
+
+
+# ============================
+# Recursos compartidos
+# ============================
+class RecursosPase:
+    """
+    Recursos idénticos para todos los pases: se calculan una vez por proceso
+    y se reutilizan mientras no cambie la fecha de modificación de los archivos.
+    """
+    def __init__(self, firma, logo_pdf_base64, fuentes, css, plantilla, plantilla_lote):
+        self.firma = firma                      # (ruta logo, mtime logo, mtime css)
+        self.logo_pdf_base64 = logo_pdf_base64  # logo reducido para el PDF
+        self.fuentes = fuentes                  # FontConfiguration de WeasyPrint
+        self.css = css                          # hoja de estilos ya analizada
+        self.plantilla = plantilla              # plantilla Django compilada
+        self.plantilla_lote = plantilla_lote    # plantilla con varios pases
+
+
+_recursos = None
+_candado = threading.Lock()
+
+
+def _mtime(ruta):
+    try:
+        return os.stat(ruta).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _ruta_logo():
+    """
+    Logo de impresión ya reducido (comando generar_imagenes) o,
+    si no se ha generado, el original (se reduce al cargar los recursos).
+    """
+    derivado = ruta_impresion(LOGO_PASE)
+    if derivado:
+        ruta = ruta_estatico(derivado)
+        if os.path.exists(ruta):
+            return ruta, True
+    return ruta_estatico(LOGO_PASE), False
+
+
+def _cargar_recursos(ruta_logo, reducido, ruta_css, firma):
+    """Lee del disco y prepara todos los recursos del pase."""
+    with open(ruta_logo, 'rb') as f:
+        logo = f.read()
+    if not reducido:
+        logo = reducir_png(logo, ANCHO_LOGO_PDF)
+    with open(ruta_css, encoding='utf-8') as f:
+        estilos = f.read()
+
+    fuentes = FontConfiguration()
+    return RecursosPase(
+        firma=firma,
+        logo_pdf_base64=base64.b64encode(logo).decode(),
+        fuentes=fuentes,
+        css=CSS(string=estilos, font_config=fuentes),
+        plantilla=get_template(PLANTILLA_PASE),
+        plantilla_lote=get_template(PLANTILLA_PASES),
+    )
+
+
+def obtener_recursos():
+    """
+    Devuelve los recursos del pase.
+    - Solo se recargan si cambió la fecha de modificación del logo o del CSS.
+    """
+    global _recursos
+    ruta_logo, reducido = _ruta_logo()
+    ruta_css = ruta_estatico(CSS_PASE)
+    firma = (ruta_logo, _mtime(ruta_logo), _mtime(ruta_css))
+
+    recursos = _recursos
+    if recursos is not None and recursos.firma == firma:
+        return recursos
+
+    with _candado:
+        if _recursos is None or _recursos.firma != firma:
+            _recursos = _cargar_recursos(ruta_logo, reducido, ruta_css, firma)
+        return _recursos
+
+
+def limpiar_recursos():
+    """Descarta los recursos en memoria (se recargan en el siguiente pase)."""
+    global _recursos
+    with _candado:
+        _recursos = None
+
+
+# ============================
+# Renderizado
+# ============================
+def contexto_pase(paciente, recursos=None):
+    """Contexto de la plantilla pase_pdf.html para un paciente."""
+    recursos = recursos or obtener_recursos()
+    ahora = timezone.now()
+    return {
+        'paciente': paciente,
+        'year': ahora.year,
+        'fecha_actual': ahora.strftime('%d/%m/%Y'),
+        'logo_base64': recursos.logo_pdf_base64,
+    }
+
+
+def renderizar_pase(paciente, base_url=None):
+    """
+    Genera el pase en PDF de un paciente y lo devuelve como bytes.
+    Solo se procesan los datos del paciente; logo, CSS y fuentes vienen de la caché.
+    """
+    recursos = obtener_recursos()
+    html_string = recursos.plantilla.render(contexto_pase(paciente, recursos))
+    with medir('pdf'):
+        html = HTML(string=html_string, base_url=base_url)
+        return html.write_pdf(stylesheets=[recursos.css], font_config=recursos.fuentes)
+
+
+# ============================
+# Exportación en lote
+# ============================
+def renderizar_pases(pacientes, destino, base_url=None):
+    """
+    Genera en un solo paso de WeasyPrint un PDF con un pase por página
+    y lo escribe en `destino` (ruta o archivo abierto en modo binario).
+    """
+    recursos = obtener_recursos()
+    contexto = contexto_pase(None, recursos)
+    contexto['pacientes'] = pacientes
+    html_string = recursos.plantilla_lote.render(contexto)
+    with medir('pdf'):
+        html = HTML(string=html_string, base_url=base_url)
+        html.write_pdf(destino, stylesheets=[recursos.css], font_config=recursos.fuentes)
+
+
+class _BufferZip(io.RawIOBase):
+    """Destino de ZipFile que acumula lo escrito hasta que se vacía (sin seek)."""
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def iterar_zip_pases(pacientes, base_url=None):
+    """
+    Generador que produce un ZIP con el pase de cada paciente, archivo por archivo,
+    para enviarlo con StreamingHttpResponse sin armar todo en memoria.
+    - Reutiliza los pases de la caché de disco y guarda los que genere.
+    """
+    from . import cache_pdf
+
+    buffer = _BufferZip()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archivo_zip:
+        for paciente in pacientes:
+            huella = cache_pdf.huella_pase(paciente)
+            ruta = cache_pdf.obtener(paciente.id, huella)
+            if ruta:
+                with open(ruta, 'rb') as f:
+                    contenido = f.read()
+            else:
+                contenido = renderizar_pase(paciente, base_url=base_url)
+                cache_pdf.guardar(paciente.id, huella, contenido)
+            archivo_zip.writestr(f'pase_paciente_{paciente.id}.pdf', contenido)
+            yield buffer.vaciar()
+    yield buffer.vaciar()
@@ -0,0 +1,183 @@
+# ==========================================
+# Perfilado de vistas (opcional, PERFILADO_ACTIVO en settings.py)
+# Incluye:
+#   - PerfiladoMiddleware: por petición mide tiempo total, consultas a la BD,
+#     tiempo de BD, tiempo de plantillas y tiempo de WeasyPrint
+#   - medir: bloque "with" para sumar tiempo a una categoría (p. ej. 'pdf')
+#   - resumen: percentiles móviles por nombre de URL (endpoint JSON para staff)
+# Las muestras se guardan en memoria por proceso (cada worker de gunicorn
+# tiene las suyas) y solo las últimas PERFILADO_MUESTRAS por URL.
+# ==========================================
+import time
+import random
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# Métricas por petición (en milisegundos, salvo 'consultas')
+METRICAS = ('total', 'consultas', 'bd', 'plantillas', 'pdf')
+PERCENTILES = (50, 90, 99)
+
+# Medición de la petición en curso (None si no se está perfilando)
+_actual = contextvars.ContextVar('perfilado_actual', default=None)
+
+_muestras = {}
+_candado = threading.Lock()
+
+
+class _Medicion:
+    """Acumuladores de una petición."""
+    __slots__ = ('consultas', 'bd', 'plantillas', 'pdf')
+
+    def __init__(self):
+        self.consultas = 0
+        self.bd = 0.0
+        self.plantillas = 0.0
+        self.pdf = 0.0
+
+
+@contextmanager
+def medir(categoria):
+    """
+    Suma la duración del bloque a la categoría ('plantillas' o 'pdf')
+    de la petición que se está perfilando. Si no hay ninguna, no hace nada.
+    """
+    medicion = _actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(medicion, categoria, getattr(medicion, categoria) + time.perf_counter() - inicio)
+
+
+def _contar_consulta(execute, sql, params, many, context):
+    """execute_wrapper de Django: cuenta cada consulta y su duración."""
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.bd += time.perf_counter() - inicio
+        medicion.consultas += 1
+
+
+_plantillas_instrumentadas = False
+
+
+def _instrumentar_plantillas():
+    """Envuelve Template.render del motor de Django una sola vez por proceso."""
+    global _plantillas_instrumentadas
+    if _plantillas_instrumentadas:
+        return
+    from django.template.backends.django import Template
+
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        with medir('plantillas'):
+            return original(self, context, request)
+
+    Template.render = render
+    _plantillas_instrumentadas = True
+
+
+# ============================
+# Muestras y percentiles
+# ============================
+def registrar(nombre, valores):
+    """Guarda los valores (tupla en el orden de METRICAS) de una petición."""
+    with _candado:
+        muestras = _muestras.get(nombre)
+        if muestras is None:
+            muestras = _muestras[nombre] = deque(maxlen=getattr(settings, 'PERFILADO_MUESTRAS', 1000))
+        muestras.append(valores)
+
+
+def percentil(ordenados, p):
+    """Percentil por rango más cercano de una lista ya ordenada."""
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def resumen():
+    """
+    {nombre de URL: {'muestras': n, métrica: {'p50': .., 'p90': .., 'p99': ..}}}
+    con las últimas muestras de este proceso.
+    """
+    with _candado:
+        copia = {nombre: list(muestras) for nombre, muestras in _muestras.items()}
+
+    datos = {}
+    for nombre, muestras in sorted(copia.items()):
+        datos[nombre] = {'muestras': len(muestras)}
+        for i, metrica in enumerate(METRICAS):
+            ordenados = sorted(muestra[i] for muestra in muestras)
+            datos[nombre][metrica] = {f'p{p}': round(percentil(ordenados, p), 2) for p in PERCENTILES}
+    return datos
+
+
+def limpiar():
+    with _candado:
+        _muestras.clear()
+
+
+# ============================
+# Middleware
+# ============================
+class PerfiladoMiddleware:
+    """
+    Mide cada petición (o una fracción, PERFILADO_MUESTREO) y agrega
+    el encabezado Server-Timing. Si PERFILADO_ACTIVO es False Django lo
+    descarta al arrancar, así que no cuesta nada.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFILADO_ACTIVO', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.muestreo = getattr(settings, 'PERFILADO_MUESTREO', 1.0)
+        self.encabezado = getattr(settings, 'PERFILADO_SERVER_TIMING', True)
+        _instrumentar_plantillas()
+
+    def __call__(self, request):
+        if self.muestreo < 1 and random.random() >= self.muestreo:
+            return self.get_response(request)
+
+        medicion = _Medicion()
+        token = _actual.set(medicion)
+        envolturas = [conexion.execute_wrapper(_contar_consulta) for conexion in connections.all()]
+        for envoltura in envolturas:
+            envoltura.__enter__()
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - inicio
+            for envoltura in reversed(envolturas):
+                envoltura.__exit__(None, None, None)
+            _actual.reset(token)
+
+        coincidencia = getattr(request, 'resolver_match', None)
+        nombre = (coincidencia.url_name or coincidencia.view_name) if coincidencia else 'sin_url'
+        registrar(nombre, (
+            total * 1000, medicion.consultas, medicion.bd * 1000,
+            medicion.plantillas * 1000, medicion.pdf * 1000,
+        ))
+
+        if self.encabezado:
+            response['Server-Timing'] = ', '.join([
+                f'bd;dur={medicion.bd * 1000:.1f};desc="{medicion.consultas} consultas"',
+                f'plantillas;dur={medicion.plantillas * 1000:.1f}',
+                f'pdf;dur={medicion.pdf * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ])
+        return response
@@ -0,0 +1,136 @@
+# ==========================================
+# Utilidades para medir rendimiento
+# Incluye:
+#   - verificar_base_desechable: impide borrar una base que no es la del benchmark
+#   - sembrar: base de datos sintética de N doctores x M pacientes
+#   - doctores_sembrados: doctores creados por sembrar
+#   - resumir: rendimiento, p50/p99 y consultas de una serie de mediciones
+# Las usan los comandos medir_rendimiento y prueba_carga (ver apnea/settings_benchmark.py).
+# ==========================================
+import datetime
+import random
+import statistics
+
+from django.contrib.auth.hashers import make_password
+from django.conf import settings
+from django.contrib.auth.models import User, Group
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import doctores as doctores_cache, estadisticas
+from .busqueda import guardar_palabras
+from .importacion import preparar_lote
+from .models import Paciente
+from .perfilado import percentil
+from .roles import GRUPO_DOCTORES
+
+PREFIJO_DOCTOR = 'bench_doctor'
+CLAVE_DOCTOR = 'bench-clave-123'
+
+NOMBRES = ('José', 'María', 'Juan', 'Ana', 'Luis', 'Sofía', 'Carlos', 'Lucía', 'Jesús', 'Elena')
+APELLIDOS = ('García', 'Hernández', 'López', 'Martínez', 'Pérez', 'Sánchez', 'Ramírez', 'Núñez')
+
+# Los pacientes sembrados se reparten en los últimos dos años (tendencias)
+DIAS_HISTORIAL = 730
+
+
+def nombre_doctor(numero):
+    return f'{PREFIJO_DOCTOR}{numero:04d}'
+
+
+def doctores_sembrados():
+    """Doctores creados por sembrar(), en orden."""
+    return User.objects.filter(username__startswith=PREFIJO_DOCTOR).order_by('username')
+
+
+def paciente_aleatorio(rng, paciente_id, doctor=None):
+    """Paciente con datos verosímiles (sin calcular STOP-BANG)."""
+    return Paciente(
+        id=paciente_id,
+        doctor=doctor,
+        nombres=rng.choice(NOMBRES),
+        apellidos=f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}',
+        edad=rng.randint(18, 85),
+        sexo=rng.choice('MF'),
+        estatura=round(rng.uniform(1.45, 1.95), 2),
+        peso=round(rng.uniform(45, 140), 1),
+        cuello=round(rng.uniform(30, 50), 1),
+        ronca=rng.random() < 0.5,
+        cansado=rng.random() < 0.5,
+        observado=rng.random() < 0.3,
+        presion_alta=rng.random() < 0.35,
+        fecha_registro=timezone.now() - datetime.timedelta(seconds=rng.randrange(DIAS_HISTORIAL * 86400)),
+    )
+
+
+def verificar_base_desechable(confirmado=False):
+    """
+    Antes de vaciar la base con flush: solo con settings que declaran BENCHMARK = True
+    (apnea/settings_benchmark.py) o con --confirmar-borrado, y siempre en SQLite.
+    """
+    if not getattr(settings, 'BENCHMARK', False) and not confirmado:
+        raise CommandError(
+            f'Este comando borra la base {connection.settings_dict["NAME"]}: ejecútelo con '
+            '--settings=apnea.settings_benchmark (o agregue --confirmar-borrado).'
+        )
+    if connection.vendor != 'sqlite':
+        raise CommandError(
+            'Este comando borra y siembra datos: ejecútelo con --settings=apnea.settings_benchmark (SQLite).'
+        )
+
+
+def sembrar(doctores, pacientes, semilla=1, bloque=2000):
+    """
+    Crea `doctores` doctores con `pacientes` pacientes cada uno
+    (bulk_create, STOP-BANG vectorizado). La base debe estar vacía.
+    Devuelve la lista de doctores creados.
+    """
+    rng = random.Random(semilla)
+    grupo, _ = Group.objects.get_or_create(name=GRUPO_DOCTORES)
+
+    with transaction.atomic():
+        # Todos comparten la misma contraseña: se calcula el hash una sola vez
+        clave = make_password(CLAVE_DOCTOR)
+        User.objects.bulk_create(
+            [User(username=nombre_doctor(d), password=clave) for d in range(doctores)]
+        )
+        usuarios = list(doctores_sembrados())
+        User.groups.through.objects.bulk_create(
+            [User.groups.through(user_id=u.pk, group_id=grupo.pk) for u in usuarios]
+        )
+
+    for numero, doctor in enumerate(usuarios):
+        lote = [paciente_aleatorio(rng, f'B{numero:04d}-{i:06d}', doctor) for i in range(pacientes)]
+        for inicio in range(0, len(lote), bloque):
+            parte = lote[inicio:inicio + bloque]
+            preparar_lote(parte)
+            with transaction.atomic():
+                Paciente.objects.bulk_create(parte)
+                guardar_palabras(parte, nuevos=True)
+
+    # bulk_create no dispara señales: se actualizan estadísticas y lista de doctores
+    estadisticas.reconstruir([u.pk for u in usuarios])
+    doctores_cache.invalidar()
+    return usuarios
+
+
+def resumir(latencias, consultas=None):
+    """
+    Resumen de una serie de mediciones.
+    - latencias: segundos por petición.
+    - consultas: consultas a la BD por petición (opcional).
+    """
+    ordenadas = sorted(latencias)
+    total = sum(ordenadas)
+    datos = {
+        'repeticiones': len(ordenadas),
+        'por_segundo': round(len(ordenadas) / total, 2) if total else None,
+        'p50_ms': round(percentil(ordenadas, 50) * 1000, 2),
+        'p99_ms': round(percentil(ordenadas, 99) * 1000, 2),
+        'media_ms': round(statistics.mean(ordenadas) * 1000, 2),
+    }
+    if consultas:
+        datos['consultas'] = statistics.median_low(consultas)
+        datos['consultas_max'] = max(consultas)
+    return datos
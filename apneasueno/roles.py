@@ -0,0 +1,117 @@
+# ==========================================
+# Rol de doctor (pertenencia al grupo 'Doctores')
+# Incluye:
+#   - consultar: pregunta a la base de datos una sola vez por objeto User
+#   - es_doctor: además guarda el resultado en la sesión
+#   - doctor_requerido: decorador para vistas exclusivas de doctores
+#   - invalidar: se llama desde las señales cuando cambian los grupos
+# ==========================================
+import time
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
+
+GRUPO_DOCTORES = 'Doctores'
+CLAVE_SESION = 'rol_doctor'
+CLAVE_VERSION_GLOBAL = 'roles:version'
+
+
+def _clave_version(user_id):
+    return f'roles:version:{user_id}'
+
+
+def _version(user_id):
+    """Versión de los roles del usuario; cambia cuando se modifican sus grupos."""
+    versiones = cache.get_many([CLAVE_VERSION_GLOBAL, _clave_version(user_id)])
+    return [versiones.get(CLAVE_VERSION_GLOBAL, 0), versiones.get(_clave_version(user_id), 0)]
+
+
+def _incrementar(clave):
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, 1, None)
+
+
+def invalidar(user_id=None):
+    """
+    Marca como vencido el rol guardado en sesión.
+    - Con user_id solo afecta a ese usuario; sin él, a todos.
+    """
+    _incrementar(CLAVE_VERSION_GLOBAL if user_id is None else _clave_version(user_id))
+
+
+def consultar(user):
+    """Pertenencia al grupo Doctores; la consulta se hace una vez por objeto User."""
+    if not user.is_authenticated:
+        return False
+    if not hasattr(user, '_es_doctor'):
+        user._es_doctor = user.groups.filter(name=GRUPO_DOCTORES).exists()
+    return user._es_doctor
+
+
+def recordar(request, valor):
+    """Guarda el rol del usuario actual en la sesión."""
+    request.user._es_doctor = valor
+    request.session[CLAVE_SESION] = {
+        'usuario': request.user.pk,
+        'valor': valor,
+        'version': _version(request.user.pk),
+        'vence': time.time() + getattr(settings, 'ROLES_SESION_TTL', 300),
+    }
+
+
+def es_doctor(request):
+    """
+    ¿El usuario de la petición es doctor?
+    - Primero se usa lo ya calculado en esta petición.
+    - Luego lo guardado en la sesión (si no venció ni cambiaron sus grupos).
+    - Solo si no hay nada válido se consulta la base de datos.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    if hasattr(user, '_es_doctor'):
+        return user._es_doctor
+
+    guardado = request.session.get(CLAVE_SESION)
+    if (
+        guardado
+        and guardado['usuario'] == user.pk
+        and guardado['vence'] > time.time()
+        and guardado['version'] == _version(user.pk)
+    ):
+        user._es_doctor = guardado['valor']
+        return user._es_doctor
+
+    recordar(request, consultar(user))
+    return user._es_doctor
+
+
+def doctor_requerido(vista):
+    """
+    Equivale a @login_required + @user_passes_test(es_doctor_check),
+    pero usando el rol guardado en la sesión.
+    - También acepta vistas async: la sesión y el usuario se leen con sync_to_async.
+    """
+    if asyncio.iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(request, *args, **kwargs):
+            # Anónimos y no doctores van al login, igual que con @login_required
+            if not await sync_to_async(es_doctor)(request):
+                return redirect_to_login(request.get_full_path())
+            return await vista(request, *args, **kwargs)
+        return envoltura_async
+
+    @login_required
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if not es_doctor(request):
+            return redirect_to_login(request.get_full_path())
+        return vista(request, *args, **kwargs)
+    return envoltura
@@ -0,0 +1,83 @@
+# ==========================================
+# Señales de la aplicación
+# Mantienen al día las cachés cuando cambia un Paciente,
+# los grupos de un usuario o la lista de doctores
+# ==========================================
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.contrib.auth.models import User, Group
+
+from .models import Paciente
+from . import cache_pdf, cache_paginas, doctores, estadisticas, roles
+
+
+@receiver(post_save, sender=Paciente)
+@receiver(post_delete, sender=Paciente)
+def invalidar_pase_pdf(sender, instance, **kwargs):
+    """Al guardar o eliminar un paciente se borran sus pases en caché."""
+    cache_pdf.invalidar_paciente(instance.pk)
+
+
+@receiver(pre_save, sender=Paciente)
+def recordar_fila_anterior(sender, instance, raw=False, **kwargs):
+    """Antes de guardar se lee cómo estaba el paciente (para restar de sus conteos)."""
+    if raw:
+        return
+    instance._fila_estadistica = (
+        Paciente.objects.filter(pk=instance.pk).values(*estadisticas.CAMPOS_FILA).first()
+    )
+
+
+@receiver(post_save, sender=Paciente)
+def actualizar_estadisticas_guardado(sender, instance, raw=False, **kwargs):
+    """Mueve al paciente del conteo anterior al nuevo en EstadisticaDoctor y EstadisticaDiaria."""
+    if raw:
+        return
+    anterior = getattr(instance, '_fila_estadistica', None)
+    estadisticas.registrar_cambio(anterior, estadisticas.fila_de(instance))
+    # Las páginas en caché del doctor anterior y del actual quedan obsoletas
+    cache_paginas.invalidar_doctores([instance.doctor_id, anterior and anterior['doctor_id']])
+
+
+@receiver(post_delete, sender=Paciente)
+def actualizar_estadisticas_borrado(sender, instance, **kwargs):
+    """Resta al paciente eliminado de los conteos de su doctor."""
+    estadisticas.registrar_cambio(estadisticas.fila_de(instance), None)
+    cache_paginas.invalidar_doctores([instance.doctor_id])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_rol_usuario(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Al agregar o quitar grupos a un usuario se vence su rol guardado en sesión
+    y la lista de doctores (p. ej. un doctor nuevo en doctor_register).
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    doctores.invalidar()
+    if not reverse:
+        roles.invalidar(instance.pk)
+    elif pk_set:
+        # group.user_set.add(...): los afectados vienen en pk_set
+        for user_id in pk_set:
+            roles.invalidar(user_id)
+    else:
+        # group.user_set.clear(): no se sabe a quiénes afectó
+        roles.invalidar()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidar_roles(sender, instance, **kwargs):
+    """Renombrar o borrar un grupo vence el rol guardado de todos."""
+    roles.invalidar()
+    doctores.invalidar()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_lista_doctores(sender, instance, update_fields=None, **kwargs):
+    """Cambiar el nombre o borrar un usuario cambia la lista de doctores (iniciar sesión no)."""
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    doctores.invalidar()
@@ -0,0 +1,106 @@
+# ==========================================
+# Motor de cálculo STOP-BANG
+# Incluye:
+#   - calcular: IMC, puntuación y riesgo de un paciente (lo usa Paciente.save())
+#   - calcular_lote: lo mismo para muchos pacientes a la vez con arreglos NumPy
+# Los umbrales se pueden ajustar con STOPBANG_UMBRALES en settings.py.
+# ==========================================
+from django.conf import settings
+
+RIESGO_BAJO = 'Bajo riesgo de AOS'
+RIESGO_INTERMEDIO = 'Riesgo intermedio de AOS'
+RIESGO_ALTO = 'Alto riesgo de AOS'
+
+UMBRALES = {
+    'edad': 50,     # años (B: mayor de 50)
+    'imc': 35,      # kg/m² (B: IMC mayor de 35)
+    'cuello': 40,   # cm (N: cuello mayor de 40)
+}
+
+PREGUNTAS = ('ronca', 'cansado', 'observado', 'presion_alta')
+
+# Campos del paciente que necesita el cálculo y campos que produce
+CAMPOS_ENTRADA = ('edad', 'estatura', 'peso', 'cuello', 'imc') + PREGUNTAS
+CAMPOS_SALIDA = ('imc', 'puntuacion_stopbang', 'riesgo')
+
+
+def umbrales():
+    """Umbrales vigentes (los de settings.STOPBANG_UMBRALES tienen prioridad)."""
+    return {**UMBRALES, **getattr(settings, 'STOPBANG_UMBRALES', {})}
+
+
+def riesgo_de(puntos):
+    """Nivel de riesgo según la puntuación: 0-1 bajo, 2-3 intermedio, 4+ alto."""
+    if puntos <= 1:
+        return RIESGO_BAJO
+    elif 2 <= puntos <= 3:
+        return RIESGO_INTERMEDIO
+    return RIESGO_ALTO
+
+
+def imc_de(estatura, peso):
+    """
+    IMC redondeado a 2 decimales, o None sin estatura o peso positivos.
+    calcular() y calcular_lote() lo usan ambos para guardar exactamente el mismo valor
+    (np.round redondea distinto que round() en algunos casos: 58.1 / 2.0² -> 14.52 vs 14.53).
+    """
+    if estatura is None or peso is None or not (estatura > 0 and peso > 0):
+        return None
+    return round(peso / (estatura ** 2), 2)
+
+
+def calcular(edad, estatura, peso, cuello, ronca, cansado, observado, presion_alta, imc=None):
+    """
+    Calcula (imc, puntuacion, riesgo) de un paciente.
+    - Si faltan peso o estatura (o no son positivos) se conserva el IMC recibido.
+    """
+    limites = umbrales()
+
+    calculado = imc_de(estatura, peso)
+    if calculado is not None:
+        imc = calculado
+
+    puntos = 0
+    if edad and edad > limites['edad']: puntos += 1
+    if ronca: puntos += 1
+    if cansado: puntos += 1
+    if observado: puntos += 1
+    if presion_alta: puntos += 1
+    if imc and imc > limites['imc']: puntos += 1
+    if cuello and cuello > limites['cuello']: puntos += 1
+
+    return imc, puntos, riesgo_de(puntos)
+
+
+def calcular_lote(columnas):
+    """
+    Versión vectorizada de calcular().
+    Recibe un diccionario {campo: lista de valores} con CAMPOS_ENTRADA
+    (los None se permiten) y devuelve (imc, puntuacion, riesgo) como arreglos NumPy.
+    """
+    import numpy as np
+
+    limites = umbrales()
+
+    def numeros(campo):
+        # None -> NaN; las comparaciones con NaN dan False, igual que en calcular()
+        return np.array([np.nan if v is None else v for v in columnas[campo]], dtype=float)
+
+    def booleanos(campo):
+        return np.array([bool(v) for v in columnas[campo]], dtype=bool)
+
+    # El IMC se calcula elemento por elemento con imc_de (mismo redondeo que calcular())
+    calculado = np.array(
+        [imc_de(e, p) for e, p in zip(columnas['estatura'], columnas['peso'])], dtype=float,
+    )
+    imc = np.where(np.isnan(calculado), numeros('imc'), calculado)
+
+    puntos = (
+        (numeros('edad') > limites['edad']).astype(int)
+        + sum(booleanos(pregunta).astype(int) for pregunta in PREGUNTAS)
+        + (imc > limites['imc']).astype(int)
+        + (numeros('cuello') > limites['cuello']).astype(int)
+    )
+
+    riesgo = np.where(puntos <= 1, RIESGO_BAJO, np.where(puntos <= 3, RIESGO_INTERMEDIO, RIESGO_ALTO))
+    return imc, puntos, riesgo
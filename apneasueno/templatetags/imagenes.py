@@ -0,0 +1,52 @@
+# ==========================================
+# Etiquetas de plantilla para imágenes
+# Uso: {% load imagenes %}
+#   {% imagen 'img/imgdoctor2.png' 150 alt='Doctor' class='img-fluid' %}
+#       <picture> con srcset WebP y PNG de los derivados (ver apneasueno/imagenes.py)
+#   {% imagen_impresion 'img/hospital.png' %}
+#       URL del logo de impresión (para PDF generados en el navegador)
+# Sin derivados generados se usa la imagen original.
+# ==========================================
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from apneasueno import imagenes
+
+register = template.Library()
+
+
+def _srcset(variantes, formato):
+    return ', '.join(f'{static(variante[formato])} {variante["ancho"]}w' for variante in variantes)
+
+
+@register.simple_tag
+def imagen(original, ancho, alt='', **atributos):
+    """
+    <picture> para mostrar `original` a `ancho` px CSS:
+    el navegador elige en srcset el WebP (o PNG) adecuado a su densidad de pantalla.
+    Los atributos extra (class, style, loading='lazy'...) se agregan al <img>.
+    """
+    variantes = imagenes.variantes(original)
+    atributos = format_html_join('', ' {}="{}"', sorted(atributos.items()))
+    if not variantes:
+        return format_html('<img src="{}" alt="{}" width="{}"{}>', static(original), alt, ancho, atributos)
+
+    # La más chica que cubra el ancho pedido es el src por defecto
+    principal = next((v for v in variantes if v['ancho'] >= int(ancho)), variantes[-1])
+    alto = round(principal['alto'] * int(ancho) / principal['ancho'])
+    tamanos = f'{ancho}px'
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" decoding="async"{}>'
+        '</picture>',
+        _srcset(variantes, 'webp'), tamanos,
+        static(principal['png']), _srcset(variantes, 'png'), tamanos, ancho, alto, alt, atributos,
+    )
+
+
+@register.simple_tag
+def imagen_impresion(original):
+    """URL del logo de impresión de `original` (o de la imagen original)."""
+    return static(imagenes.ruta_impresion(original) or original)
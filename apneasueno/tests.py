@@ -1,3 +1,585 @@
-from django.test import TestCase
+# ==========================================
+# Pruebas de regresión de consultas de Paciente
+# Incluye:
+#   - Número exacto de consultas por vista
+#   - Plan de ejecución (EXPLAIN) de las consultas de cada vista:
+#     ninguna debe recorrer completa la tabla de pacientes
+#   - Uso de los índices compuestos declarados en Paciente.Meta
+#   - Búsqueda por prefijo de palabra con el índice de PalabraPaciente
+#   - calcular_lote da lo mismo que calcular (IMC, puntos y riesgo)
+#   - Conteos diarios (EstadisticaDiaria) iguales a recalcularlos
+#   - Consultas constantes por página en el admin de pacientes
+#   - Exportación por bloques con paginación por clave (una consulta con LIMIT por bloque)
+#   - medir_rendimiento y prueba_carga se niegan a borrar una base que no es la del benchmark
+#   - Pases async: misma cola que los trabajos (503 si está llena) y un solo render por pase
+#   - IP del cliente detrás del proxy (límite de intentos por IP)
+#   - Archivos estáticos: variante según Accept-Encoding y caché de un año con hash;
+#     bajo ASGI la cadena de middleware sigue siendo async
+# Ejecutar con: python manage.py test apneasueno
+# ==========================================
+import os
+import re
+import json
+import random
+import shutil
+import asyncio
+import datetime
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.contrib.auth.models import User, Group
+from django.core.handlers.asgi import ASGIHandler
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import busqueda, estadisticas, exportacion, estaticos, imagenes, limites, stopbang, trabajos_pdf, views_async
+from .models import Paciente, EstadisticaDiaria
+
+# Caché en memoria y carpetas temporales: las pruebas no tocan cache_django/ ni cache_pdf/
+CONFIGURACION_PRUEBAS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    'PDF_CACHE_DIR': tempfile.mkdtemp(prefix='pruebas_pdf_'),
+    'PACIENTES_POR_PAGINA': 10,
+    'STATICFILES_STORAGE': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+}
+
+TABLA = Paciente._meta.db_table
+
+
+def planes(consultas):
+    """
+    EXPLAIN de cada SELECT capturado que lee la tabla de pacientes.
+    Devuelve una lista de (sql, plan en texto).
+    """
+    resultado = []
+    prefijo = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        for consulta in consultas:
+            sql = consulta['sql']
+            if not sql.startswith('SELECT') or TABLA not in sql:
+                continue
+            cursor.execute(f'{prefijo} {sql}')
+            resultado.append((sql, '\n'.join(' '.join(map(str, fila)) for fila in cursor.fetchall())))
+    return resultado
+
+
+def recorre_tabla(plan):
+    """True si el plan lee la tabla de pacientes completa (sin índice)."""
+    if connection.vendor == 'sqlite':
+        return re.search(rf'SCAN (TABLE )?{TABLA}\s*$', plan, re.MULTILINE) is not None
+    if connection.vendor == 'mysql':
+        # Columna "type" = ALL en el EXPLAIN tradicional de MySQL
+        return re.search(rf'\b{TABLA}\b.*\bALL\b', plan) is not None
+    return False
+
+
+def busca_prefijo(plan, indice):
+    """True si el plan busca un rango de palabras en `indice` (no lo recorre completo)."""
+    if connection.vendor == 'sqlite':
+        return re.search(rf'SEARCH \S+ USING (COVERING )?INDEX {indice} \([^)]*palabra>\?', plan) is not None
+    if connection.vendor == 'mysql':
+        # Columna "type" = range sobre el índice (ALL o index serían recorridos completos)
+        return re.search(rf'\brange\b.*\b{indice}\b', plan) is not None
+    return True
+
+
+@override_settings(**CONFIGURACION_PRUEBAS)
+class ConsultasPacienteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        grupo, _ = Group.objects.get_or_create(name='Doctores')
+        cls.doctor = User.objects.create_user('doctor', password='clave-segura-1')
+        cls.doctor.groups.add(grupo)
+        otro = User.objects.create_user('otro', password='clave-segura-1')
+        otro.groups.add(grupo)
+
+        # save() calcula STOP-BANG, la clave de búsqueda y las estadísticas del doctor
+        for i in range(30):
+            Paciente(
+                id=f'P{i:03d}', nombres=f'José {i}', apellidos='Pérez López',
+                edad=30 + i, sexo='M' if i % 2 else 'F', estatura=1.70, peso=60 + i * 2,
+                cuello=35 + i % 10, ronca=bool(i % 3), cansado=bool(i % 4),
+                observado=False, presion_alta=bool(i % 5), doctor=cls.doctor,
+            ).save()
+        for i in range(10):
+            Paciente(
+                id=f'Q{i:03d}', nombres=f'Ana {i}', apellidos='García',
+                edad=40, sexo='F', estatura=1.60, peso=55, cuello=33,
+                ronca=False, cansado=False, observado=False, presion_alta=False, doctor=otro,
+            ).save()
+
+    def setUp(self):
+        self.client.force_login(self.doctor)
+        # Primera visita de doctor: guarda el rol en la sesión (ver roles.py);
+        # luego se vacía la caché para medir las vistas sin páginas guardadas
+        self.client.get(reverse('graficas'))
+        cache.clear()
+
+    def medir(self, consultas_esperadas, url, datos=None):
+        """GET con el número exacto de consultas esperado; devuelve las consultas capturadas."""
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.client.get(url, datos or {})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(
+            len(capturadas), consultas_esperadas,
+            '\n'.join(consulta['sql'] for consulta in capturadas.captured_queries),
+        )
+        return capturadas.captured_queries
+
+    def assertSinRecorridoCompleto(self, consultas):
+        for sql, plan in planes(consultas):
+            self.assertFalse(recorre_tabla(plan), f'Recorrido completo de {TABLA}:\n{sql}\n{plan}')
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        self.assertIn(indice, plan, plan)
+
+    # ============================
+    # Consultas por vista
+    # (sesión + usuario + las propias de la vista)
+    # ============================
+    def test_pacientes_doctor(self):
+        # Página de pacientes (keyset por ID)
+        self.assertSinRecorridoCompleto(self.medir(3, reverse('pacientes_doctor')))
+
+    def test_pacientes_doctor_en_cache(self):
+        self.client.get(reverse('pacientes_doctor'))
+        # Página guardada: solo sesión y usuario
+        self.medir(2, reverse('pacientes_doctor'))
+
+    def test_pacientes_doctor_siguiente_pagina(self):
+        primera = self.client.get(reverse('pacientes_doctor'))
+        siguiente = primera.context['url_siguiente']
+        self.assertIsNotNone(siguiente)
+        self.assertSinRecorridoCompleto(self.medir(3, reverse('pacientes_doctor') + siguiente))
+
+    def test_pacientes_doctor_riesgo(self):
+        consultas = self.medir(3, reverse('pacientes_doctor'), {'riesgo': stopbang.RIESGO_ALTO})
+        self.assertSinRecorridoCompleto(consultas)
+
+    def test_pacientes_doctor_busqueda(self):
+        # Coincidencia exacta por ID + página de resultados
+        consultas = self.medir(4, reverse('pacientes_doctor'), {'buscar': 'jose'})
+        self.assertSinRecorridoCompleto(consultas)
+
+    def test_busqueda_por_prefijo_indexada(self):
+        casos = [
+            (reverse('pacientes_doctor'), {'buscar': 'jo pe'}, 'palabra_doctor_idx'),
+            (reverse('pacientes'), {'buscar': 'jo pe'}, 'palabra_doctor_idx'),
+        ]
+        for url, datos, indice in casos:
+            cache.clear()
+            with CaptureQueriesContext(connection) as capturadas:
+                respuesta = self.client.get(url, datos)
+            self.assertTrue(respuesta.context['pacientes'])
+            con_palabras = [(sql, plan) for sql, plan in planes(capturadas) if 'palabrapaciente' in sql]
+            self.assertTrue(con_palabras)
+            for sql, plan in con_palabras:
+                # Un rango por término: 'jo' y 'pe'
+                self.assertEqual(len(re.findall(indice, plan)), 2, f'{sql}\n{plan}')
+                self.assertTrue(busca_prefijo(plan, indice), f'{sql}\n{plan}')
+
+        pacientes = busqueda.filtrar(Paciente.objects.order_by('id'), 'ana')
+        self.assertEqual(pacientes.count(), 10)
+        self.assertTrue(busca_prefijo(pacientes.explain(), 'palabra_idx'), pacientes.explain())
+
+    def test_busqueda_terminos_completos(self):
+        # Términos que terminan en 'z' o '9' (un rango < 'jp' fallaba con collations UCA)
+        pacientes = Paciente.objects.all()
+        self.assertEqual(list(busqueda.filtrar(pacientes, 'p009').values_list('id', flat=True)), ['P009'])
+        self.assertEqual(busqueda.filtrar(pacientes, 'Lopez', doctor=self.doctor).count(), 30)
+        self.assertEqual(busqueda.filtrar(pacientes, 'garcia q009').count(), 1)
+        self.assertFalse(busqueda.filtrar(pacientes, 'jo*').exists())
+
+        self.client.force_login(User.objects.create_superuser('admin', password='clave-segura-1'))
+        respuesta = self.client.get(reverse('admin:apneasueno_paciente_changelist'), {'q': 'pérez p029'})
+        self.assertEqual([p.id for p in respuesta.context['cl'].result_list], ['P029'])
+
+    def test_palabras_al_guardar(self):
+        paciente = Paciente.objects.get(id='Q000')
+        paciente.apellidos = 'Núñez'
+        paciente.save()
+        self.assertEqual(
+            set(paciente.palabras.values_list('palabra', flat=True)), {'q000', 'ana', '0', 'nunez'}
+        )
+        self.assertFalse(busqueda.filtrar(Paciente.objects.all(), 'garc').filter(id='Q000').exists())
+
+    def test_pacientes_doctor_contar(self):
+        # ?contar=1 agrega el total (estimado en MySQL, COUNT en otros motores)
+        consultas = self.medir(4, reverse('pacientes_doctor'), {'contar': '1'})
+        self.assertSinRecorridoCompleto(consultas)
+
+    def test_pacientes_busqueda(self):
+        consultas = self.medir(4, reverse('pacientes'), {'buscar': 'P001'})
+        self.assertSinRecorridoCompleto(consultas)
+
+    def test_triage(self):
+        consultas = self.medir(3, reverse('triage'), {'k': '5'})
+        self.assertSinRecorridoCompleto(consultas)
+
+    def test_triage_orden(self):
+        respuesta = self.client.get(reverse('triage'), {'k': '5'})
+        obtenidos = [(p.puntuacion_stopbang, p.fecha_registro, p.id) for p in respuesta.context['pacientes']]
+        esperados = sorted(
+            ((p.puntuacion_stopbang, p.fecha_registro, p.id) for p in Paciente.objects.filter(doctor=self.doctor)),
+            key=lambda fila: (-fila[0], fila[1], fila[2]),
+        )[:5]
+        self.assertEqual(obtenidos, esperados)
+
+    def test_graficas(self):
+        # Lee la fila de EstadisticaDoctor; no agrupa pacientes
+        consultas = self.medir(3, reverse('graficas'))
+        self.assertFalse(any(TABLA in consulta['sql'] for consulta in consultas))
+
+    def test_tendencias(self):
+        # Solo EstadisticaDiaria, aunque el rango sea de años
+        hoy = timezone.localdate()
+        rango = {'desde': (hoy - datetime.timedelta(days=3 * 365)).isoformat(), 'hasta': hoy.isoformat()}
+        consultas = self.medir(3, reverse('tendencias'), rango)
+        self.assertFalse(any(TABLA in consulta['sql'] for consulta in consultas))
+        respuesta = self.client.get(reverse('tendencias'), {**rango, 'agrupar': 'semana'})
+        self.assertEqual(sum(respuesta.context['tendencias']['total']), 30)
+
+    def test_tendencias_rango_limitado(self):
+        hoy = timezone.localdate()
+        # Fechas fuera de rango: formulario inválido y rango por defecto (sin error 500)
+        for datos in ({'desde': '0001-01-01', 'agrupar': 'dia'}, {'hasta': '9999-12-31'}):
+            respuesta = self.client.get(reverse('tendencias'), datos)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertTrue(respuesta.context['form'].errors)
+            self.assertEqual(len(respuesta.context['tendencias']['periodos']), 30)
+
+        # Rango válido pero largo: ?agrupar=dia pasaría de TENDENCIAS_PUNTOS_MAX
+        desde = datetime.date(2000, 1, 1)
+        respuesta = self.client.get(reverse('tendencias'), {'desde': desde.isoformat(), 'agrupar': 'dia'})
+        self.assertEqual(respuesta.context['agrupar'], 'mes')
+        self.assertEqual(len(respuesta.context['tendencias']['periodos']), estadisticas.numero_periodos(desde, hoy, 'mes'))
+        with self.settings(TENDENCIAS_PUNTOS_MAX=100):
+            self.assertEqual(estadisticas.agrupacion_para(hoy - datetime.timedelta(days=99), hoy, 'dia'), 'dia')
+            self.assertEqual(estadisticas.agrupacion_para(hoy - datetime.timedelta(days=100), hoy, 'dia'), 'semana')
+
+    def test_exportacion_por_bloques(self):
+        pacientes = exportacion.filtrar()
+        with CaptureQueriesContext(connection) as capturadas:
+            lineas = b''.join(exportacion.iterar('ndjson', pacientes, tamano_bloque=7)).splitlines()
+        ids = [json.loads(linea)['id'] for linea in lineas]
+        self.assertEqual(ids, sorted(Paciente.objects.values_list('id', flat=True)))
+        # 40 pacientes: bloques de 7,7,7,7,7,5; cada consulta limitada y después del último ID
+        self.assertEqual(len(capturadas), 6)
+        for consulta in capturadas.captured_queries:
+            self.assertIn('LIMIT 7', consulta['sql'])
+        self.assertTrue(all(re.search(r'[`"]id[`"] >', c['sql']) for c in capturadas.captured_queries[1:]))
+
+    @override_settings(BENCHMARK=False)
+    def test_benchmark_no_borra_otra_base(self):
+        with self.assertRaisesMessage(CommandError, 'settings_benchmark'):
+            call_command('medir_rendimiento', '--repeticiones', '1')
+        self.assertEqual(Paciente.objects.count(), 40)
+
+    @override_settings(BENCHMARK=False)
+    def test_prueba_carga_no_borra_otra_base(self):
+        with self.assertRaisesMessage(CommandError, 'settings_benchmark'):
+            call_command('prueba_carga', '--duracion', '0.1', '--concurrencia', '1')
+        self.assertEqual(Paciente.objects.count(), 40)
+
+    def test_estadisticas_diarias_al_guardar(self):
+        # Cambiar de riesgo, de doctor o eliminar deja los mismos conteos que recalcular
+        paciente = Paciente.objects.get(id='P001')
+        paciente.ronca = paciente.cansado = paciente.observado = paciente.presion_alta = True
+        paciente.save()
+        Paciente.objects.get(id='P002').delete()
+        movido = Paciente.objects.get(id='Q001')
+        movido.doctor = self.doctor
+        movido.save()
+
+        def filas():
+            return sorted(
+                EstadisticaDiaria.objects.filter(total__gt=0)
+                .values_list('doctor_id', 'fecha', 'riesgo', 'sexo', 'total')
+            )
+
+        mantenidas = filas()
+        estadisticas.reconstruir_diarias()
+        self.assertEqual(mantenidas, filas())
+
+    def test_generar_pdf(self):
+        self.client.logout()
+        consultas = self.medir(1, reverse('generar_pdf', args=['P001']))
+        self.assertSinRecorridoCompleto(consultas)
+
+    # ============================
+    # Admin de pacientes
+    # ============================
+    def consultas_admin(self, datos):
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.client.get(reverse('admin:apneasueno_paciente_changelist'), datos)
+        self.assertEqual(respuesta.status_code, 200)
+        return len(capturadas)
+
+    def test_admin_consultas_constantes(self):
+        # sesión + usuario + total + página (+ el doctor elegido en el filtro),
+        # sin importar cuántos pacientes, doctores o páginas haya
+        self.client.force_login(User.objects.create_superuser('admin', password='clave-segura-1'))
+        casos = [{}, {'doctor__id__exact': self.doctor.pk}, {'q': 'jose', 'riesgo__exact': stopbang.RIESGO_ALTO}]
+        antes = [self.consultas_admin(datos) for datos in casos]
+        self.assertEqual(antes, [4, 5, 4])
+
+        for i in range(20):
+            User.objects.create_user(f'doctor{i}')
+        Paciente.objects.bulk_create(
+            Paciente(id=f'R{i:04d}', nombres='Luis', apellidos='Núñez', sexo='M', doctor=self.doctor)
+            for i in range(250)
+        )
+        self.assertEqual([self.consultas_admin(datos) for datos in casos], antes)
+        self.assertEqual([self.consultas_admin({'p': p}) for p in (1, 2)], [4, 4])
+
+    # ============================
+    # Índices compuestos
+    # ============================
+    def test_indice_doctor_id(self):
+        pacientes = Paciente.objects.filter(doctor=self.doctor)
+        self.assertUsaIndice(pacientes.order_by('id')[:10], 'paciente_doctor_id_idx')
+        self.assertUsaIndice(pacientes.filter(id__gt='P010').order_by('id')[:10], 'paciente_doctor_id_idx')
+
+    def test_indice_doctor_riesgo(self):
+        pacientes = Paciente.objects.filter(doctor=self.doctor, riesgo=stopbang.RIESGO_ALTO)
+        self.assertUsaIndice(pacientes, 'paciente_doctor_riesgo_idx')
+
+    def test_indice_doctor_sexo(self):
+        self.assertUsaIndice(Paciente.objects.filter(doctor=self.doctor, sexo='F'), 'paciente_doctor_sexo_idx')
+
+    def test_indice_triage(self):
+        # Las K filas salen del índice ya ordenadas (sin ordenar en memoria)
+        pacientes = Paciente.objects.filter(doctor=self.doctor).order_by('-puntuacion_stopbang', 'fecha_registro', 'id')
+        self.assertUsaIndice(pacientes[:5], 'paciente_triage_idx')
+        plan = pacientes[:5].explain()
+        if connection.vendor == 'sqlite':
+            self.assertNotIn('TEMP B-TREE', plan)
+        if connection.vendor == 'mysql':
+            # Con MySQL < 8 el índice no es descendente y aparece "Using filesort"
+            self.assertNotIn('filesort', plan)
+
+    def test_indice_riesgo_sexo(self):
+        # Filtros del admin y del extracto de investigación (sin doctor)
+        pacientes = Paciente.objects.filter(riesgo=stopbang.RIESGO_BAJO, sexo='M')
+        self.assertUsaIndice(pacientes, 'paciente_riesgo_sexo_idx')
+
+
+# ============================
+# Motor STOP-BANG
+# ============================
+class StopbangTests(SimpleTestCase):
+
+    def test_lote_igual_a_calcular(self):
+        azar = random.Random(2024)
+
+        def valor(generar):
+            return azar.choice([None, 0, -1.0, generar()])
+
+        pacientes = [
+            {
+                'edad': valor(lambda: azar.randint(18, 90)),
+                'estatura': valor(lambda: round(azar.uniform(1.2, 2.1), 2)),
+                'peso': valor(lambda: round(azar.uniform(35, 180), 1)),
+                'cuello': valor(lambda: round(azar.uniform(28, 50), 1)),
+                'imc': valor(lambda: round(azar.uniform(15, 50), 2)),
+                **{pregunta: azar.choice([None, False, True]) for pregunta in stopbang.PREGUNTAS},
+            }
+            for _ in range(5000)
+        ]
+        # Caso conocido en que np.round y round() difieren
+        pacientes.append({**pacientes[0], 'estatura': 2.0, 'peso': 58.1})
+
+        imc, puntos, riesgo = stopbang.calcular_lote(
+            {campo: [p[campo] for p in pacientes] for campo in stopbang.CAMPOS_ENTRADA}
+        )
+        for i, paciente in enumerate(pacientes):
+            esperado = stopbang.calcular(**paciente)
+            imc_lote = None if imc[i] != imc[i] else float(imc[i])  # NaN -> None
+            self.assertEqual((imc_lote, int(puntos[i]), riesgo[i]), esperado, paciente)
+
+
+# ============================
+# Pases PDF async
+# ============================
+@override_settings(**CONFIGURACION_PRUEBAS)
+class PasesAsyncTests(SimpleTestCase):
+
+    def setUp(self):
+        # Hilos en lugar de procesos y un "render" que espera a que la prueba lo libere
+        self.pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(self.pool.shutdown)
+        self.liberar = threading.Event()
+        self.renders = []
+
+        def renderizar(campos, base_url):
+            self.renders.append(campos['id'])
+            self.liberar.wait(5)
+            return b'%PDF ' + campos['id'].encode()
+
+        for parche in (
+            mock.patch.object(trabajos_pdf, '_obtener_pool', return_value=self.pool),
+            mock.patch.object(trabajos_pdf, '_renderizar_bytes', renderizar),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def test_cola_y_un_render_por_pase(self):
+        uno, dos = Paciente(id='A1', nombres='Uno'), Paciente(id='A2', nombres='Dos')
+
+        async def escenario():
+            mismos = [asyncio.ensure_future(trabajos_pdf.renderizar_async(uno, 'h1')) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            with self.assertRaises(trabajos_pdf.ColaLlena):
+                await trabajos_pdf.renderizar_async(dos, 'h2')
+            self.liberar.set()
+            return await asyncio.gather(*mismos)
+
+        with self.settings(PDF_COLA_MAXIMA=1):
+            self.assertEqual(asyncio.run(escenario()), [b'%PDF A1'] * 3)
+        self.assertEqual(self.renders, ['A1'])
+        self.assertEqual(trabajos_pdf._pendientes, set())
+        self.assertEqual(trabajos_pdf._en_curso, {})
+
+    def test_vista_responde_503_con_cola_llena(self):
+        # Sin base de datos: sync_to_async usaría otra conexión dentro de la transacción de la prueba
+        pase = (Paciente(id='A3', nombres='Tres'), 'h3', None)
+        with self.settings(PDF_COLA_MAXIMA=0), mock.patch.object(views_async, '_pase_disponible', return_value=pase):
+            respuesta = asyncio.run(views_async.generar_pdf(AsyncRequestFactory().get('/pdf/A3'), 'A3'))
+        self.assertEqual(respuesta.status_code, 503)
+        self.assertEqual(respuesta['Retry-After'], '5')
+        self.assertEqual(self.renders, [])
+
+
+# ============================
+# Límite de intentos
+# ============================
+class LimitesTests(SimpleTestCase):
+
+    def test_ip_del_proxy(self):
+        def ip(**meta):
+            return limites.ip_cliente(RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', **meta))
+
+        with self.settings(LIMITES_IP_ENCABEZADO='X-Real-IP'):
+            self.assertEqual(ip(HTTP_X_REAL_IP='203.0.113.7'), '203.0.113.7')
+            self.assertEqual(ip(), '10.0.0.1')
+        with self.settings(LIMITES_IP_ENCABEZADO='X-Forwarded-For'):
+            # La primera la puede inventar el cliente; la última la agregó el proxy
+            self.assertEqual(ip(HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7'), '203.0.113.7')
+        with self.settings(LIMITES_IP_ENCABEZADO=''):
+            self.assertEqual(ip(HTTP_X_REAL_IP='203.0.113.7'), '10.0.0.1')
+
+
+# ============================
+# Archivos estáticos
+# ============================
+class EstaticosTests(SimpleTestCase):
+
+    def setUp(self):
+        raiz = tempfile.mkdtemp(prefix='pruebas_static_')
+        self.addCleanup(shutil.rmtree, raiz)
+        os.makedirs(os.path.join(raiz, 'css'))
+        for nombre, datos in (
+            ('css/a.css', b'body{}' * 100), ('css/a.0123456789ab.css', b'body{}' * 100),
+            ('css/a.0123456789ab.css.br', b'br'), ('css/a.0123456789ab.css.gz', b'gz'),
+        ):
+            with open(os.path.join(raiz, nombre), 'wb') as archivo:
+                archivo.write(datos)
+        with open(os.path.join(raiz, 'staticfiles.json'), 'w') as archivo:
+            json.dump({'paths': {'css/a.css': 'css/a.0123456789ab.css'}, 'version': '1.0'}, archivo)
+
+        ajustes = override_settings(DEBUG=False, STATIC_ROOT=raiz, STATIC_URL='/static/', ESTATICOS_SERVIR=True)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.middleware = estaticos.EstaticosMiddleware(lambda request: HttpResponse('vista'))
+
+    def pedir(self, ruta, **cabeceras):
+        return self.middleware(RequestFactory().get(ruta, **cabeceras))
+
+    def test_variante_segun_accept_encoding(self):
+        casos = {'br, gzip': ('br', b'br'), 'gzip': ('gzip', b'gz'), 'gzip;q=0': (None, b'body{}' * 100)}
+        for cabecera, (codificacion, cuerpo) in casos.items():
+            respuesta = self.pedir('/static/css/a.0123456789ab.css', HTTP_ACCEPT_ENCODING=cabecera)
+            self.assertEqual(respuesta.get('Content-Encoding'), codificacion)
+            self.assertEqual(b''.join(respuesta.streaming_content), cuerpo)
+            self.assertEqual(respuesta['Vary'], 'Accept-Encoding')
+
+    def test_cache_de_un_ano_solo_con_hash(self):
+        self.assertEqual(self.pedir('/static/css/a.0123456789ab.css')['Cache-Control'], estaticos.CACHE_INMUTABLE)
+        self.assertNotIn('immutable', self.pedir('/static/css/a.css')['Cache-Control'])
+
+    def test_etag_y_otras_rutas(self):
+        etag = self.pedir('/static/css/a.0123456789ab.css', HTTP_ACCEPT_ENCODING='br')['ETag']
+        repetida = self.pedir('/static/css/a.0123456789ab.css', HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(repetida.status_code, 304)
+        # Lo que no está en STATIC_ROOT sigue a las vistas
+        self.assertEqual(self.pedir('/static/css/otro.css').content, b'vista')
+        self.assertEqual(self.pedir('/pacientes').content, b'vista')
+
+    def test_modo_async(self):
+        async def vista(request):
+            return HttpResponse('vista')
+
+        middleware = estaticos.EstaticosMiddleware(vista)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        respuesta = asyncio.run(middleware(RequestFactory().get('/static/css/a.css')))
+        self.assertEqual(b''.join(respuesta.streaming_content), b'body{}' * 100)
+        self.assertEqual(asyncio.run(middleware(RequestFactory().get('/pacientes'))).content, b'vista')
+
+    def test_cadena_asgi_sigue_async(self):
+        # Un middleware solo sync haría que Django envolviera toda la cadena en SyncToAsync
+        self.assertIn('apneasueno.estaticos.EstaticosMiddleware', settings.MIDDLEWARE)
+        cadena = ASGIHandler()._middleware_chain
+        self.assertNotIsInstance(cadena, SyncToAsync)
+        self.assertTrue(asyncio.iscoroutinefunction(cadena))
+
+
+# ============================
+# Derivados de imágenes
+# ============================
+class ImagenesTests(SimpleTestCase):
+
+    def setUp(self):
+        raiz = tempfile.mkdtemp(prefix='pruebas_imagenes_')
+        self.addCleanup(shutil.rmtree, raiz)
+        ajustes = override_settings(STATIC_ROOT=raiz, STATIC_URL='/static/')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.addCleanup(imagenes.limpiar)
+        imagenes.limpiar()
+        self.raiz = raiz
+
+    def test_generar_derivados_mas_livianos(self):
+        indice = imagenes.generar(self.raiz)
+        for original, variantes in indice['imagenes'].items():
+            self.assertEqual([v['ancho'] for v in variantes], list(imagenes.DERIVADOS[original]))
+            for variante in variantes:
+                tamano = os.path.getsize(os.path.join(self.raiz, variante['webp']))
+                self.assertLess(tamano, os.path.getsize(imagenes.ruta_estatico(original)))
+        logo = imagenes.ruta_impresion('img/hospital.png')
+        self.assertLess(os.path.getsize(os.path.join(self.raiz, logo)), os.path.getsize(imagenes.ruta_estatico('img/hospital.png')) / 5)
+
+    def test_etiqueta_imagen(self):
+        plantilla = Template("{% load imagenes %}{% imagen 'img/imgdoctor2.png' 150 alt='Doctor' class='x' %}")
+        # Sin derivados: la imagen original
+        with mock.patch.object(imagenes, 'indice', return_value={}):
+            self.assertHTMLEqual(
+                plantilla.render(Context()), '<img src="/static/img/imgdoctor2.png" alt="Doctor" width="150" class="x">'
+            )
+        imagenes.generar(self.raiz)
+        html = plantilla.render(Context())
+        self.assertIn('srcset="/static/img/derivados/imgdoctor2-150.webp 150w, /static/img/derivados/imgdoctor2-300.webp 300w"', html)
+        self.assertIn('src="/static/img/derivados/imgdoctor2-150.png"', html)
+        self.assertIn('width="150" height="150"', html)
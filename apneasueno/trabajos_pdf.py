@@ -0,0 +1,240 @@
+# ==========================================
+# Generación de pases PDF en segundo plano
+# Incluye:
+#   - Pool acotado de procesos locales (sin broker externo)
+#   - encolar: registra un trabajo y devuelve su ID
+#   - leer_estado: consulta el estado de un trabajo
+#   - renderizar_async: genera un pase en el pool sin bloquear el event loop (vistas ASGI);
+#     cuenta en la misma cola que encolar y une peticiones simultáneas del mismo pase
+# El estado de cada trabajo se guarda en un archivo JSON para que cualquier
+# worker de gunicorn pueda consultarlo, no solo el que lo recibió.
+# ==========================================
+import os
+import json
+import time
+import asyncio
+import uuid
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from . import cache_pdf
+
+PENDIENTE = 'pendiente'
+LISTO = 'listo'
+ERROR = 'error'
+
+
+class ColaLlena(Exception):
+    """Se alcanzó el máximo de trabajos pendientes en este proceso."""
+
+
+_pool = None
+_pendientes = set()
+_candado = threading.Lock()
+
+# (paciente_id, huella) -> futuro del pase que se está generando para las vistas async.
+# Solo se usa desde el event loop del proceso, así que no necesita candado.
+_en_curso = {}
+
+
+def _carpeta():
+    return str(getattr(settings, 'PDF_TRABAJOS_DIR', os.path.join(settings.BASE_DIR, 'cache_pdf', 'trabajos')))
+
+
+def _ruta_estado(trabajo_id):
+    return os.path.join(_carpeta(), f'{trabajo_id}.json')
+
+
+def _escribir_estado(trabajo_id, datos):
+    """Escribe el estado de un trabajo de forma atómica."""
+    carpeta = _carpeta()
+    os.makedirs(carpeta, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(datos, f)
+    os.replace(temporal, _ruta_estado(trabajo_id))
+
+
+def leer_estado(trabajo_id):
+    """Devuelve el diccionario de estado de un trabajo o None si no existe."""
+    try:
+        uuid.UUID(hex=trabajo_id)
+    except ValueError:
+        return None
+    try:
+        with open(_ruta_estado(trabajo_id), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def limpiar_estados(antiguedad=None):
+    """Borra los archivos de estado más viejos que PDF_TRABAJOS_TTL segundos."""
+    antiguedad = getattr(settings, 'PDF_TRABAJOS_TTL', 3600) if antiguedad is None else antiguedad
+    limite = time.time() - antiguedad
+    try:
+        entradas = list(os.scandir(_carpeta()))
+    except OSError:
+        return
+    for entrada in entradas:
+        try:
+            if entrada.stat().st_mtime < limite:
+                os.remove(entrada.path)
+        except OSError:
+            continue
+
+
+# ============================
+# Pool de procesos
+# ============================
+def _inicializar_trabajador(modulo_settings):
+    """Prepara Django en cada proceso hijo (se crean con 'spawn')."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', modulo_settings)
+    import django
+    django.setup()
+
+
+def _renderizar(trabajo_id, campos, huella, base_url):
+    """
+    Se ejecuta en el proceso hijo: genera el pase y lo deja en la caché de disco.
+    No toca la base de datos; recibe los campos del paciente ya leídos.
+    """
+    from .models import Paciente
+    from .pdf import renderizar_pase
+
+    estado = {'trabajo': trabajo_id, 'paciente_id': campos['id'], 'huella': huella}
+    try:
+        pdf_file = renderizar_pase(Paciente(**campos), base_url=base_url)
+        cache_pdf.guardar(campos['id'], huella, pdf_file)
+    except Exception as error:
+        _escribir_estado(trabajo_id, dict(estado, estado=ERROR, detalle=str(error)))
+        raise
+    _escribir_estado(trabajo_id, dict(estado, estado=LISTO))
+
+
+def _obtener_pool():
+    global _pool
+    with _candado:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'PDF_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_inicializar_trabajador,
+                initargs=(settings.SETTINGS_MODULE,),
+            )
+        return _pool
+
+
+def _descartar_pool():
+    """Olvida un pool roto (p. ej. un hijo murió); el siguiente trabajo crea otro."""
+    global _pool
+    with _candado:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+def _al_terminar(trabajo_id, estado):
+    """Callback en el proceso padre: libera el lugar en la cola y registra fallos del pool."""
+    def callback(futuro):
+        _liberar(trabajo_id)
+        if futuro.exception() is not None and (leer_estado(trabajo_id) or {}).get('estado') != ERROR:
+            _escribir_estado(trabajo_id, dict(estado, estado=ERROR, detalle=str(futuro.exception())))
+    return callback
+
+
+def _reservar(trabajo_id):
+    """Ocupa un lugar en la cola de pendientes o lanza ColaLlena (PDF_COLA_MAXIMA)."""
+    with _candado:
+        if len(_pendientes) >= getattr(settings, 'PDF_COLA_MAXIMA', 50):
+            raise ColaLlena()
+        _pendientes.add(trabajo_id)
+
+
+def _liberar(trabajo_id):
+    with _candado:
+        _pendientes.discard(trabajo_id)
+
+
+def encolar(paciente, base_url=None):
+    """
+    Registra la generación del pase de un paciente y devuelve el estado inicial.
+    - Si el pase ya está en la caché de disco, el trabajo nace 'listo'.
+    - Lanza ColaLlena si hay demasiados trabajos pendientes.
+    """
+    huella = cache_pdf.huella_pase(paciente)
+    trabajo_id = uuid.uuid4().hex
+    estado = {'trabajo': trabajo_id, 'paciente_id': paciente.id, 'huella': huella}
+
+    limpiar_estados()
+
+    if cache_pdf.obtener(paciente.id, huella):
+        estado['estado'] = LISTO
+        _escribir_estado(trabajo_id, estado)
+        return estado
+
+    _reservar(trabajo_id)
+
+    estado['estado'] = PENDIENTE
+    _escribir_estado(trabajo_id, estado)
+
+    campos = {campo: getattr(paciente, campo) for campo in cache_pdf.CAMPOS_PASE}
+    try:
+        futuro = _obtener_pool().submit(_renderizar, trabajo_id, campos, huella, base_url)
+    except Exception as error:
+        _descartar_pool()
+        _liberar(trabajo_id)
+        _escribir_estado(trabajo_id, dict(estado, estado=ERROR, detalle=str(error)))
+        raise
+    futuro.add_done_callback(_al_terminar(trabajo_id, estado))
+    return estado
+
+
+def _renderizar_bytes(campos, base_url):
+    """Se ejecuta en el proceso hijo: devuelve el PDF sin guardarlo."""
+    from .models import Paciente
+    from .pdf import renderizar_pase
+
+    return renderizar_pase(Paciente(**campos), base_url=base_url)
+
+
+async def renderizar_async(paciente, huella, base_url=None):
+    """
+    Genera el pase en el pool de procesos y espera el resultado sin bloquear
+    el event loop; mientras tanto el proceso sigue atendiendo otras peticiones.
+    - Ocupa un lugar en la misma cola que encolar(): lanza ColaLlena si está llena.
+    - Peticiones simultáneas del mismo pase (paciente y huella) esperan un solo render.
+    """
+    clave = (paciente.id, huella)
+    futuro = _en_curso.get(clave)
+    if futuro is None:
+        trabajo_id = uuid.uuid4().hex
+        _reservar(trabajo_id)
+        campos = {campo: getattr(paciente, campo) for campo in cache_pdf.CAMPOS_PASE}
+        try:
+            futuro = asyncio.get_running_loop().run_in_executor(
+                _obtener_pool(), _renderizar_bytes, campos, base_url,
+            )
+        except BaseException as error:
+            _liberar(trabajo_id)
+            if isinstance(error, BrokenProcessPool):
+                _descartar_pool()
+            raise
+        _en_curso[clave] = futuro
+
+        def terminar(_):
+            _en_curso.pop(clave, None)
+            _liberar(trabajo_id)
+        futuro.add_done_callback(terminar)
+
+    try:
+        # shield: si un cliente se desconecta no se cancela el pase que esperan los demás
+        return await asyncio.shield(futuro)
+    except BrokenProcessPool:
+        _descartar_pool()
+        raise
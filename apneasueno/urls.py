@@ -3,8 +3,16 @@
 # ==========================================
 from django.contrib import admin
 from django.urls import path
+from django.conf import settings
 from . import views
-from .views import pacientes_doctor, graficas_view
+
+# Con VISTAS_ASYNC (servidor ASGI, ver apnea/asgi.py) las vistas de lectura son async
+if getattr(settings, 'VISTAS_ASYNC', False):
+    from . import views_async as vistas_lectura
+else:
+    vistas_lectura = views
+pacientes_doctor = vistas_lectura.pacientes_doctor
+graficas_view = vistas_lectura.graficas_view
 
 
 urlpatterns = [
@@ -22,11 +30,14 @@ urlpatterns = [
     # ============================
     # Pacientes
     # ============================
-    path('pacientes', views.pacientes, name='pacientes'), #lista de pacientes (solo busqueda)
+    path('pacientes', vistas_lectura.pacientes, name='pacientes'), #lista de pacientes (solo busqueda)
     path('pacientes/crear', views.crear, name='crear'), # Formulario para crear paciente
     path('paciente_login', views.paciente_login, name='paciente_login'), # formulario para crear paciente (paciente) 
-    path('paciente/<str:paciente_id>/pdf/', views.generar_pdf, name='generar_pdf'), #generacion de pdf (pase)
-    path('paciente/exito/<str:paciente_id>/', views.paciente_exito, name='paciente_exito'), #envio de formulario exitoso
+    path('paciente/<str:paciente_id>/pdf/', vistas_lectura.generar_pdf, name='generar_pdf'), #generacion de pdf (pase)
+    path('paciente/<str:paciente_id>/pdf/encolar/', views.encolar_pdf, name='encolar_pdf'), #generacion de pdf en segundo plano
+    path('pdf/trabajos/<str:trabajo_id>/', views.estado_pdf, name='estado_pdf'), #estado del trabajo de pdf
+    path('pdf/trabajos/<str:trabajo_id>/descargar/', views.descargar_pdf, name='descargar_pdf'), #descarga del pdf terminado
+    path('paciente/exito/<str:paciente_id>/', vistas_lectura.paciente_exito, name='paciente_exito'), #envio de formulario exitoso
 
     # ============================
     # Doctor
@@ -36,6 +47,8 @@ urlpatterns = [
     path('doctor_register', views.doctor_register, name='doctor_register'), #registrar un nuevo doctor
     path('doctor_login/', views.doctor_login_view, name='doctor_login'), #inicio de sesion doctores
     path('pacientes/todos/', pacientes_doctor, name='pacientes_doctor'), #Lista de pacientes (doctor)
+    path('pacientes/triage/', views.triage, name='triage'), #Pacientes de mayor riesgo primero (doctor)
+    path('pacientes/todos/pases/', views.exportar_pases, name='exportar_pases'), #Imprimir todos los pases (doctor)
     path("recuperar_contrasena", views.restablecer_contrasena, name="recuperar_contrasena"),
     path('logout/', views.salir, name='logout'), # Salir de la sesion (doctor)
 
@@ -44,4 +57,7 @@ urlpatterns = [
     # ============================
 
     path('graficas/', graficas_view, name='graficas'), #graficas de los pacientes
+    path('graficas/tendencias/', views.tendencias_view, name='tendencias'), #pacientes registrados por día/semana/mes
+    path('exportar/pacientes/', views.exportar_pacientes, name='exportar_pacientes'), #extracto para investigacion (staff)
+    path('perfilado/', views.perfilado_view, name='perfilado'), #percentiles de tiempos por vista (staff)
 ]   
\ No newline at end of file
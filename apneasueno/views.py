@@ -1,25 +1,25 @@
 # ==============================================
 # IMPORTACIONES
 # ==============================================
-import os
-import base64
-from datetime import datetime
+import datetime
+import math
+import tempfile
 from urllib import request
 
 # Librerías de Django
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
-from django.db.models import Q, Count
-from django.template.loader import render_to_string
+from django.http import HttpResponse, FileResponse, JsonResponse, StreamingHttpResponse, Http404
 from django.contrib.auth import authenticate, login, logout
-from django.contrib.auth.models import User, Group
-from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.models import Group
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.conf import settings
 from django.utils import timezone
-
-# Librerías de terceros
-from weasyprint import HTML
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import quote_etag
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 
 # Archivos locales (propios de la app)
 # Archivos locales (propios de la app)
@@ -29,7 +29,19 @@ from .forms import (
     DoctorRegisterForm,
     DoctorLoginForm,
     RestablecerContrasenaForm,
+    TendenciasForm,
 )
+from .pdf import renderizar_pase, renderizar_pases, iterar_zip_pases
+from . import busqueda, cache_pdf, estadisticas, exportacion, limites, perfilado, roles, trabajos_pdf
+from .cache_paginas import cache_por_doctor
+from .roles import doctor_requerido
+from .paginacion import paginar, tamano_pagina
+
+# Niveles de riesgo que calcula Paciente.save()
+RIESGOS = ['Alto riesgo de AOS', 'Riesgo intermedio de AOS', 'Bajo riesgo de AOS']
+
+# Columnas que muestran las listas de pacientes: el resto del registro no se lee
+CAMPOS_LISTA = ('id', 'nombres', 'apellidos', 'puntuacion_stopbang', 'riesgo')
 
 # ==============================================
 # VISTAS PRINCIPALES
@@ -100,28 +112,30 @@ def pacientes(request):
     - Si es doctor, solo ve sus pacientes asignados.
     - Si es paciente normal, solo puede buscar por ID.
     """
+    return render(request, 'paginas/pacientes/index.html', _contexto_pacientes(request))
+
+def _contexto_pacientes(request):
+    """Contexto de la vista pacientes (también lo usa la versión async)."""
     query = request.GET.get('buscar')
     pacientes = Paciente.objects.none()  # empieza vacío
 
-    if request.user.is_authenticated and request.user.groups.filter(name='Doctores').exists():
+    es_doctor = roles.es_doctor(request)
+
+    if es_doctor:
         # Solo pacientes asignados a este doctor
-        pacientes = Paciente.objects.filter(doctor=request.user)
+        pacientes = Paciente.objects.filter(doctor=request.user).only(*CAMPOS_LISTA)
         if query:
-            pacientes = pacientes.filter(
-                Q(id__icontains=query) |
-                Q(nombres__icontains=query) |
-                Q(apellidos__icontains=query)
-            )
+            pacientes = busqueda.filtrar(pacientes, query, doctor=request.user)
     else:
         # Pacientes normales solo pueden buscar por ID
         if query:
-            pacientes = Paciente.objects.filter(id=query)
+            pacientes = Paciente.objects.filter(id=query).only(*CAMPOS_LISTA)
 
     context = {
-        'pacientes': pacientes,
-        'es_doctor': request.user.is_authenticated and request.user.groups.filter(name='Doctores').exists(),
+        'es_doctor': es_doctor,
     }
-    return render(request, 'paginas/pacientes/index.html', context)
+    context.update(_contexto_paginado(request, pacientes))
+    return context
 
 
 # ==============================================
@@ -137,7 +151,7 @@ def doctor_register(request):
         form = DoctorRegisterForm(request.POST)
         if form.is_valid():
             doctor = form.save()
-            group = Group.objects.get(name='Doctores')
+            group = Group.objects.get(name=roles.GRUPO_DOCTORES)
             doctor.groups.add(group)
             return render(request, "paginas/pacientes/exito_doctor.html", {"doctor": doctor})
     else:
@@ -157,13 +171,20 @@ def doctor_login_view(request):
         if form.is_valid():
             username = form.cleaned_data['username']
             password = form.cleaned_data['password']
+
+            # Se revisa el límite de intentos antes de calcular el hash de la contraseña
+            intento = limites.consumir('login', request, username)
+            if not intento:
+                return _demasiados_intentos(request, form, intento, 'paginas/doctor_login.html')
+
             user = authenticate(request, username=username, password=password)
             if user:
-                if not user.groups.filter(name='Doctores').exists():
+                if not roles.consultar(user):
                     form.add_error(None, "No tienes permisos de doctor.")  # error general
                     return render(request, 'paginas/doctor_login.html', {'form': form})
 
                 login(request, user)
+                roles.recordar(request, True)  # las siguientes páginas no vuelven a consultar el grupo
                 return redirect('pacientes_doctor')
             else:
                 form.add_error(None, "Credenciales incorrectas.")  # error general
@@ -176,79 +197,205 @@ def es_doctor_check(user):
     """
     Función auxiliar: valida que el usuario 
     pertenezca al grupo Doctores.
+    (Las vistas usan @doctor_requerido, que además guarda el rol en la sesión.)
     """
-    return user.groups.filter(name='Doctores').exists()
+    return roles.consultar(user)
 
-@login_required
-@user_passes_test(es_doctor_check)
-def pacientes_doctor(request):
+def _contexto_paginado(request, pacientes):
     """
-    Lista de pacientes para un doctor autenticado.
-    Permite búsqueda por nombre, apellido o ID.
+    Pagina la lista por cursor (?cursor=, ?por_pagina=, ?contar=1)
+    y arma los enlaces conservando la búsqueda actual.
+    - Si la búsqueda es exactamente un ID, ese paciente aparece primero.
+    """
+    exacto = None
+    if request.GET.get('buscar'):
+        exacto = busqueda.coincidencia_exacta(pacientes, request.GET['buscar'])
+        if exacto is not None:
+            pacientes = pacientes.exclude(id=exacto.id)
+
+    pagina = paginar(
+        pacientes,
+        cursor=request.GET.get('cursor'),
+        tamano=tamano_pagina(request.GET.get('por_pagina')),
+        contar=request.GET.get('contar') == '1',
+    )
+
+    parametros = request.GET.copy()
+    parametros.pop('cursor', None)
+    url_primera = f'?{parametros.urlencode()}' if request.GET.get('cursor') else None
+    url_siguiente = None
+    if pagina.hay_siguiente:
+        parametros['cursor'] = pagina.siguiente
+        url_siguiente = f'?{parametros.urlencode()}'
+
+    objetos = pagina.objetos
+    if exacto is not None and not request.GET.get('cursor'):
+        objetos = [exacto] + objetos
+
+    return {
+        'pacientes': objetos,
+        'pagina': pagina,
+        'url_primera': url_primera,
+        'url_siguiente': url_siguiente,
+    }
+
+def _pacientes_del_doctor(request):
+    """
+    Pacientes asignados al doctor autenticado,
+    filtrados por la búsqueda (?buscar=) y el riesgo (?riesgo=) si vienen en la URL.
     """
     buscar = request.GET.get('buscar')
+    riesgo = request.GET.get('riesgo')
 
-    # Filtramos solo pacientes asignados a este doctor
-    pacientes = Paciente.objects.filter(doctor=request.user)
+    # Filtramos solo pacientes asignados a este doctor (solo las columnas de la lista)
+    pacientes = Paciente.objects.filter(doctor=request.user).only(*CAMPOS_LISTA)
 
-    # Si hay búsqueda, filtramos por nombre, apellido o ID
+    # Si hay búsqueda, filtramos por nombre, apellido o ID (prefijo de palabra indexado)
     if buscar:
-        pacientes = pacientes.filter(
-            Q(nombres__icontains=buscar) |
-            Q(apellidos__icontains=buscar) |
-            Q(id__icontains=buscar)
-        )
+        pacientes = busqueda.filtrar(pacientes, buscar, doctor=request.user)
+    if riesgo:
+        pacientes = pacientes.filter(riesgo=riesgo)
+    return pacientes
+
+@doctor_requerido
+@cache_por_doctor('pacientes_doctor')
+def pacientes_doctor(request):
+    """
+    Lista de pacientes para un doctor autenticado.
+    Permite búsqueda por nombre, apellido o ID.
+    """
+    return render(request, 'paginas/pacientes/todos_los_pacientes.html', _contexto_pacientes_doctor(request))
+
+def _contexto_pacientes_doctor(request):
+    """Contexto de pacientes_doctor (también lo usa la versión async)."""
+    pacientes = _pacientes_del_doctor(request)
 
     context = {
-        'pacientes': pacientes,
         'es_doctor': True,
+        'riesgos': RIESGOS,
+    }
+    context.update(_contexto_paginado(request, pacientes))
+    return context
+
+@doctor_requerido
+@cache_por_doctor('triage')
+def triage(request):
+    """
+    Los K pacientes del doctor con mayor riesgo (?k=), para decidir
+    a quién enviar primero a polisomnografía.
+    """
+    return render(request, 'paginas/pacientes/triage.html', _contexto_triage(request))
+
+def _contexto_triage(request):
+    """
+    Mayor puntuación STOP-BANG primero y, a igual puntuación, el que se registró antes.
+    - El índice paciente_triage_idx ya tiene ese orden: se leen solo K filas, sin ordenar.
+    """
+    k = _tamano_triage(request.GET.get('k'))
+    pacientes = (
+        Paciente.objects.filter(doctor=request.user)
+        .only(*CAMPOS_LISTA, 'fecha_registro')
+        .order_by('-puntuacion_stopbang', 'fecha_registro', 'id')[:k]
+    )
+    return {
+        'es_doctor': True,
+        'pacientes': list(pacientes),
+        'k': k,
     }
-    return render(request, 'paginas/pacientes/todos_los_pacientes.html', context)
+
+def _tamano_triage(valor=None):
+    """Número de pacientes del triage (?k=) acotado a TRIAGE_PACIENTES_MAX."""
+    por_defecto = getattr(settings, 'TRIAGE_PACIENTES', 20)
+    maximo = getattr(settings, 'TRIAGE_PACIENTES_MAX', 200)
+    try:
+        k = int(valor)
+    except (TypeError, ValueError):
+        return por_defecto
+    return max(1, min(k, maximo))
+
+@doctor_requerido
+def exportar_pases(request):
+    """
+    Imprime de una vez los pases de la lista actual del doctor.
+    - ?formato=pdf (por defecto): un solo PDF, un pase por página.
+    - ?formato=zip: un ZIP con un PDF por paciente, enviado archivo por archivo.
+    """
+    pacientes = _pacientes_del_doctor(request).only(*cache_pdf.CAMPOS_PASE).order_by('id')
+    if not pacientes.exists():
+        messages.warning(request, 'No hay pacientes para imprimir.')
+        return redirect('pacientes_doctor')
+
+    base_url = request.build_absolute_uri()
+    if request.GET.get('formato') == 'zip':
+        response = StreamingHttpResponse(
+            iterar_zip_pases(pacientes.iterator(), base_url=base_url),
+            content_type='application/zip',
+        )
+        response['Content-Disposition'] = 'attachment; filename="pases_pacientes.zip"'
+        return response
+
+    # El PDF se escribe en un archivo temporal y se envía por partes desde disco
+    temporal = tempfile.TemporaryFile()
+    renderizar_pases(pacientes, temporal, base_url=base_url)
+    temporal.seek(0)
+    return FileResponse(temporal, as_attachment=True, filename='pases_pacientes.pdf', content_type='application/pdf')
 
 
     #GRAFICAS
 
-@login_required
-@user_passes_test(es_doctor_check)
+@doctor_requerido
+@cache_por_doctor('graficas')
 def graficas_view(request):
     """
     Genera estadísticas para los doctores:
     - Distribución por nivel de riesgo.
     - Distribución por sexo.
+    - Distribución por puntuación STOP-BANG.
     """
-    # Filtramos solo pacientes asignados a este doctor
-    pacientes = Paciente.objects.filter(doctor=request.user)
-
-    # Conteo por nivel de riesgo (solo pacientes de este doctor)
-    conteos_riesgo = pacientes.values('riesgo').annotate(total=Count('riesgo'))
+    return render(request, 'paginas/pacientes/graficas.html', _contexto_graficas(request))
 
-    riesgo_data = {
-        'Alto riesgo de AOS': 0,
-        'Riesgo intermedio de AOS': 0,
-        'Bajo riesgo de AOS': 0,
-    }
-    for item in conteos_riesgo:
-        riesgo_data[item['riesgo']] = item['total']
+def _contexto_graficas(request):
+    """Contexto de graficas_view (también lo usa la versión async)."""
+    # Una sola fila con los conteos ya calculados (ver estadisticas.py)
+    estadistica = estadisticas.obtener(request.user)
+    riesgo_data, sexo_data, puntuacion_data = estadisticas.datos_graficas(estadistica)
 
-    # Conteo por sexo (solo pacientes de este doctor)
-    conteos_sexo = pacientes.values('sexo').annotate(total=Count('sexo'))
-
-    sexo_data = {
-        'Masculino': 0,
-        'Femenino': 0,
-    }
-    for item in conteos_sexo:
-        if item['sexo'] == 'M':
-            sexo_data['Masculino'] = item['total']
-        elif item['sexo'] == 'F':
-            sexo_data['Femenino'] = item['total']
-
-    contexto = {
+    return {
         'riesgo_data': riesgo_data,
         'sexo_data': sexo_data,
+        'puntuacion_data': puntuacion_data,
     }
 
-    return render(request, 'paginas/pacientes/graficas.html', contexto)
+@doctor_requerido
+@cache_por_doctor('tendencias')
+def tendencias_view(request):
+    """
+    Pacientes registrados por día, semana o mes en un rango de fechas
+    (?desde=, ?hasta=, ?agrupar=), por nivel de riesgo y por sexo.
+    """
+    return render(request, 'paginas/pacientes/tendencias.html', _contexto_tendencias(request))
+
+def _contexto_tendencias(request):
+    """
+    Por defecto, los últimos TENDENCIAS_DIAS días. Solo lee EstadisticaDiaria.
+    Fechas fuera de rango invalidan el formulario (se muestra el rango por defecto).
+    """
+    form = TendenciasForm(request.GET or None)
+    datos = form.cleaned_data if form.is_valid() else {}
+
+    hasta = datos.get('hasta') or timezone.localdate()
+    desde = datos.get('desde') or hasta - datetime.timedelta(days=getattr(settings, 'TENDENCIAS_DIAS', 30) - 1)
+    agrupar = estadisticas.agrupacion_para(desde, hasta, datos.get('agrupar') or None)
+    if not form.is_bound:
+        form = TendenciasForm(initial={'desde': desde, 'hasta': hasta})
+
+    return {
+        'form': form,
+        'desde': desde,
+        'hasta': hasta,
+        'agrupar': agrupar,
+        'tendencias': estadisticas.tendencias(request.user, desde, hasta, agrupar),
+    }
 
 # ==============================================
 # UTILIDADES
@@ -258,41 +405,160 @@ def generar_pdf(request, paciente_id):
     """
     Genera un pase en PDF para un paciente.
     Incluye logo, fecha y datos del paciente.
+    - Si el pase ya existe en la caché de disco se sirve directamente.
+    - Responde 304 si el navegador ya tiene la misma versión (If-None-Match).
     """
-    paciente = Paciente.objects.get(id=paciente_id)
+    paciente, huella, response = _pase_disponible(request, paciente_id)
+    if response is not None:
+        return response
 
-    # 2. Obtener fecha actual
-    fecha_actual = timezone.now().strftime('%d/%m/%Y')
+    # Logo, CSS y fuentes vienen de la caché del proceso (ver pdf.py)
+    pdf_file = renderizar_pase(paciente, base_url=request.build_absolute_uri())
+    cache_pdf.guardar(paciente.id, huella, pdf_file)
+    return _respuesta_pase(paciente, huella, HttpResponse(pdf_file, content_type='application/pdf'))
 
-    with open(os.path.join(settings.STATIC_ROOT, "img/hospital.png"), "rb") as f:
-        logo_base64 = base64.b64encode(f.read()).decode()
+def _pase_disponible(request, paciente_id):
+    """
+    Parte de generar_pdf que no usa WeasyPrint (también la usa la versión async).
+    Devuelve (paciente, huella, response): response es el 304 o el PDF de la caché,
+    o None si hay que generarlo.
+    """
+    paciente = Paciente.objects.get(id=paciente_id)
 
-    html_string = render_to_string('paginas/pacientes/pase_pdf.html', {
-        'paciente': paciente,
-        'year': datetime.now().year,
-        'fecha_actual': fecha_actual,
-        'logo_base64': logo_base64,
-    })
+    # La huella cambia si cambian los datos del pase, la fecha o el logo/CSS
+    huella = cache_pdf.huella_pase(paciente)
 
-    html = HTML(string=html_string, base_url=request.build_absolute_uri())
-    pdf_file = html.write_pdf()
+    no_modificado = get_conditional_response(request, etag=quote_etag(huella))
+    if no_modificado is not None:
+        return paciente, huella, no_modificado
 
-    response = HttpResponse(pdf_file, content_type='application/pdf')
+    ruta = cache_pdf.obtener(paciente.id, huella)
+    if ruta:
+        response = FileResponse(open(ruta, 'rb'), content_type='application/pdf')
+        return paciente, huella, _respuesta_pase(paciente, huella, response)
+    return paciente, huella, None
+
+def _respuesta_pase(paciente, huella, response):
+    """Encabezados de descarga y ETag del pase."""
     response['Content-Disposition'] = f'attachment; filename="pase_paciente_{paciente.id}.pdf"'
+    response['ETag'] = quote_etag(huella)
+    return response
 
+def _respuesta_trabajo(estado, status=200):
+    """Estado de un trabajo de PDF en JSON, con sus URLs de consulta y descarga."""
+    datos = dict(estado)
+    datos.pop('huella', None)
+    datos['url_estado'] = reverse('estado_pdf', args=[estado['trabajo']])
+    if estado['estado'] == trabajos_pdf.LISTO:
+        datos['url_descarga'] = reverse('descargar_pdf', args=[estado['trabajo']])
+    return JsonResponse(datos, status=status)
+
+@require_POST
+def encolar_pdf(request, paciente_id):
+    """
+    Encola la generación del pase en el pool de procesos y devuelve el ID del trabajo.
+    - 202 si el trabajo quedó pendiente, 200 si el pase ya estaba listo.
+    - 503 si la cola está llena.
+    """
+    paciente = get_object_or_404(Paciente, id=paciente_id)
+    try:
+        estado = trabajos_pdf.encolar(paciente, base_url=request.build_absolute_uri())
+    except trabajos_pdf.ColaLlena:
+        return _respuesta_cola_llena()
+    status = 200 if estado['estado'] == trabajos_pdf.LISTO else 202
+    return _respuesta_trabajo(estado, status=status)
+
+def _respuesta_cola_llena():
+    """503 cuando hay PDF_COLA_MAXIMA pases en proceso (también la usa la versión async)."""
+    response = JsonResponse({'error': 'Demasiados pases en proceso, intente de nuevo.'}, status=503)
+    response['Retry-After'] = '5'
     return response
 
+def estado_pdf(request, trabajo_id):
+    """Consulta el estado de un trabajo de PDF (pendiente, listo o error)."""
+    estado = trabajos_pdf.leer_estado(trabajo_id)
+    if estado is None:
+        raise Http404("Trabajo no encontrado.")
+    return _respuesta_trabajo(estado)
+
+def descargar_pdf(request, trabajo_id):
+    """Descarga el pase de un trabajo terminado."""
+    estado = trabajos_pdf.leer_estado(trabajo_id)
+    if estado is None or estado['estado'] != trabajos_pdf.LISTO:
+        raise Http404("El pase todavía no está listo.")
+    ruta = cache_pdf.obtener(estado['paciente_id'], estado['huella'])
+    if ruta is None:
+        raise Http404("El pase ya no está disponible, solicítelo de nuevo.")
+
+    response = FileResponse(open(ruta, 'rb'), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="pase_paciente_{estado["paciente_id"]}.pdf"'
+    response['ETag'] = quote_etag(estado['huella'])
+    return response
+
+@staff_member_required
+def exportar_pacientes(request):
+    """
+    Extracto completo de pacientes para investigación (solo personal staff).
+    - ?formato=csv (por defecto), ndjson o parquet.
+    - Filtros opcionales: ?doctor=<usuario>, ?riesgo=, ?sexo=M|F.
+    Se envía por bloques, sin cargar la tabla en memoria.
+    """
+    formato = request.GET.get('formato', 'csv')
+    pacientes = exportacion.filtrar(
+        doctor=request.GET.get('doctor'),
+        riesgo=request.GET.get('riesgo'),
+        sexo=request.GET.get('sexo'),
+    )
+    try:
+        contenido = exportacion.iterar(formato, pacientes)
+    except ValueError as error:
+        return HttpResponse(str(error), status=400, content_type='text/plain; charset=utf-8')
+
+    tipo, extension = exportacion.FORMATOS[formato]
+    response = StreamingHttpResponse(contenido, content_type=tipo)
+    response['Content-Disposition'] = f'attachment; filename="pacientes.{extension}"'
+    return response
+
+@staff_member_required
+def perfilado_view(request):
+    """
+    Percentiles (p50/p90/p99) de tiempo total, consultas, tiempo de BD,
+    plantillas y WeasyPrint por nombre de URL, solo de este proceso.
+    - ?limpiar=1 descarta las muestras después de leerlas.
+    """
+    datos = {
+        'activo': getattr(settings, 'PERFILADO_ACTIVO', False),
+        'unidades': 'ms (consultas: número)',
+        'vistas': perfilado.resumen(),
+    }
+    if request.GET.get('limpiar') == '1':
+        perfilado.limpiar()
+    return JsonResponse(datos, json_dumps_params={'ensure_ascii': False})
+
 def restablecer_contrasena(request):
     """
     Permite a un doctor cambiar su contraseña.
-    - Busca usuario por username y actualiza contraseña.
+    - Busca usuario por username, verifica su NIP y actualiza contraseña.
+    - Los intentos por usuario y por IP están limitados (ver limites.py).
     """
     if request.method == 'POST':
         form = RestablecerContrasenaForm(request.POST)
         if form.is_valid():
             username = form.cleaned_data['username']
             nueva_contrasena = form.cleaned_data['nueva_contrasena']
-            user = User.objects.get(username=username)
+
+            intento = limites.consumir('restablecer', request, username)
+            if not intento:
+                return _demasiados_intentos(request, form, intento, 'paginas/recuperar_contrasena.html')
+
+            perfil = PerfilDoctor.objects.select_related('user').filter(user__username=username).first()
+            # Comparación en tiempo constante; si el usuario no existe se compara igual
+            nip_correcto = constant_time_compare(perfil.nip if perfil else '-----', form.cleaned_data['nip'])
+            if perfil is None or not nip_correcto:
+                form.add_error(None, 'Usuario o NIP incorrectos.')
+                return render(request, 'paginas/recuperar_contrasena.html', {'form': form})
+
+            user = perfil.user
             user.set_password(nueva_contrasena)
             user.save()
             messages.success(request, 'Contraseña actualizada correctamente.')
@@ -307,6 +573,13 @@ def restablecer_contrasena(request):
 
     return render(request, 'paginas/recuperar_contrasena.html', {'form': form})
 
+def _demasiados_intentos(request, form, intento, plantilla):
+    """Respuesta 429 con el formulario y el tiempo de espera."""
+    form.add_error(None, f'Demasiados intentos. Intente de nuevo en {intento.minutos} minuto(s).')
+    response = render(request, plantilla, {'form': form}, status=429)
+    response['Retry-After'] = str(math.ceil(intento.espera))
+    return response
+
 def salir(request):
     """Cerrar la sesión de un doctor y redirigir al login de doctores."""
     logout(request)  # Cierra la sesión
@@ -0,0 +1,72 @@
+# ==============================================
+# VISTAS ASYNC (ASGI)
+# Versiones async de las vistas de solo lectura más usadas.
+# - El ORM, la sesión y las plantillas se usan con sync_to_async.
+# - El PDF se genera en el pool de procesos (trabajos_pdf.renderizar_async).
+# urls.py las usa cuando VISTAS_ASYNC es True (ver apnea/asgi.py).
+# ==============================================
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.shortcuts import render
+
+from . import cache_pdf, trabajos_pdf
+from .cache_paginas import cache_por_doctor
+from .models import Paciente
+from .roles import doctor_requerido
+from .views import (
+    _contexto_graficas,
+    _contexto_pacientes,
+    _contexto_pacientes_doctor,
+    _pase_disponible,
+    _respuesta_cola_llena,
+    _respuesta_pase,
+)
+
+_render = sync_to_async(render)
+
+
+async def pacientes(request):
+    """Búsqueda de pacientes (ver views.pacientes)."""
+    contexto = await sync_to_async(_contexto_pacientes)(request)
+    return await _render(request, 'paginas/pacientes/index.html', contexto)
+
+
+@doctor_requerido
+@cache_por_doctor('pacientes_doctor')
+async def pacientes_doctor(request):
+    """Lista de pacientes del doctor (ver views.pacientes_doctor)."""
+    contexto = await sync_to_async(_contexto_pacientes_doctor)(request)
+    return await _render(request, 'paginas/pacientes/todos_los_pacientes.html', contexto)
+
+
+@doctor_requerido
+@cache_por_doctor('graficas')
+async def graficas_view(request):
+    """Gráficas del doctor (ver views.graficas_view)."""
+    contexto = await sync_to_async(_contexto_graficas)(request)
+    return await _render(request, 'paginas/pacientes/graficas.html', contexto)
+
+
+async def paciente_exito(request, paciente_id):
+    """Confirmación del cuestionario (ver views.paciente_exito)."""
+    paciente = await sync_to_async(Paciente.objects.get)(id=paciente_id)
+    return await _render(request, 'paginas/pacientes/exito.html', {'paciente': paciente})
+
+
+async def generar_pdf(request, paciente_id):
+    """
+    Pase en PDF (ver views.generar_pdf).
+    - 304 y caché de disco igual que la versión sync.
+    - Si hay que generarlo, WeasyPrint corre en otro proceso.
+    - 503 si la cola de pases está llena (igual que encolar_pdf).
+    """
+    paciente, huella, response = await sync_to_async(_pase_disponible)(request, paciente_id)
+    if response is not None:
+        return response
+
+    try:
+        pdf_file = await trabajos_pdf.renderizar_async(paciente, huella, base_url=request.build_absolute_uri())
+    except trabajos_pdf.ColaLlena:
+        return _respuesta_cola_llena()
+    await sync_to_async(cache_pdf.guardar)(paciente.id, huella, pdf_file)
+    return _respuesta_pase(paciente, huella, HttpResponse(pdf_file, content_type='application/pdf'))